@@ -52,6 +52,8 @@ main_query AS (
     LEFT JOIN global_company AS gc 
         ON gc.id = sf.global_company_id
     WHERE ws.id = :workspace_id
+        AND (:keyword_contains is null or k.keyword like :keyword_contains)
+        AND (:keyword_prefix is null or k.keyword like :keyword_prefix)
 )
 
 SELECT
@@ -0,0 +1,37 @@
+WITH filtered_storefront_data AS (
+    SELECT
+        storefront_a.created_datetime,
+        storefront_a.keyword_id,
+        storefront_a.storefront_id,
+        storefront_a.display_type AS display_type,
+        storefront_a.product_position AS product_position,
+        storefront_a.device_type AS device_type,
+        AVG(storefront_a.share_of_search) AS share_of_search,
+        AVG(storefront_a.search_volume) AS search_volume
+    FROM metric_share_of_search_storefront AS storefront_a
+    WHERE storefront_a.timing = 'daily'
+        AND (:display_type is null or storefront_a.display_type = :display_type)
+        AND (:product_position is null or storefront_a.product_position = :product_position)
+        AND storefront_a.created_datetime BETWEEN :start_date AND :end_date
+    GROUP BY
+        storefront_a.created_datetime,
+        storefront_a.keyword_id,
+        storefront_a.storefront_id,
+        storefront_a.display_type,
+        storefront_a.product_position,
+        storefront_a.device_type
+)
+
+SELECT
+    fsa.keyword_id,
+    fsa.storefront_id,
+    fsa.device_type,
+    fsa.display_type,
+    fsa.product_position,
+    fsa.search_volume,
+    fsa.share_of_search,
+    CAST(fsa.created_datetime AS DATETIME) AS created_datetime
+FROM onsite_keyword_workspace AS kw_ws
+INNER JOIN filtered_storefront_data AS fsa 
+    ON fsa.keyword_id = kw_ws.keyword_id
+WHERE kw_ws.workspace_id = :workspace_id
@@ -49,5 +49,7 @@ and created_datetime between :start_date and :end_date
 and ads_ops_storefront_id in :storefront_ids
 and est_daily_search_volume > 0
 and kw_discovery_storefront_keyword.keyword_type != 'irrelevant'
+and (:keyword_contains is null or onsite_keyword.keyword like :keyword_contains)
+and (:keyword_prefix is null or onsite_keyword.keyword like :keyword_prefix)
 group by kw_discovery_storefront_keyword.keyword_id, kw_discovery_storefront_keyword.storefront_id,
     month(created_datetime)
\ No newline at end of file
@@ -23,6 +23,8 @@ WITH dim_data AS (
 	WHERE true
 	  AND sf.ads_ops_storefront_id IN :storefront_ids
 	  AND ws.id = :workspace_id
+	  AND (:keyword_contains is null or kw.keyword like :keyword_contains)
+	  AND (:keyword_prefix is null or kw.keyword like :keyword_prefix)
 )
 
 ,sos_metrics AS (
@@ -9,8 +9,8 @@ WITH product_metrics AS (
     created_datetime
   FROM metric_share_of_search_product product_a
   WHERE product_a.timing = 'daily'
-    AND display_type = 'Paid'
-    AND created_datetime BETWEEN '2025-10-10' AND '2025-11-08'
+    AND (:display_type is null or display_type = :display_type)
+    AND created_datetime BETWEEN :start_date AND :end_date
   GROUP BY
     DATE(created_datetime),
     product_a.keyword_id,
@@ -65,8 +65,10 @@ main_query AS (
   JOIN onsite_storefront s ON s.id = p.storefront_id
   LEFT JOIN global_company gc ON s.global_company_id = gc.id
 
-  WHERE ws.id = 10
+  WHERE ws.id = :workspace_id
     AND kw_ws.status = 'ACTIVATED'
+    AND (:keyword_contains is null or k.keyword like :keyword_contains)
+    AND (:keyword_prefix is null or k.keyword like :keyword_prefix)
 )
 select count(1)
 from (SELECT 1
@@ -77,7 +79,7 @@ GROUP BY
   keyword,
   keyword_id,
   product_name,
+  product_marketplace,
   global_company_name,
   storefront_name,
-  created_datetime
-ORDER BY product_id, keyword_id, created_datetime)
\ No newline at end of file
+  created_datetime)
\ No newline at end of file
@@ -67,6 +67,8 @@ main_query AS (
 
   WHERE ws.id = :workspace_id
     AND kw_ws.status = 'ACTIVATED'
+    AND (:keyword_contains is null or k.keyword like :keyword_contains)
+    AND (:keyword_prefix is null or k.keyword like :keyword_prefix)
 )
 
 SELECT
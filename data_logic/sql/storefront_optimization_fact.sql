@@ -0,0 +1,21 @@
+    select 
+        onsite_storefront.id as onsite_storefront_id,
+        dashboard_ads.storefront_id,
+        sum(gmv) as gmv,
+        sum(cost) as cost,
+        sum(gmv/cost) as roas,
+        sum(cost/click) as cpc,
+        sum(click) as click,
+        sum(impression) as impression,
+        sum(ads_order) as ads_order,
+        sum(direct_gmv) as direct_gmv,
+        sum(direct_ads_order) as direct_ads_order,
+        sum(direct_item_sold) as direct_item_sold,
+        sum(item_sold) as item_sold
+    from kw_discovery_storefront_workspace workspace
+    join onsite_storefront ON onsite_storefront.id = workspace.storefront_id
+    join dashboard_ads on dashboard_ads.storefront_id = onsite_storefront.ads_ops_storefront_id
+        and date(dashboard_ads.created_datetime) between :start_date and :end_date
+    where workspace.workspace_id = :workspace_id
+    and onsite_storefront.ads_ops_storefront_id in :storefront_ids
+    group by onsite_storefront.id
@@ -127,11 +127,13 @@ st.markdown(
     <div class='warning-box'>
     <h4>BREAKING NEWS: Performance Still Matters!</h4>
     
-    <strong>1-2 storefronts:</strong> Maximum 60 days<br>
-    <strong>3-5 storefronts:</strong> Maximum 30 days<br>
-    <strong>More than 5:</strong> Keep it under 30 days for optimal performance
+    There are no fixed day limits anymore. Every export gets an <strong>estimated database cost</strong> (rows × how expensive that report usually is), shown in the preview summary.
     <br><br>
-    <strong>Why these limits exist?</strong> Because every query requires database resources. The system automatically splits large date ranges into batches for processing, but smaller ranges are always faster!
+    <strong>Within budget:</strong> Runs right away<br>
+    <strong>Over budget:</strong> Automatically split into smaller batches<br>
+    <strong>Way over budget:</strong> Queued behind other large exports and processed day by day
+    <br><br>
+    <strong>Why the budget exists?</strong> Because every query requires database resources. Smaller ranges and fewer storefronts are still always faster!
     </div>
     """, 
     unsafe_allow_html=True
@@ -0,0 +1,117 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+from utils.core.helpers import initialize_session_state
+from utils.core.metrics import summary_rows, render_prometheus
+from utils.core.scheduler import get_scheduler
+from utils.core.slow_query_log import read_slow_queries
+from utils.core.pool_telemetry import pool_snapshot, get_pool_autosizer
+from utils.core.pool_health import get_pool_health_checker
+from utils.core.routing import get_router
+from utils.config import EXPORT_METRICS_PORT, EXPORT_METRICS_HOST, EXPORT_SLOW_QUERY_SECONDS, EXPORT_SLOW_QUERY_LOG
+
+st.set_page_config(page_title="Metrics", layout="wide")
+initialize_session_state()
+
+st.title("Metrics")
+st.caption(
+    "Query and export stage measurements of this app process since it started. "
+    "p50/p95 are estimated from histogram buckets."
+)
+
+if EXPORT_METRICS_PORT:
+    st.info(f"Prometheus endpoint: http://{EXPORT_METRICS_HOST}:{EXPORT_METRICS_PORT}/metrics")
+else:
+    st.info("Prometheus endpoint is off (set EXPORT_METRICS_PORT to enable it).")
+
+if st.button("🔄 Refresh"):
+    st.rerun()
+
+st.subheader("Scheduler")
+stats = get_scheduler().stats()
+cols = st.columns(4)
+cols[0].metric("Interactive active", stats["interactive_active"])
+cols[1].metric("Interactive waiting", stats["interactive_waiting"])
+cols[2].metric("Bulk active", f"{stats['bulk_active']} / {stats['bulk_limit']}")
+cols[3].metric("Bulk waiting", stats["bulk_waiting"])
+
+st.subheader("Connection pools")
+pools = pool_snapshot()
+if pools:
+    st.dataframe(
+        pd.DataFrame([{"engine": name, **state} for name, state in pools.items()]),
+        use_container_width=True, hide_index=True
+    )
+router = get_router()
+if router.replicas:
+    st.caption(f"Lanes routed to read replicas: {', '.join(sorted(router.replica_lanes)) or 'none'}.")
+    st.dataframe(pd.DataFrame(router.status()), use_container_width=True, hide_index=True)
+health_checker = get_pool_health_checker()
+if health_checker is not None:
+    sweeps = ", ".join(
+        f"{name}: {r['checked']} pinged, {r['evicted']} evicted at {datetime.fromtimestamp(r['at']).strftime('%H:%M:%S')}"
+        for name, r in health_checker.last_results.items()
+    )
+    st.caption(f"Idle connections are checked every {health_checker.interval:g}s. {sweeps or 'No check has run yet.'}")
+autosizer = get_pool_autosizer()
+if autosizer is not None:
+    st.caption(
+        f"Adaptive concurrency is on: limit {get_scheduler().total_slots} "
+        f"(range {autosizer.min_slots}–{autosizer.max_slots})."
+    )
+    if autosizer.history:
+        st.dataframe(
+            pd.DataFrame([
+                {"time": datetime.fromtimestamp(ts).strftime('%H:%M:%S'), "limit": limit, "reason": reason}
+                for ts, limit, reason in reversed(autosizer.history)
+            ]),
+            use_container_width=True, hide_index=True
+        )
+
+st.subheader("Queries and stages by data source")
+rows = summary_rows()
+if rows:
+    summary_df = pd.DataFrame(rows)
+    data_sources = sorted(summary_df["data_source"].unique())
+    selected = st.multiselect("Data sources", data_sources, default=data_sources)
+    st.dataframe(summary_df[summary_df["data_source"].isin(selected)], use_container_width=True, hide_index=True)
+else:
+    st.write("No queries have run in this process yet.")
+
+with st.expander("Prometheus exposition"):
+    st.code(render_prometheus(), language="text")
+
+st.subheader("Slow queries")
+if EXPORT_SLOW_QUERY_SECONDS > 0:
+    st.caption(f"Database executions over {EXPORT_SLOW_QUERY_SECONDS:g} s, newest first ({EXPORT_SLOW_QUERY_LOG}).")
+    slow_queries = list(read_slow_queries(limit=50))
+    if slow_queries:
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    "time": datetime.fromtimestamp(q["ts"]).strftime('%Y-%m-%d %H:%M:%S'),
+                    "fingerprint": q["fingerprint"],
+                    "data_source": q["data_source"],
+                    "query_type": q["query_type"],
+                    "duration_s": q["duration"],
+                    "rows": q.get("rows"),
+                }
+                for q in slow_queries
+            ]),
+            use_container_width=True, hide_index=True
+        )
+        selected = st.selectbox(
+            "Details", range(len(slow_queries)),
+            format_func=lambda i: f"{slow_queries[i]['fingerprint']} · {slow_queries[i]['data_source']} · {slow_queries[i]['duration']} s"
+        )
+        query = slow_queries[selected]
+        st.json(query["params"], expanded=False)
+        st.code(query["sql"], language="sql")
+        if query.get("plan"):
+            st.code("\n".join(query["plan"]), language="text")
+        elif query.get("plan_error"):
+            st.warning(f"Plan capture failed: {query['plan_error']}")
+    else:
+        st.write("No slow queries logged yet.")
+else:
+    st.write("The slow-query log is off (EXPORT_SLOW_QUERY_SECONDS=0).")
@@ -0,0 +1,48 @@
+"""Arrow fetch path of utils/core/logic.py and its pool (utils/core/database.py)."""
+
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from utils.core import database, logic
+
+
+@pytest.fixture(autouse=True)
+def arrow_enabled(monkeypatch):
+    monkeypatch.setattr(logic, "_arrow_fetch_disabled", False)
+    monkeypatch.setattr(logic, "is_connection_error", lambda error, name: isinstance(error, ConnectionError))
+
+
+def _engine_failing_with(error):
+    def raw_connection():
+        raise error
+    return SimpleNamespace(raw_connection=raw_connection)
+
+
+@pytest.mark.parametrize("error", [ConnectionError("database down"), PoolTimeoutError("pool full")])
+def test_connect_failure_falls_back_to_read_sql_for_this_query(monkeypatch, error):
+    monkeypatch.setattr(logic, "get_arrow_engine", lambda name: _engine_failing_with(error))
+
+    assert logic._fetch_arrow("main", "SELECT 1", {}) is None
+    assert not logic._arrow_fetch_disabled
+
+
+def test_other_connect_failures_disable_the_arrow_path(monkeypatch):
+    monkeypatch.setattr(logic, "get_arrow_engine", lambda name: _engine_failing_with(TypeError("results_type")))
+
+    assert logic._fetch_arrow("main", "SELECT 1", {}) is None
+    assert logic._arrow_fetch_disabled
+
+
+def test_arrow_and_main_pool_share_one_budget(monkeypatch):
+    monkeypatch.setattr(database, "DB_POOL_SIZE", 25)
+    monkeypatch.setattr(database, "_max_overflow", 15)
+    url = "singlestoredb://user:password@db:3306/exports"
+
+    main_size, main_overflow = database._pool_sizes(url, arrow=False)
+    arrow_size, arrow_overflow = database._pool_sizes(url, arrow=True)
+
+    assert main_size + arrow_size == 25
+    assert main_size + main_overflow == arrow_size + arrow_overflow == 40
+    assert database._pool_sizes("sqlite:///local.db", arrow=False) == (25, 15)
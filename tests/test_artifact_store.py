@@ -0,0 +1,53 @@
+"""Incremental-export frames in the artifact store (utils/core/artifact_store.py)."""
+
+import os
+
+import pandas as pd
+import pytest
+
+from utils.core import artifact_store
+from utils.core.artifact_store import cleanup_artifacts, get_last_export, remember_export, save_artifact
+
+PARAMS = {"start_date": "2024-01-01", "end_date": "2024-01-31", "countries": ["US"]}
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_store, "EXPORT_ARTIFACT_DIR", tmp_path)
+    monkeypatch.setattr(artifact_store, "_INDEX_FILE", tmp_path / "index.sqlite")
+    monkeypatch.setattr(artifact_store, "EXPORT_ARTIFACT_QUOTA_MB", 1)
+    yield tmp_path
+
+
+def _export(params, df, csv_data=None):
+    csv_data = df.to_csv(index=False) if csv_data is None else csv_data
+    artifact = save_artifact("sales", params, csv_data, "sales.csv", row_count=len(df))
+    remember_export("sales", params, df, artifact)
+    return artifact
+
+
+def test_frames_are_arrow_files_that_round_trip(store):
+    df = pd.DataFrame({"date": ["2024-01-01", "2024-01-02"], "keyword": ["a", "b"], "sales": [1.5, 2.0]})
+    _export(PARAMS, df)
+
+    assert [p.suffix for p in (store / "lineage").iterdir()] == [".arrow"]
+    previous = get_last_export("sales", {**PARAMS, "end_date": "2024-02-15"})
+    assert (previous["start_date"], previous["end_date"]) == ("2024-01-01", "2024-01-31")
+    pd.testing.assert_frame_equal(previous["df"], df)
+
+
+def test_frames_count_against_the_quota_and_go_with_their_artifact(store):
+    # Tiny CSVs, 700 KB frames: only the frames push the store over its 1 MB quota
+    big = pd.DataFrame({"blob": [os.urandom(700).hex() for _ in range(1000)]})
+    first = _export(PARAMS, big, csv_data="x\n1\n")
+    assert len(list((store / "lineage").iterdir())) == 1
+
+    second_params = {**PARAMS, "countries": ["DE"]}
+    _export(second_params, big, csv_data="x\n1\n")
+
+    # The least recently used export was evicted with its frame
+    assert not (store / f"{first['key']}.csv").exists()
+    assert get_last_export("sales", PARAMS) is None
+    assert get_last_export("sales", second_params) is not None
+    assert len(list((store / "lineage").iterdir())) == 1
+    assert cleanup_artifacts() == 0
@@ -0,0 +1,79 @@
+"""Final SQL and bind parameters of an export query (utils/core/logic.py build_query)."""
+
+from utils.core import logic
+from utils.core.sql_rewrite import split_statements
+
+PARAMS = {
+    "workspace_id": 7,
+    "storefront_ids": [1, 2],
+    "start_date": "2024-01-01",
+    "end_date": "2024-01-31",
+    "display_type": None,
+    "product_position": None,
+}
+
+
+def _statement_with(sql, text):
+    return next(stmt for _, _, stmt in split_statements(sql) if text in stmt)
+
+
+def test_keyword_filters_run_before_the_group_by_and_thresholds_in_having():
+    sql, params = logic.build_query(
+        "data", "keyword_performance", keyword_contains="shoe", keyword_prefix="red_", min_cost=5, **PARAMS
+    )
+
+    # On the keyword dimension, before anything is joined and grouped
+    dimension = _statement_with(sql, "kw.keyword like :keyword_contains")
+    assert "kw.keyword like :keyword_prefix" in dimension
+    assert "group by" not in dimension.lower()
+    # Only the metric threshold is applied to the aggregated rows
+    having = sql[sql.index("HAVING"):]
+    assert "cost >= :min_cost" in having and "like" not in having.lower()
+    assert params["keyword_contains"] == "%shoe%"
+    assert params["keyword_prefix"] == "red\\_%"
+    assert params["min_cost"] == 5.0
+
+
+def test_keyword_predicates_are_removed_without_a_value():
+    sql, params = logic.build_query("data", "keyword_performance", keyword_contains="  ", **PARAMS)
+
+    assert ":keyword_contains" not in sql and ":keyword_prefix" not in sql
+    assert "HAVING" not in sql
+    assert "keyword_contains" not in params
+
+
+def test_count_with_only_keyword_filters_uses_the_count_query():
+    sql, params = logic.build_query("count", "keyword_lab", keyword_prefix="shoe", **PARAMS)
+
+    assert "onsite_keyword.keyword like :keyword_prefix" in sql
+    assert "filtered_rows" not in sql
+    assert params["keyword_prefix"] == "shoe%"
+
+
+def test_column_selection_keeps_the_merge_keys():
+    sql, _ = logic.build_query("data", "keyword_lab", columns=["cost"], **PARAMS)
+
+    assert logic.get_select_columns(sql) == ["keyword_id", "storefront_sid", "month", "cost"]
+
+
+def test_null_parameters_are_specialized_away_and_not_bound():
+    with_filters, bound = logic.build_query(
+        "data", "competition_landscape", **{**PARAMS, "display_type": "organic", "product_position": None}
+    )
+    without_filters, unbound = logic.build_query("data", "competition_landscape", **PARAMS)
+
+    assert "storefront_a.display_type = :display_type" in with_filters
+    assert ":product_position" not in with_filters
+    assert bound["display_type"] == "organic"
+    # None parameters are neither in the SQL nor sent to the driver
+    assert ":display_type" not in without_filters and "is null" not in without_filters
+    assert not {"display_type", "product_position", "storefront_ids"} & set(unbound)
+    assert set(unbound) == logic.referenced_params(without_filters)
+
+
+def test_the_exclusive_end_date_is_bound_as_the_next_day():
+    sql, params = logic.build_query("data", "product_tracking", **{**PARAMS, "end_date": "2024-12-31"})
+
+    assert "between" not in sql.lower()
+    assert params["end_date_next"] == "2025-01-01"
+    assert "end_date" not in params
@@ -0,0 +1,50 @@
+"""What the export cost model learns from (utils/core/logic.py track_database_work)."""
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from utils.core import cache_backend, logic
+from utils.core.scheduler import ExportScheduler
+
+
+@pytest.fixture(autouse=True)
+def fake_database(monkeypatch):
+    monkeypatch.setattr(cache_backend, "_backend", cache_backend.MemoryCacheBackend())
+
+    def fetch(query, params):
+        time.sleep(0.05)
+        return pd.DataFrame({"x": [1, 2]}), "main"
+
+    monkeypatch.setattr(logic, "_fetch_dataframe", fetch)
+    monkeypatch.setattr(logic, "record_slow_query", lambda *args, **kwargs: None)
+    yield
+
+
+def test_fetch_time_excludes_waiting_for_a_slot(monkeypatch):
+    scheduler = ExportScheduler(total_slots=1, interactive_reserved=0, bulk_limit=1)
+    monkeypatch.setattr(logic, "db_slot", lambda: scheduler.slot("interactive", "test"))
+    ticket = scheduler.acquire("interactive", "other")
+    threading.Timer(0.3, scheduler.release, args=(ticket,)).start()
+
+    started = time.perf_counter()
+    with logic.track_database_work() as work:
+        logic._execute_query("select 1", {}, data_source="test")
+
+    assert time.perf_counter() - started >= 0.3
+    assert 0.05 <= work.fetch_seconds < 0.25
+    assert work.all_from_database
+
+
+def test_cache_hits_are_not_database_work(monkeypatch):
+    monkeypatch.setattr(logic, "db_slot", lambda: ExportScheduler(1, 0, 1).slot("interactive", "test"))
+    logic._execute_query("select 2", {}, data_source="test")
+
+    with logic.track_database_work() as work:
+        logic._execute_query("select 2", {}, data_source="test")
+
+    assert work.counts["hit"] == 1
+    assert work.fetch_seconds == 0
+    assert not work.all_from_database
@@ -0,0 +1,37 @@
+"""Compact dimension frames (utils/core/dimension_cache.py) and merging joined batches."""
+
+import pandas as pd
+
+from utils.core.batch_export import merge_batches
+from utils.core.dimension_cache import _compact
+
+
+def test_compact_categorizes_repeated_strings_but_not_merge_keys():
+    df = pd.DataFrame({
+        "storefront_id": [1, 2, 3, 4, 5, 6],
+        "storefront_name": ["a", "a", "a", "a", "b", "b"],
+        "segment": ["big", "big", "big", "big", "small", "small"],
+    })
+
+    compact = _compact(df, "storefront_id")
+
+    assert isinstance(compact["segment"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_string_dtype(compact["storefront_name"])
+    assert not isinstance(compact["storefront_name"].dtype, pd.CategoricalDtype)
+
+
+def test_merge_batches_only_groups_observed_categories():
+    keys = ["storefront_id", "storefront_name", "country_code", "marketplace_code"]
+    batch = pd.DataFrame({
+        "storefront_id": [1, 2],
+        "storefront_name": pd.Categorical(["a", "b"]),
+        "country_code": pd.Categorical(["VN", "ID"]),
+        "marketplace_code": ["shopee", "lazada"],
+        "gmv": [10.0, 20.0],
+    })
+
+    merged = merge_batches([batch, batch], "storefront_optimization")
+
+    assert len(merged) == 2
+    assert merged.sort_values("storefront_id")["gmv"].tolist() == [20.0, 40.0]
+    assert merged[keys].astype(str).values.tolist() == [["1", "a", "VN", "shopee"], ["2", "b", "ID", "lazada"]]
@@ -0,0 +1,53 @@
+"""Cancelling a hedged attempt (utils/core/hedging.py Attempt)."""
+
+import threading
+
+import pytest
+
+from utils.core import database
+from utils.core.hedging import Attempt, AttemptCancelled
+
+
+def test_cancel_kills_outside_the_lock_and_holds_the_connection_until_done(monkeypatch):
+    killing, finish_kill = threading.Event(), threading.Event()
+    killed = []
+
+    def slow_cancel_query(name, dbapi_connection):
+        killing.set()
+        finish_kill.wait(5)
+        killed.append((name, dbapi_connection))
+
+    monkeypatch.setattr(database, "cancel_query", slow_cancel_query)
+    attempt = Attempt()
+    bound, unbound = threading.Event(), threading.Event()
+
+    def run_query():
+        with attempt.bind("main", "connection-1"):
+            bound.set()
+            killing.wait(5)
+        unbound.set()
+
+    threading.Thread(target=run_query, daemon=True).start()
+    assert bound.wait(5)
+    threading.Thread(target=attempt.cancel, daemon=True).start()
+    assert killing.wait(5)
+
+    # The lock is free while the KILL runs: another cancel doesn't wait for it
+    attempt.cancel()
+    # The connection doesn't go back to the pool before the KILL was sent
+    assert not unbound.wait(0.2)
+    finish_kill.set()
+    assert unbound.wait(5)
+    assert killed == [("main", "connection-1")]
+
+    # A later query of a cancelled attempt doesn't start
+    with pytest.raises(AttemptCancelled):
+        with attempt.bind("main", "connection-2"):
+            pass
+
+
+def test_cancel_without_running_query_only_sets_the_flag(monkeypatch):
+    monkeypatch.setattr(database, "cancel_query", lambda *args: pytest.fail("nothing to kill"))
+    attempt = Attempt()
+    attempt.cancel()
+    assert attempt.cancelled
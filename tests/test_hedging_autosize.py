@@ -0,0 +1,98 @@
+"""Hedged batches with adaptive concurrency: a cancelled loser must not lower the slot limit."""
+
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from utils.core import database, hedging
+from utils.core.hedging import bound_connection, current_attempt, run_hedged
+from utils.core.pool_telemetry import DB_ERRORS, PoolAutosizer, instrument_engine
+from utils.core.scheduler import get_scheduler
+
+# Runs for many seconds on SQLite unless interrupted
+SLOW_QUERY = (
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1000000000) "
+    "SELECT count(*) FROM c"
+)
+ENGINE_LABEL = "hedge_test"
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'hedge.db'}"
+    # The attempts register their connections under the primary's name
+    monkeypatch.setattr(database, "_database_url", url)
+    monkeypatch.setattr(database, "_replica_urls", {})
+    engine = create_engine(url, poolclass=QueuePool, connect_args={"check_same_thread": False})
+    monkeypatch.setitem(database._engines, database.PRIMARY, engine)
+    instrument_engine(engine, ENGINE_LABEL)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def autosizer():
+    scheduler = get_scheduler()
+    limit = scheduler.total_slots
+    autosizer = PoolAutosizer(min_slots=1, max_slots=limit + 10, interval=3600, target_wait=60)
+    # Start from an empty measurement window
+    autosizer.tick()
+    scheduler.configure(limit)
+    yield autosizer
+    scheduler.configure(limit)
+
+
+@pytest.fixture(autouse=True)
+def fast_hedges(monkeypatch):
+    monkeypatch.setattr(hedging, "EXPORT_HEDGE_MIN_SECONDS", 0.2)
+    hedging.clear_history()
+    for _ in range(max(hedging.EXPORT_HEDGE_MIN_SAMPLES, 1)):
+        hedging.observe("hedge_test_source", 0.01, 1)
+    yield
+    hedging.clear_history()
+
+
+def _errors() -> float:
+    return sum(v for (engine, _), v in DB_ERRORS.values().items() if engine == ENGINE_LABEL)
+
+
+def _wait_until_idle(engine, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while engine.pool.checkedout() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert engine.pool.checkedout() == 0
+
+
+def test_winning_hedge_does_not_count_the_cancelled_primary_as_overload(engine, autosizer):
+    def fetch(on_wait):
+        if current_attempt().hedge:
+            return "hedge"
+        with engine.connect() as conn:
+            with bound_connection(database.PRIMARY, conn.connection.dbapi_connection):
+                return conn.exec_driver_sql(SLOW_QUERY).scalar()
+
+    errors_before = _errors()
+    started = time.monotonic()
+    assert run_hedged(fetch, "hedge_test_source", days=1) == "hedge"
+    # The primary's query was interrupted, not run to the end
+    _wait_until_idle(engine)
+    assert time.monotonic() - started < 10
+
+    limit = get_scheduler().total_slots
+    reason = autosizer.tick()
+    assert reason is None or not reason.startswith("decrease")
+    assert get_scheduler().total_slots >= limit
+    assert _errors() == errors_before
+
+
+def test_other_operational_errors_still_lower_the_limit(engine, autosizer):
+    with pytest.raises(Exception):
+        with engine.connect() as conn:
+            conn.exec_driver_sql("SELECT * FROM missing_table")
+
+    limit = get_scheduler().total_slots
+    reason = autosizer.tick()
+    assert reason is not None and reason.startswith("decrease: 1 overload error")
+    assert get_scheduler().total_slots < limit
@@ -0,0 +1,11 @@
+"""Page modules stay within their import budget (tools/import_budget.py)."""
+
+import pytest
+
+from tools.import_budget import BUDGETS, check_budgets
+
+
+@pytest.mark.parametrize("module", list(BUDGETS))
+def test_module_stays_within_import_budget(module):
+    [result] = check_budgets({module: BUDGETS[module]}, repeat=3)
+    assert result["violations"] == []
@@ -0,0 +1,74 @@
+"""Incremental exports: planning and merging new days (utils/core/batch_export.py)."""
+
+import pandas as pd
+import pytest
+
+from utils.core.batch_export import merge_batches, merge_incremental, plan_incremental_export
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    # Same range
+    ("2024-01-01", "2024-01-31", {"mode": "reuse"}),
+    # Continues the day after the previous end
+    ("2024-01-01", "2024-02-10", {"mode": "append", "fetch_start": "2024-02-01", "fetch_end": "2024-02-10"}),
+    # Later start on a daily-grain source, same end
+    ("2024-01-15", "2024-01-31", {"mode": "slide"}),
+    # Starts on the day after the previous end: nothing to keep but still no gap
+    ("2024-02-01", "2024-02-05", {"mode": "slide", "fetch_start": "2024-02-01", "fetch_end": "2024-02-05"}),
+])
+def test_plan_reuses_a_previous_export_it_continues(start, end, expected):
+    assert plan_incremental_export("product_tracking", start, end, "2024-01-01", "2024-01-31") == expected
+
+
+@pytest.mark.parametrize("start, end", [
+    ("2024-02-02", "2024-02-10"),  # gap of one day
+    ("2023-12-31", "2024-02-10"),  # earlier start
+    ("2024-01-01", "2024-01-30"),  # shorter end
+])
+def test_plan_runs_a_full_export_when_the_ranges_do_not_connect(start, end):
+    plan = plan_incremental_export("product_tracking", start, end, "2024-01-01", "2024-01-31")
+
+    assert plan == {"mode": "full", "fetch_start": start, "fetch_end": end}
+
+
+def test_plan_does_not_slide_month_aggregated_sources():
+    assert plan_incremental_export("keyword_lab", "2024-01-15", "2024-02-10", "2024-01-01", "2024-01-31")["mode"] == "full"
+    assert plan_incremental_export("keyword_lab", "2024-01-01", "2024-02-10", "2024-01-01", "2024-01-31")["mode"] == "append"
+    assert plan_incremental_export("keyword_lab", "2024-01-01", "2024-01-31", None, None)["mode"] == "full"
+
+
+def _tracking(rows):
+    return pd.DataFrame(rows, columns=[
+        "keyword", "keyword_id", "product_name", "marketplace_name", "global_company_name", "storefront_name",
+        "created_datetime", "item_sold_l30d",
+    ])
+
+
+def test_slide_drops_the_days_before_the_new_start_and_appends_the_new_days():
+    row = ["shoe", 1, "p", "m", "c", "s"]
+    previous = _tracking([row + ["2024-01-14", 1], row + ["2024-01-15", 2], row + ["2024-01-31", 3]])
+    delta = _tracking([row + ["2024-02-01", 4]])
+
+    merged = merge_incremental(previous, delta, "product_tracking", "2024-01-15", "slide")
+
+    assert merged["created_datetime"].tolist() == ["2024-01-15", "2024-01-31", "2024-02-01"]
+    assert merged["item_sold_l30d"].tolist() == [2, 3, 4]
+
+
+def test_append_re_aggregates_the_month_the_ranges_share():
+    previous = pd.DataFrame({"keyword_id": [1, 2], "storefront_sid": [9, 9], "month": [1, 1], "cost": [10.0, 5.0]})
+    delta = pd.DataFrame({"keyword_id": [1, 1], "storefront_sid": [9, 9], "month": [1, 2], "cost": [2.0, 7.0]})
+
+    merged = merge_incremental(previous, delta, "keyword_lab", "2024-01-01", "append")
+
+    expected = merge_batches([previous, delta], "keyword_lab")
+    pd.testing.assert_frame_equal(merged, expected)
+    assert merged.set_index(["keyword_id", "month"])["cost"].to_dict() == {(1, 1): 12.0, (1, 2): 7.0, (2, 1): 5.0}
+
+
+def test_nothing_new_returns_the_previous_rows():
+    previous = pd.DataFrame({"keyword_id": [1], "storefront_sid": [9], "month": [1], "cost": [10.0]})
+
+    merged = merge_incremental(previous, None, "keyword_lab", "2024-01-01", "append")
+
+    pd.testing.assert_frame_equal(merged, previous)
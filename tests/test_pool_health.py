@@ -0,0 +1,73 @@
+"""Health sweep of utils/core/pool_health.py on a real SQLAlchemy QueuePool (SQLite file)."""
+
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+from utils.core import pool_health
+from utils.core.pool_health import PoolHealthChecker, check_idle_connections
+
+
+@pytest.fixture
+def engine(tmp_path):
+    created = []
+
+    def creator():
+        connection = sqlite3.connect(str(tmp_path / "health.db"), check_same_thread=False)
+        created.append(connection)
+        return connection
+
+    engine = create_engine("sqlite://", creator=creator, poolclass=QueuePool, pool_size=3, max_overflow=0)
+    engine.created = created
+    yield engine
+    engine.dispose()
+
+
+def _fill_pool(engine, size=3):
+    connections = [engine.pool.connect() for _ in range(size)]
+    for connection in connections:
+        connection.close()
+
+
+def test_sweep_evicts_dead_connections_through_checkout_events(engine):
+    _fill_pool(engine)
+    events = {"checkout": 0, "checkin": 0}
+    event.listen(engine, "checkout", lambda *args: events.__setitem__("checkout", events["checkout"] + 1))
+    event.listen(engine, "checkin", lambda *args: events.__setitem__("checkin", events["checkin"] + 1))
+
+    # Dies behind the pool's back, e.g. closed by the server
+    engine.created[1].close()
+
+    result = check_idle_connections(engine, "test")
+
+    assert result["checked"] == 3
+    assert result["evicted"] == 1
+    assert engine.pool.checkedin() == 3
+    assert engine.pool.checkedout() == 0
+    assert events == {"checkout": 3, "checkin": 3}
+    # The evicted connection is replaced on its next checkout
+    for _ in range(3):
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT 1").scalar() == 1
+
+
+def test_sweep_skips_recently_used_connections_and_does_not_count_as_use(engine, monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(pool_health, "time", SimpleNamespace(monotonic=lambda: clock.now, time=time.time))
+    checker = PoolHealthChecker(interval=60)
+    checker.watch(engine, "test")
+    _fill_pool(engine)
+
+    # Used 30s ago: nothing to ping
+    clock.now = 130.0
+    assert check_idle_connections(engine, "test", idle_seconds=60)["checked"] == 0
+    # Idle for 65s: the previous sweep's own checkins didn't count as a use
+    clock.now = 165.0
+    assert check_idle_connections(engine, "test", idle_seconds=60)["checked"] == 3
+    # Pinged just now
+    clock.now = 170.0
+    assert check_idle_connections(engine, "test", idle_seconds=60)["checked"] == 0
@@ -0,0 +1,76 @@
+"""Checkout metrics of utils/core/pool_telemetry.py on a real SQLAlchemy QueuePool (SQLite file)."""
+
+import threading
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from utils.core import database
+from utils.core.pool_telemetry import (
+    POOL_OVERFLOW_CHECKOUTS, POOL_TIMEOUTS, POOL_WAIT, instrument_engine, timed_checkout
+)
+
+LABEL = "telemetry_test"
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'telemetry.db'}"
+    engine = create_engine(
+        url, poolclass=QueuePool, pool_size=1, max_overflow=1, pool_timeout=0.2,
+        pool_logging_name=LABEL, connect_args={"check_same_thread": False}
+    )
+    instrument_engine(engine, LABEL)
+    yield engine
+    engine.dispose()
+
+
+def _count(metric):
+    return sum(v for key, v in metric.values().items() if key[0] == LABEL)
+
+
+def _waits():
+    return sum(state["count"] for key, state in POOL_WAIT.values().items() if key[0] == LABEL)
+
+
+def test_overflow_checkouts_and_timeouts_are_counted(engine):
+    overflow_before, timeouts_before, waits_before = _count(POOL_OVERFLOW_CHECKOUTS), _count(POOL_TIMEOUTS), _waits()
+
+    with timed_checkout(LABEL):
+        first = engine.connect()
+    with timed_checkout(LABEL):
+        second = engine.connect()
+    with pytest.raises(PoolTimeoutError):
+        with timed_checkout(LABEL):
+            engine.connect()
+    first.close()
+    second.close()
+
+    assert _count(POOL_OVERFLOW_CHECKOUTS) == overflow_before + 1
+    assert _count(POOL_TIMEOUTS) == timeouts_before + 1
+    assert _waits() == waits_before + 3
+
+
+def _waited_seconds():
+    return sum(state["sum"] for key, state in POOL_WAIT.values().items() if key[0] == LABEL)
+
+
+def test_get_connection_measures_the_wait_for_a_busy_pool(engine, monkeypatch):
+    monkeypatch.setitem(database._engines, LABEL, engine)
+    monkeypatch.setitem(database._session_factories, LABEL, sessionmaker(bind=engine))
+    held = [engine.connect(), engine.connect()]
+    threading.Timer(0.1, held[0].close).start()
+    waits_before, waited_before = _waits(), _waited_seconds()
+
+    with database.get_connection(LABEL) as db:
+        assert pd.read_sql(text("SELECT 1 AS x"), db.connection())["x"].tolist() == [1]
+
+    assert _waits() == waits_before + 1
+    assert _waited_seconds() - waited_before >= 0.05
+    held[1].close()
+    # The session's connection went back to the pool
+    assert engine.pool.checkedout() == 0
@@ -0,0 +1,29 @@
+"""Plan capture of the slow-query log (utils/core/slow_query_log.py)."""
+
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+
+from utils.core import database, slow_query_log
+from utils.core.scheduler import get_scheduler
+
+
+def test_plan_is_captured_on_the_query_engine_inside_a_bulk_slot(monkeypatch):
+    engine = create_engine("sqlite://")
+    opened = []
+
+    @contextmanager
+    def get_connection(name):
+        opened.append((name, get_scheduler().stats()["bulk_active"]))
+        with engine.connect() as conn:
+            yield SimpleNamespace(connection=lambda: conn)
+
+    monkeypatch.setattr(database, "get_connection", get_connection)
+    bulk_before = get_scheduler().stats()["bulk_active"]
+
+    plan = slow_query_log.capture_plan("select 1 where 1 = :x", {"x": 1}, "explain", engine="replica1")
+
+    assert plan
+    assert opened == [("replica1", bulk_before + 1)]
+    assert get_scheduler().stats()["bulk_active"] == bulk_before
@@ -0,0 +1,141 @@
+"""SQL rewriting helpers (utils/core/sql_rewrite.py)."""
+
+import sqlite3
+
+from utils.core.sql_rewrite import (
+    add_having_conditions, get_select_columns, project_columns, referenced_params, rewrite_date_ranges,
+    specialize_optional_filters
+)
+
+GROUPED = """
+select keyword, sum(cost) as cost
+from perf
+where day >= :start_date
+group by keyword
+order by cost desc
+"""
+
+
+def test_having_goes_after_group_by_and_before_order_by():
+    sql = add_having_conditions(GROUPED, ["cost >= :min_cost"])
+
+    assert sql.index("group by keyword") < sql.index("HAVING (cost >= :min_cost)") < sql.index("order by")
+
+
+def test_having_is_anded_with_an_existing_clause():
+    sql = add_having_conditions(
+        "select keyword, avg(volume) as volume from perf group by keyword having keyword is not null limit 10",
+        ["volume >= :min_volume", "volume < 100"],
+    )
+
+    assert "HAVING (keyword is not null) AND (volume >= :min_volume) AND (volume < 100)" in sql
+    assert sql.rstrip().endswith("limit 10")
+
+
+def test_having_goes_to_the_final_statement_of_a_with_query():
+    sql = add_having_conditions(
+        "with base as (select keyword, cost from perf group by keyword) select keyword, sum(cost) as cost from base group by keyword",
+        ["cost >= 1"],
+    )
+
+    assert "group by keyword) select" in sql
+    assert sql.rstrip().endswith("HAVING (cost >= 1)")
+
+
+PRODUCTS = """
+with base as (
+    select p.id as product_id, p.name as product_name, p.price, s.storefront_name, gc.name as company_name
+    from product p
+    join storefront s on s.id = p.storefront_id
+    left join global_company gc on gc.id = s.global_company_id
+    left join category c on c.id = p.category_id
+)
+select product_id, product_name, storefront_name, max(company_name) as company_name, avg(price) as price
+from base
+group by product_id, product_name, storefront_name
+"""
+
+
+def test_projection_drops_unused_items_and_prunable_left_joins():
+    sql = project_columns(PRODUCTS, ["price"], keep=["product_id"], prunable_joins=["gc", "c"])
+
+    assert get_select_columns(sql) == ["product_id", "product_name", "storefront_name", "price"]
+    # company_name was only needed by the removed output column: its join goes too
+    assert "company_name" not in sql and "global_company" not in sql
+    # c is not referenced at all, s is an inner join that can change the row count
+    assert "category" not in sql
+    assert "join storefront s" in sql
+
+
+def test_projection_keeps_joins_that_are_not_declared_prunable():
+    sql = project_columns(PRODUCTS, ["price"], keep=["product_id"], prunable_joins=[])
+
+    assert "company_name" not in get_select_columns(sql)
+    assert "left join global_company gc" in sql and "left join category c" in sql
+
+
+def test_projection_keeps_group_by_columns_and_leaves_distinct_alone():
+    # product_name etc. stay: GROUP BY refers to them
+    sql = project_columns(PRODUCTS, ["price"], keep=["product_id"])
+    assert "product_name" in get_select_columns(sql)
+
+    distinct = "select distinct keyword, storefront_name from perf"
+    assert project_columns(distinct, ["keyword"]) == distinct
+
+
+OPTIONAL = """
+select * from sos s
+where (:display_type is null or s.display_type = :display_type)
+  and (:product_position is null or s.product_position = :product_position)
+  AND s.timing = 'daily'
+"""
+
+
+def test_set_optional_filters_become_plain_predicates():
+    sql = specialize_optional_filters(OPTIONAL, null_params=[])
+
+    assert "where s.display_type = :display_type" in sql
+    assert "and s.product_position = :product_position" in sql
+    assert "is null" not in sql
+
+
+def test_null_optional_filters_are_removed():
+    sql = specialize_optional_filters(OPTIONAL, null_params=["display_type", "product_position"])
+
+    # A leading predicate becomes TRUE, a following one disappears with its AND
+    assert "where TRUE" in sql
+    assert "product_position" not in sql and "display_type" not in sql
+    assert "AND s.timing = 'daily'" in sql
+    assert referenced_params(sql) == set()
+
+
+def test_referenced_params_ignore_literals_and_comments():
+    sql = "select ':not_a_param', x::int from t -- :commented\nwhere a = :a /* :b */ and b = :c"
+
+    assert referenced_params(sql) == {"a", "c"}
+
+
+def test_date_ranges_become_half_open():
+    sql = rewrite_date_ranges(
+        "select 1 from perf p where date(p.created_datetime) between :start_date and :end_date "
+        "and day BETWEEN :start_date AND :end_date and note = 'x between :start_date and :end_date'"
+    )
+
+    assert "(p.created_datetime >= :start_date and p.created_datetime < :end_date_next)" in sql
+    assert "(day >= :start_date and day < :end_date_next)" in sql
+    # String literals are left alone
+    assert "note = 'x between :start_date and :end_date'" in sql
+    assert "date(" not in sql
+
+
+def test_half_open_range_includes_the_whole_end_day_and_nothing_after():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("create table perf (created_datetime text)")
+    conn.executemany("insert into perf values (?)", [
+        ("2023-12-31 23:59:59",), ("2024-01-01 00:00:00",), ("2024-01-31 18:30:00",), ("2024-02-01 00:00:00",),
+    ])
+    sql = rewrite_date_ranges("select created_datetime from perf where created_datetime between :start_date and :end_date")
+
+    rows = conn.execute(sql, {"start_date": "2024-01-01", "end_date_next": "2024-02-01"}).fetchall()
+
+    assert [r[0] for r in rows] == ["2024-01-01 00:00:00", "2024-01-31 18:30:00"]
@@ -0,0 +1,254 @@
+"""
+Micro-benchmarks for the Export Hot Paths
+
+Times and memory-profiles the pandas work every export does after the database returns:
+
+- merge: merge_batches on overlapping batch results
+- encode: convert_df_to_csv of the merged frame
+- dtype_arrow: Arrow result -> pandas conversion of the fetch path (decimal casts included)
+- dtype_compact: category compaction of dimension frames (dimension_cache._compact)
+- split_days: split_date_range_by_days for a one-year export at 1-day batches
+
+Frames come from tools.synthetic_data, so runs are reproducible and need no database.
+Each benchmark is timed with timeit (best and median of --repeat runs) and profiled with
+tracemalloc in a separate run (peak Python allocations, numpy/pandas buffers included).
+
+Results are written as JSON (default .export_state/benchmarks/<git commit>.json) and can
+be compared with an earlier run:
+
+    python -m tools.benchmarks                              # all sources, 10k and 1m rows
+    python -m tools.benchmarks --sizes 10k,1m,10m --sources keyword_lab
+    python -m tools.benchmarks --compare .export_state/benchmarks/abc1234.json
+
+With --compare the exit status is 1 if any benchmark got slower (or used more memory)
+than --threshold times the baseline.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from utils.config import STATE_DIR
+from utils.core.batch_export import merge_batches, split_date_range_by_days
+from tools.synthetic_data import ROW_COUNTS, generate_batches
+
+RESULTS_DIR = STATE_DIR / "benchmarks"
+DEFAULT_SOURCES = [
+    "keyword_lab", "keyword_performance", "product_tracking", "competition_landscape",
+    "storefront_optimization", "campaign_optimization", "ads_object_optimization",
+]
+BENCHMARKS = ["merge", "encode", "dtype_arrow", "dtype_compact", "split_days"]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent.parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(func: Callable[[], Any], repeat: int, prepare: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    """
+    Best/median wall time over `repeat` runs, then peak allocated memory of one more run.
+
+    `prepare` runs untimed before every run (for inputs a run consumes).
+    """
+    times = timeit.Timer(func, setup=prepare or 'pass').repeat(repeat=repeat, number=1)
+
+    if prepare:
+        prepare()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "best_seconds": round(min(times), 6),
+        "median_seconds": round(statistics.median(times), 6),
+        "peak_memory_mb": round(peak / (1024 * 1024), 3),
+    }
+
+
+# --- Benchmark setups: each returns (prepare or None, function to measure), or raises ImportError ---
+def _setup_merge(source: str, batches: List[pd.DataFrame], merged: pd.DataFrame):
+    return None, lambda: merge_batches(batches, source)
+
+
+def _setup_encode(source: str, batches: List[pd.DataFrame], merged: pd.DataFrame):
+    from utils.core.logic import convert_df_to_csv
+    return None, lambda: convert_df_to_csv(merged)
+
+
+def _setup_dtype_arrow(source: str, batches: List[pd.DataFrame], merged: pd.DataFrame):
+    import pyarrow as pa
+    from utils.core.logic import _arrow_to_pandas
+
+    tables = []
+
+    def prepare():
+        # Money metrics arrive as DECIMAL from the database. _arrow_to_pandas frees the
+        # table's buffers (self_destruct), so every run gets a fresh table.
+        table = pa.Table.from_pandas(merged, preserve_index=False)
+        for i, field in enumerate(table.schema):
+            if pa.types.is_floating(field.type):
+                table = table.set_column(i, field.name, table.column(i).cast(pa.decimal128(18, 4)))
+        tables.append(table)
+
+    return prepare, lambda: _arrow_to_pandas(tables.pop())
+
+
+def _setup_dtype_compact(source: str, batches: List[pd.DataFrame], merged: pd.DataFrame):
+    from utils.core.dimension_cache import _compact
+    frame = merged.reset_index().rename(columns={"index": "_row"})
+    return None, lambda: _compact(frame, "_row")
+
+
+def _setup_split_days(source: str, batches: List[pd.DataFrame], merged: pd.DataFrame):
+    return None, lambda: split_date_range_by_days("2024-01-01", "2024-12-31", batch_days=1)
+
+
+SETUPS = {
+    "merge": _setup_merge,
+    "encode": _setup_encode,
+    "dtype_arrow": _setup_dtype_arrow,
+    "dtype_compact": _setup_dtype_compact,
+    "split_days": _setup_split_days,
+}
+
+
+def run_benchmarks(
+    sources: List[str],
+    sizes: List[str],
+    benchmarks: List[str],
+    repeat: int = 3,
+    num_batches: int = 4,
+) -> List[Dict[str, Any]]:
+    """Run every benchmark for every (source, size); unavailable ones are recorded as skipped."""
+    results = []
+    for size in sizes:
+        rows = ROW_COUNTS[size]
+        for source in sources:
+            batches = generate_batches(source, rows, num_batches=num_batches)
+            merged = merge_batches(batches, source)
+            for name in benchmarks:
+                # split_days doesn't depend on the data, run it once per size
+                if name == "split_days" and source != sources[0]:
+                    continue
+                result = {"benchmark": name, "source": source, "size": size, "rows": rows}
+                try:
+                    prepare, func = SETUPS[name](source, batches, merged)
+                    result.update(measure(func, repeat, prepare))
+                    if result["best_seconds"] > 0:
+                        result["rows_per_second"] = round(rows / result["best_seconds"])
+                except ImportError as e:
+                    result["skipped"] = f"{type(e).__name__}: {e}"
+                print(_format_result(result), flush=True)
+                results.append(result)
+            del batches, merged
+    return results
+
+
+def _format_result(result: Dict[str, Any]) -> str:
+    label = f"{result['benchmark']:<14} {result['source']:<26} {result['size']:>4}"
+    if "skipped" in result:
+        return f"{label}  skipped ({result['skipped']})"
+    return (f"{label}  best {result['best_seconds']:>9.4f}s  median {result['median_seconds']:>9.4f}s  "
+            f"peak {result['peak_memory_mb']:>9.1f} MB")
+
+
+def _result_key(result: Dict[str, Any]) -> tuple:
+    return result["benchmark"], result["source"], result["size"]
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Compare two result files.
+
+    Returns:
+        Descriptions of the regressions (slower or more memory than threshold x baseline)
+    """
+    before = {_result_key(r): r for r in baseline["results"] if "skipped" not in r}
+    regressions = []
+    print(f"\nCompared to {baseline['meta'].get('commit')} ({baseline['meta'].get('created_at')}):")
+    for result in current["results"]:
+        base = before.get(_result_key(result))
+        if base is None or "skipped" in result:
+            continue
+        time_ratio = result["best_seconds"] / base["best_seconds"] if base["best_seconds"] else 1.0
+        memory_ratio = result["peak_memory_mb"] / base["peak_memory_mb"] if base["peak_memory_mb"] else 1.0
+        flag = ""
+        if time_ratio > threshold or memory_ratio > threshold:
+            flag = "  <-- REGRESSION"
+            regressions.append(f"{' '.join(_result_key(result))}: time x{time_ratio:.2f}, memory x{memory_ratio:.2f}")
+        print(f"  {result['benchmark']:<14} {result['source']:<26} {result['size']:>4}  "
+              f"time x{time_ratio:.2f}  memory x{memory_ratio:.2f}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the pandas hot paths of exports.")
+    parser.add_argument("--sources", default=",".join(DEFAULT_SOURCES), help="Comma-separated data sources")
+    parser.add_argument("--sizes", default="10k,1m", help=f"Comma-separated sizes ({', '.join(ROW_COUNTS)})")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS), help="Comma-separated benchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark")
+    parser.add_argument("--batches", type=int, default=4, help="Batches per synthetic export")
+    parser.add_argument("--output", type=Path, help="Result file (default: .export_state/benchmarks/<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.10, help="Ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    sources = [s for s in args.sources.split(",") if s]
+    sizes = [s for s in args.sizes.split(",") if s]
+    benchmarks = [b for b in args.benchmarks.split(",") if b]
+    for value, allowed, what in ((sizes, ROW_COUNTS, "size"), (benchmarks, SETUPS, "benchmark")):
+        unknown = [v for v in value if v not in allowed]
+        if unknown:
+            parser.error(f"Unknown {what}(s): {unknown}. Available: {list(allowed)}")
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "created_at": datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "batches": args.batches,
+        },
+        "results": run_benchmarks(sources, sizes, benchmarks, args.repeat, args.batches),
+    }
+
+    output = args.output or RESULTS_DIR / f"{commit or datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding='utf-8'))
+        regressions = compare_results(baseline, report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above x{args.threshold}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
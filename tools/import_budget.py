@@ -0,0 +1,123 @@
+"""
+Import-Time Budget Check
+
+Imports the modules every page loads in a fresh interpreter with `python -X importtime`
+and checks them against a budget:
+
+- cumulative import time of the module (best of --repeat runs) must stay under max_ms
+- modules listed as forbidden must not be imported at all (e.g. SQLAlchemy and the
+  database driver are loaded by the first query, not by importing a page)
+
+    python -m tools.import_budget
+    python -m tools.import_budget --repeat 5 --json
+
+Exit status is 1 if any budget is exceeded, so the check can run in CI next to the SQL
+analyzer and the benchmarks. tests/test_import_budget.py runs the same check under pytest.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Loaded by the first query (utils.core.database), never by importing a page
+_DB_STACK = ["sqlalchemy", "singlestoredb"]
+# pandas >= 3 imports pyarrow itself, so pyarrow is only forbidden where pandas is
+_NO_DATAFRAMES = ["pandas", "pyarrow", "streamlit"]
+
+BUDGETS: Dict[str, Dict[str, Any]] = {
+    "utils.config": {"max_ms": 50, "forbidden": _DB_STACK + _NO_DATAFRAMES},
+    "utils.core.database": {"max_ms": 50, "forbidden": _DB_STACK + _NO_DATAFRAMES},
+    "utils.core.logic": {"max_ms": 2000, "forbidden": _DB_STACK},
+    "utils.ui.page_config": {"max_ms": 3000, "forbidden": _DB_STACK},
+}
+
+
+def measure_import(module: str) -> Dict[str, Any]:
+    """
+    Import `module` in a new interpreter.
+
+    Returns:
+        {"cumulative_ms": float, "imported": [module names]} or {"error": message}
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=PROJECT_ROOT
+    )
+    if result.returncode != 0:
+        last_line = (result.stderr.strip().splitlines() or ["import failed"])[-1]
+        return {"error": last_line}
+
+    cumulative_us: Optional[int] = None
+    imported: List[str] = []
+    for line in result.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) != 3 or not parts[1].isdigit():
+            continue
+        name = parts[2]
+        imported.append(name)
+        if name == module:
+            cumulative_us = int(parts[1])
+    return {"cumulative_ms": (cumulative_us or 0) / 1000, "imported": imported}
+
+
+def check_budgets(budgets: Dict[str, Dict[str, Any]], repeat: int = 3) -> List[Dict[str, Any]]:
+    """Measure every module and list its budget violations."""
+    results = []
+    for module, budget in budgets.items():
+        runs = [measure_import(module) for _ in range(max(1, repeat))]
+        errors = [r["error"] for r in runs if "error" in r]
+        if errors:
+            results.append({"module": module, "error": errors[0], "violations": [f"import failed: {errors[0]}"]})
+            continue
+
+        best_ms = min(r["cumulative_ms"] for r in runs)
+        top_level = {name.split(".")[0] for name in runs[0]["imported"]}
+        violations = []
+        if best_ms > budget["max_ms"]:
+            violations.append(f"import takes {best_ms:.0f} ms (budget {budget['max_ms']} ms)")
+        for forbidden in budget.get("forbidden", []):
+            if forbidden in top_level:
+                violations.append(f"imports {forbidden}")
+        results.append({"module": module, "best_ms": round(best_ms, 1), "max_ms": budget["max_ms"],
+                        "violations": violations})
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check the import time of page modules against a budget.")
+    parser.add_argument("modules", nargs="*", help="Modules to check (default: all budgeted modules)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per module (the fastest counts)")
+    parser.add_argument("--budget", type=Path, help="JSON file replacing the built-in budgets")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    budgets = json.loads(args.budget.read_text(encoding='utf-8')) if args.budget else BUDGETS
+    if args.modules:
+        unknown = [m for m in args.modules if m not in budgets]
+        if unknown:
+            parser.error(f"No budget for: {unknown}. Budgeted: {list(budgets)}")
+        budgets = {m: budgets[m] for m in args.modules}
+
+    results = check_budgets(budgets, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            status = "FAIL" if r["violations"] else "ok"
+            timing = f"{r['best_ms']:>8.1f} ms / {r['max_ms']} ms" if "best_ms" in r else f"{'-':>8}"
+            print(f"{status:<5} {r['module']:<24} {timing}")
+            for violation in r["violations"]:
+                print(f"      - {violation}")
+    return 1 if any(r["violations"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
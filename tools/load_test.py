@@ -0,0 +1,395 @@
+"""
+End-to-end Load Test against a Local Stand-in Database
+
+Simulates N concurrent users going through the same steps as the UI (row count, 500-row
+preview, batched export, CSV download) with the functions of utils/core/logic.py, on a
+stand-in SQLite database (tools/stand_in_db.py). Reports throughput, p50/p95/p99 latency
+per step and how saturated the connection pool and scheduler lanes were, so pool and
+batch settings can be sized from data:
+
+    python -m tools.load_test --users 20 --duration 120 --pool-size 10 --max-overflow 5
+    python -m tools.load_test --db stand_in.db --users 50 --bulk-concurrency 4 --batch-days 3
+    python -m tools.load_test --replicas 1          # primary + a copy as read replica
+
+Without --db a temporary stand-in is created (--storefronts/--keywords/--days set its
+scale). Every run uses its own state directory, so learned costs and artifacts of the
+real app are not touched. The query cache is off by default (every request hits the
+database); --cache memory measures the cached path instead. --replicas N copies the
+stand-in N times and configures the copies as read replicas (DB_REPLICA_URLS), so the
+routing of bulk batches and interactive queries can be measured on one machine.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from tools.stand_in_db import create_stand_in, describe_stand_in, register_stand_in
+
+STEPS = ("count", "preview", "export", "download", "request")
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile (None for no values)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def configure_environment(args, db_path: Path, state_dir: Path, replica_paths: List[Path] = ()) -> None:
+    """Point the app's settings at the stand-in. Must run before utils modules are imported."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["DB_REPLICA_URLS"] = ",".join(f"sqlite:///{path}" for path in replica_paths)
+    os.environ["DB_POOL_SIZE"] = str(args.pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(args.max_overflow)
+    os.environ["DB_POOL_TIMEOUT"] = str(args.pool_timeout)
+    os.environ["BULK_MAX_CONCURRENCY"] = str(args.bulk_concurrency)
+    os.environ["INTERACTIVE_RESERVED_SLOTS"] = str(args.interactive_reserved)
+    os.environ["EXPORT_FETCH_ENGINE"] = "pandas"
+    os.environ["EXPORT_CACHE_BACKEND"] = "memory"
+    os.environ["EXPORT_STATE_DIR"] = str(state_dir)
+
+
+class PoolSampler(threading.Thread):
+    """Samples pool checkouts and scheduler queues at a fixed interval."""
+
+    def __init__(self, engine, scheduler, capacity: int, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.scheduler = scheduler
+        self.capacity = capacity
+        self.interval = interval
+        self.samples: List[Dict[str, int]] = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            stats = self.scheduler.stats()
+            self.samples.append({
+                "checked_out": self.engine.pool.checkedout(),
+                "interactive_waiting": stats["interactive_waiting"],
+                "bulk_waiting": stats["bulk_waiting"],
+            })
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.samples:
+            return {}
+        checked_out = [s["checked_out"] for s in self.samples]
+        return {
+            "capacity": self.capacity,
+            "max_checked_out": max(checked_out),
+            "mean_checked_out": round(statistics.mean(checked_out), 2),
+            "saturated_share": round(sum(c >= self.capacity for c in checked_out) / len(checked_out), 4),
+            "max_interactive_waiting": max(s["interactive_waiting"] for s in self.samples),
+            "max_bulk_waiting": max(s["bulk_waiting"] for s in self.samples),
+            "samples": len(self.samples),
+        }
+
+
+class SimulatedUser(threading.Thread):
+    """One user repeatedly requesting exports with random sources, storefronts and date ranges."""
+
+    def __init__(self, user_id: int, args, stand_in: Dict[str, Any], deadline: float, recorder):
+        super().__init__(daemon=True)
+        self.user_id = f"loadtest-user-{user_id}"
+        self.args = args
+        self.stand_in = stand_in
+        self.deadline = deadline
+        self.recorder = recorder
+        self.rng = random.Random(args.seed * 10_000 + user_id)
+
+    def build_request(self) -> Dict[str, Any]:
+        from utils.ui.input_config import DATA_SOURCE_CONFIGS, INPUT_FIELDS
+
+        data_source = self.rng.choice(self.args.sources)
+        workspace_id = self.rng.choice(list(self.stand_in["workspaces"]))
+        storefronts = self.stand_in["workspaces"][workspace_id]
+        chosen = self.rng.sample(storefronts, self.rng.randint(1, min(self.args.max_storefronts, len(storefronts))))
+
+        first = date.fromisoformat(self.stand_in["start_date"])
+        last = date.fromisoformat(self.stand_in["end_date"])
+        length = self.rng.randint(1, min(self.args.max_days, (last - first).days + 1))
+        end = last - timedelta(days=self.rng.randint(0, (last - first).days + 1 - length))
+        start = end - timedelta(days=length - 1)
+
+        input_values = {
+            "workspace_id": str(workspace_id),
+            "storefront_ids": ",".join(str(s) for s in chosen),
+            "start_date": start,
+            "end_date": end,
+            "date_range": (start, end),
+        }
+        for field_name in DATA_SOURCE_CONFIGS[data_source]["inputs"]:
+            field_config = INPUT_FIELDS.get(field_name, {})
+            if field_config.get("type") == "select":
+                input_values[field_name] = field_config.get("default", "None")
+        return {"data_source": data_source, "input_values": input_values}
+
+    def run_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        from utils.validation.input_validator import validate_data_source_inputs, build_sql_params
+        from utils.core.logic import get_data, plan_export_batches, run_batched_export, convert_df_to_csv
+        from utils.core.cost_model import plan_admission
+
+        data_source = request["data_source"]
+        errors = validate_data_source_inputs(data_source, request["input_values"])
+        if errors:
+            raise ValueError("; ".join(errors))
+        sql_params = build_sql_params(data_source, request["input_values"])
+        timings = {}
+
+        started = time.perf_counter()
+        count_df = get_data('count', data_source, **sql_params)
+        num_row = int(count_df.iloc[0, 0]) if not count_df.empty else 0
+        timings["count"] = time.perf_counter() - started
+        if num_row == 0:
+            return {"timings": timings, "rows": 0}
+
+        step = time.perf_counter()
+        get_data('data', data_source, limit=500, **sql_params)
+        timings["preview"] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        if sql_params.get('start_date') and sql_params.get('end_date'):
+            admission = plan_admission(data_source, num_row, sql_params['start_date'], sql_params['end_date'])
+            batch_days = min(self.args.batch_days, admission.get('batch_days') or self.args.batch_days)
+            _, batches = plan_export_batches(data_source, batch_days=batch_days, **sql_params)
+            df = run_batched_export(data_source, batches, user_id=self.user_id, **sql_params)
+        else:
+            df = get_data('data', data_source, **sql_params)
+        timings["export"] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        if df is not None:
+            convert_df_to_csv(df, data_source)
+        timings["download"] = time.perf_counter() - step
+        return {"timings": timings, "rows": 0 if df is None else len(df)}
+
+    def run(self):
+        while time.time() < self.deadline:
+            request = self.build_request()
+            started = time.perf_counter()
+            try:
+                result = self.run_request(request)
+                result["timings"]["request"] = time.perf_counter() - started
+                self.recorder.record(request["data_source"], result)
+            except Exception as e:
+                self.recorder.record_error(request["data_source"], e)
+            if self.args.think_time > 0:
+                time.sleep(self.rng.expovariate(1 / self.args.think_time))
+
+
+class Recorder:
+    """Thread-safe collection of step timings and errors."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.timings_by_source: Dict[str, List[float]] = defaultdict(list)
+        self.completed = 0
+        self.rows = 0
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.first_error: Optional[str] = None
+
+    def record(self, data_source: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self.completed += 1
+            self.rows += result["rows"]
+            for step, seconds in result["timings"].items():
+                self.timings[step].append(seconds)
+            self.timings_by_source[data_source].append(result["timings"]["request"])
+
+    def record_error(self, data_source: str, error: Exception) -> None:
+        with self._lock:
+            self.errors[f"{data_source}: {type(error).__name__}"] += 1
+            if self.first_error is None:
+                self.first_error = traceback.format_exc()
+
+
+def _latency_summary(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def no_cache_backend():
+    """Cache backend that never hits, so every query reaches the database."""
+    from utils.core.cache_backend import CacheBackend, MISSING
+
+    class NoCacheBackend(CacheBackend):
+        def get(self, key):
+            return MISSING
+
+        def set(self, key, value, ttl=None):
+            pass
+
+        def delete(self, key):
+            pass
+
+        def clear(self):
+            pass
+
+    return NoCacheBackend()
+
+
+def run_load_test(args) -> Dict[str, Any]:
+    """Create/open the stand-in, run the simulated users and collect the report."""
+    work_dir = Path(tempfile.mkdtemp(prefix="export_load_test_"))
+    if args.db:
+        db_path = Path(args.db).resolve()
+        stand_in = describe_stand_in(db_path)
+    else:
+        db_path = work_dir / "stand_in.db"
+        print(f"Creating stand-in database {db_path} ...", flush=True)
+        stand_in = create_stand_in(db_path, workspaces=args.workspaces, storefronts=args.storefronts,
+                                   keywords=args.keywords, days=args.days, seed=args.seed)
+
+    replica_paths = []
+    for i in range(1, args.replicas + 1):
+        replica_paths.append(work_dir / f"replica{i}.db")
+        shutil.copyfile(db_path, replica_paths[-1])
+
+    configure_environment(args, db_path, work_dir / "state", replica_paths)
+    from utils.core import database
+    from utils.core.scheduler import get_scheduler
+    from utils.core.cache_backend import set_cache_backend, MemoryCacheBackend
+    from utils.core.logic import clear_query_templates
+    from utils.core.routing import get_router
+
+    for name in database.engine_names():
+        register_stand_in(database.get_engine(name))
+    clear_query_templates()
+    if args.cache == "off":
+        set_cache_backend(no_cache_backend())
+    else:
+        set_cache_backend(MemoryCacheBackend())
+
+    capacity = args.pool_size + args.max_overflow
+    sampler = PoolSampler(database.get_engine(), get_scheduler(), capacity)
+    recorder = Recorder()
+    print(f"Running {args.users} users for {args.duration}s on {', '.join(args.sources)} "
+          f"(pool {args.pool_size}+{args.max_overflow}, bulk concurrency {args.bulk_concurrency})", flush=True)
+
+    started = time.time()
+    deadline = started + args.duration
+    sampler.start()
+    users = [SimulatedUser(i, args, stand_in, deadline, recorder) for i in range(args.users)]
+    for user in users:
+        user.start()
+        time.sleep(args.ramp_up / max(args.users, 1))
+    for user in users:
+        user.join()
+    elapsed = time.time() - started
+    sampler.stop()
+
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "database": str(db_path),
+        "elapsed_seconds": round(elapsed, 2),
+        "completed_requests": recorder.completed,
+        "throughput_per_minute": round(recorder.completed / elapsed * 60, 2) if elapsed else None,
+        "exported_rows": recorder.rows,
+        "errors": dict(recorder.errors),
+        "first_error": recorder.first_error,
+        "latency_seconds": {step: _latency_summary(recorder.timings.get(step, [])) for step in STEPS},
+        "request_latency_by_source": {
+            source: _latency_summary(values) for source, values in recorder.timings_by_source.items()
+        },
+        "pool": sampler.summary(),
+        "routing": get_router().status() if replica_paths else None,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    def fmt(value):
+        return "-" if value is None else f"{value:.3f}"
+
+    print(f"\nCompleted {report['completed_requests']} requests in {report['elapsed_seconds']}s "
+          f"({report['throughput_per_minute']}/min, {report['exported_rows']:,} rows exported)")
+    print(f"{'step':<10} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for step, s in report["latency_seconds"].items():
+        print(f"{step:<10} {s['count']:>6} {fmt(s['p50']):>9} {fmt(s['p95']):>9} {fmt(s['p99']):>9} {fmt(s['max']):>9}")
+    pool = report["pool"]
+    if pool:
+        print(f"Pool: max {pool['max_checked_out']}/{pool['capacity']} connections checked out, "
+              f"mean {pool['mean_checked_out']}, saturated {pool['saturated_share']:.1%} of the time; "
+              f"max waiting interactive {pool['max_interactive_waiting']}, bulk {pool['max_bulk_waiting']}")
+    for engine in report.get("routing") or []:
+        print(f"Engine {engine['engine']} ({engine['role']}): {engine['routed_queries']} queries"
+              + ("" if engine["healthy"] else f", down ({engine['last_error']})"))
+    if report["errors"]:
+        print(f"Errors: {report['errors']}")
+        print(report["first_error"])
+
+
+def main(argv=None) -> int:
+    from utils.ui.input_config import DATA_SOURCE_CONFIGS
+    from tools.sql_analyzer import SQL_DIR
+
+    default_sources = [
+        s for s, config in DATA_SOURCE_CONFIGS.items()
+        if "date_range" in config["inputs"] and (SQL_DIR / f"{s}_data.sql").exists()
+    ]
+    parser = argparse.ArgumentParser(description="Load-test the export path against a local stand-in database.")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run")
+    parser.add_argument("--ramp-up", type=float, default=5, help="Seconds over which users start")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean pause between a user's requests")
+    parser.add_argument("--sources", default=",".join(default_sources), help="Comma-separated data sources")
+    parser.add_argument("--max-storefronts", type=int, default=5, help="Max storefronts per request")
+    parser.add_argument("--max-days", type=int, default=31, help="Max date range length per request")
+    parser.add_argument("--batch-days", type=int, default=7, help="Batch size of exports")
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--max-overflow", type=int, default=5)
+    parser.add_argument("--pool-timeout", type=int, default=45)
+    parser.add_argument("--bulk-concurrency", type=int, default=4)
+    parser.add_argument("--interactive-reserved", type=int, default=2)
+    parser.add_argument("--cache", choices=["off", "memory"], default="off")
+    parser.add_argument("--db", help="Existing stand-in file (default: create a temporary one)")
+    parser.add_argument("--replicas", type=int, default=0, help="Copies of the stand-in used as read replicas")
+    parser.add_argument("--workspaces", type=int, default=2, help="Scale of a new stand-in")
+    parser.add_argument("--storefronts", type=int, default=10, help="Scale of a new stand-in (per workspace)")
+    parser.add_argument("--keywords", type=int, default=100, help="Scale of a new stand-in (per workspace)")
+    parser.add_argument("--days", type=int, default=60, help="Scale of a new stand-in")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    args.sources = [s for s in args.sources.split(",") if s]
+    unknown = [s for s in args.sources if s not in DATA_SOURCE_CONFIGS]
+    if unknown:
+        parser.error(f"Unknown data source(s): {unknown}. Available: {default_sources}")
+    if args.interactive_reserved >= args.pool_size + args.max_overflow:
+        parser.error("--interactive-reserved must be smaller than --pool-size + --max-overflow")
+
+    report = run_load_test(args)
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, default=str), encoding='utf-8')
+        print(f"Report written to {args.output}")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
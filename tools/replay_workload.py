@@ -0,0 +1,209 @@
+"""
+Workload Replay
+
+Re-issues a recorded workload log (EXPORT_WORKLOAD_LOG, see utils/core/workload_log.py)
+against the configured database (DB_* settings or DATABASE_URL, including a stand-in from
+tools/stand_in_db.py) through the same logic functions as the UI:
+
+- count   -> get_data('count')
+- preview -> get_data('data', limit=500)
+- export  -> plan_export_batches + run_batched_export with the recorded batch size
+
+Requests are started at their recorded offsets divided by --speed (1 = original pacing,
+10 = ten times faster, 0 = all at once as fast as the workers allow). Requests of one
+recorded session run in the same scheduler "user", so fair sharing behaves as it did.
+
+    python -m tools.replay_workload workload.jsonl --speed 10
+    DATABASE_URL=sqlite:///stand_in.db EXPORT_FETCH_ENGINE=pandas \\
+        python -m tools.replay_workload workload.jsonl --speed 0 --shift-dates --output replay.json
+
+The report compares replayed latencies (p50/p95/p99 per event) with the recorded ones.
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from tools.load_test import percentile, no_cache_backend
+
+
+def shift_record_dates(record: Dict[str, Any], today: Optional[date] = None) -> Dict[str, Any]:
+    """Move a record's date range by the days between its recording and today (keeps 'last N days' shapes)."""
+    params = dict(record["params"])
+    if not params.get("start_date") or not params.get("end_date"):
+        return params
+    recorded_day = datetime.fromtimestamp(record["ts"]).date()
+    offset = (today or date.today()) - recorded_day
+    for key in ("start_date", "end_date"):
+        params[key] = (date.fromisoformat(str(params[key])[:10]) + offset).strftime('%Y-%m-%d')
+    return params
+
+
+def replay_record(record: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute one recorded request; returns duration and row count."""
+    from utils.core.logic import get_data, plan_export_batches, run_batched_export
+
+    event, data_source = record["event"], record["data_source"]
+    user_id = f"replay:{record.get('session') or 'anonymous'}"
+    started = time.perf_counter()
+
+    if event == "count":
+        df = get_data('count', data_source, **params)
+        rows = int(df.iloc[0, 0]) if not df.empty else 0
+    elif event == "preview":
+        df = get_data('data', data_source, limit=500, **params)
+        rows = len(df) if df is not None else 0
+    elif params.get("start_date") and params.get("end_date"):
+        _, batches = plan_export_batches(data_source, batch_days=record.get("batch_days") or 7, **params)
+        df = run_batched_export(data_source, batches, user_id=user_id, **params)
+        rows = len(df) if df is not None else 0
+    else:
+        df = get_data('data', data_source, **params)
+        rows = len(df) if df is not None else 0
+
+    return {"duration": time.perf_counter() - started, "rows": rows}
+
+
+def _latencies(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
+
+
+def replay(
+    records: List[Dict[str, Any]],
+    speed: float = 1.0,
+    max_workers: int = 32,
+    shift_dates: bool = False,
+) -> Dict[str, Any]:
+    """
+    Replay records at the given pacing.
+
+    Returns:
+        Report with recorded vs replayed latencies per event, row count mismatches and errors
+    """
+    records = sorted(records, key=lambda r: r["ts"])
+    if not records:
+        return {"requests": 0}
+
+    lock = threading.Lock()
+    replayed: Dict[str, List[float]] = defaultdict(list)
+    recorded: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    row_mismatches = 0
+
+    def run(record):
+        nonlocal row_mismatches
+        params = shift_record_dates(record) if shift_dates else record["params"]
+        try:
+            result = replay_record(record, params)
+        except Exception as e:
+            with lock:
+                errors[f"{record['event']} {record['data_source']}: {type(e).__name__}"] += 1
+            return
+        with lock:
+            replayed[record["event"]].append(result["duration"])
+            if record.get("duration") is not None:
+                recorded[record["event"]].append(record["duration"])
+            if not shift_dates and record.get("rows") is not None and record["rows"] != result["rows"]:
+                row_mismatches += 1
+
+    first_ts = records[0]["ts"]
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for record in records:
+            if speed > 0:
+                wait = (record["ts"] - first_ts) / speed - (time.time() - started)
+                if wait > 0:
+                    time.sleep(wait)
+            executor.submit(run, record)
+    elapsed = time.time() - started
+
+    return {
+        "requests": len(records),
+        "recorded_span_seconds": round(records[-1]["ts"] - first_ts, 2),
+        "elapsed_seconds": round(elapsed, 2),
+        "speed": speed,
+        "replayed": {event: _latencies(values) for event, values in replayed.items()},
+        "recorded": {event: _latencies(values) for event, values in recorded.items()},
+        "row_mismatches": row_mismatches,
+        "errors": dict(errors),
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    def fmt(value):
+        return "-" if value is None else f"{value:.3f}"
+
+    print(f"\nReplayed {report['requests']} requests in {report.get('elapsed_seconds')}s "
+          f"(recorded over {report.get('recorded_span_seconds')}s, speed {report.get('speed')})")
+    print(f"{'event':<8} {'n':>6} {'p50 rec':>9} {'p50 now':>9} {'p95 rec':>9} {'p95 now':>9} {'p99 rec':>9} {'p99 now':>9}")
+    for event, now in report.get("replayed", {}).items():
+        rec = report["recorded"].get(event, {})
+        print(f"{event:<8} {now['count']:>6} {fmt(rec.get('p50')):>9} {fmt(now['p50']):>9} "
+              f"{fmt(rec.get('p95')):>9} {fmt(now['p95']):>9} {fmt(rec.get('p99')):>9} {fmt(now['p99']):>9}")
+    if report.get("row_mismatches"):
+        print(f"{report['row_mismatches']} request(s) returned a different row count than recorded")
+    if report.get("errors"):
+        print(f"Errors: {report['errors']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a recorded export workload.")
+    parser.add_argument("log", type=Path, help="Workload log (JSON lines)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Pacing factor (1 = original, 0 = no waits)")
+    parser.add_argument("--max-workers", type=int, default=32, help="Max requests in flight")
+    parser.add_argument("--events", default="count,preview,export", help="Comma-separated events to replay")
+    parser.add_argument("--sources", help="Only replay these data sources (comma-separated)")
+    parser.add_argument("--shift-dates", action="store_true", help="Move date ranges to end relative to today")
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    parser.add_argument("--include-artifact-hits", action="store_true",
+                        help="Also replay exports that were served from the artifact store")
+    parser.add_argument("--cache", choices=["off", "configured"], default="off",
+                        help="off: every request reaches the database; configured: use EXPORT_CACHE_BACKEND")
+    parser.add_argument("--output", type=Path, help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    from utils.core.workload_log import read_workload
+
+    events = set(args.events.split(","))
+    sources = set(args.sources.split(",")) if args.sources else None
+    records = [
+        r for r in read_workload(args.log)
+        if r["event"] in events
+        and (sources is None or r["data_source"] in sources)
+        and (args.include_artifact_hits or r.get("status") != "artifact")
+    ]
+    if args.limit:
+        records = records[:args.limit]
+
+    from utils.core import database
+    from utils.core.cache_backend import set_cache_backend
+    for name in database.engine_names():
+        if database.get_engine_url(name).startswith("sqlite"):
+            from tools.stand_in_db import register_stand_in
+            register_stand_in(database.get_engine(name))
+    if args.cache == "off":
+        set_cache_backend(no_cache_backend())
+
+    print(f"Replaying {len(records)} requests from {args.log} (speed {args.speed})", flush=True)
+    report = replay(records, speed=args.speed, max_workers=args.max_workers, shift_dates=args.shift_dates)
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+        print(f"Report written to {args.output}")
+    return 1 if report.get("errors") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
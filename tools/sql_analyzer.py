@@ -0,0 +1,304 @@
+"""
+Static Performance Analyzer for data_logic/sql
+
+Checks the SQL of every registered data source (DATA_SOURCE_CONFIGS) for patterns that
+make exports slow, and reports them with file and line:
+
+- function-wrapped-filter: a function around a filtered column (`date(col) = ...`),
+  which prevents index / segment elimination
+- final-order-by: ORDER BY on the full result of the final statement (exports don't
+  need ordered rows, the database has to sort everything before streaming)
+- distinct-subquery-join: `JOIN (SELECT DISTINCT ...)`, a derived table materialized
+  per query (join the source table or use EXISTS instead)
+- non-aggregated-column: a select item that is neither aggregated nor in GROUP BY,
+  so the value is picked from an arbitrary row
+- hardcoded-literal: fixed dates or IDs instead of bound parameters
+
+By default the queries are checked as the SQL loader runs them (optional filters
+specialized, date ranges rewritten, see utils/core/sql_rewrite.py); --raw checks the
+files as written. Line numbers are the same in both modes.
+
+Optionally, EXPLAIN plans can be compared against a JSON baseline on a local stand-in
+database, so plan regressions show up before they ship.
+
+Usage:
+    python -m tools.sql_analyzer                          # all sources
+    python -m tools.sql_analyzer keyword_lab              # one source
+    python -m tools.sql_analyzer --raw --strict           # files as written, fail on warnings
+    python -m tools.sql_analyzer --database-url sqlite:///stand_in.db \\
+        --explain-baseline tools/explain_baseline.json [--update-baseline]
+
+A stand-in database can be created with `python -m tools.stand_in_db create stand_in.db`.
+
+Exit status is 1 when an error-level finding (or, with --strict, any finding) or a
+plan difference is reported.
+"""
+
+import argparse
+import difflib
+import json
+import re
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from utils.ui.input_config import DATA_SOURCE_CONFIGS
+from utils.core.sql_rewrite import (
+    split_statements, describe_select, line_of, select_item_alias,
+    prepare_template, referenced_params, inline_id_list, mask_sql
+)
+
+SQL_DIR = Path(__file__).resolve().parent.parent / "data_logic" / "sql"
+QUERY_TYPES = ("data", "count", "fact")
+
+RULES = {
+    "function-wrapped-filter": "warning",
+    "final-order-by": "warning",
+    "distinct-subquery-join": "warning",
+    "non-aggregated-column": "warning",
+    "hardcoded-literal": "error",
+}
+
+_WRAPPED_FILTER = re.compile(
+    r'\b(date|month|year|day|week|lower|upper|trim|cast|convert|coalesce|ifnull)\s*\(\s*[\w.`]+'
+    r'(?:\s+as\s+\w+)?\s*\)\s*(=|<>|!=|<=|>=|<|>|\bbetween\b|\bin\b|\blike\b)',
+    re.IGNORECASE
+)
+_DISTINCT_JOIN = re.compile(r'\bjoin\s*\(\s*select\s+distinct\b', re.IGNORECASE)
+_DATE_LITERAL = re.compile(r"'\d{4}-\d{2}-\d{2}(?:[ T][\d:.]+)?'")
+_ID_LITERAL = re.compile(r'\b(?:\w+\.)?(?:id|\w+_id)\s*=\s*\d+\b', re.IGNORECASE)
+_AGGREGATE = re.compile(
+    r'\b(sum|avg|min|max|count|group_concat|any_value|approx_count_distinct|stddev|variance)\s*\(',
+    re.IGNORECASE
+)
+_LITERAL = re.compile(r"^\s*(?:'[^']*'|\"[^\"]*\"|-?\d+(?:\.\d+)?|null|true|false)\s*$", re.IGNORECASE)
+
+
+def _normalize(expr: str) -> str:
+    return re.sub(r'[\s`]+', '', expr).lower()
+
+
+def _strip_alias(item: str) -> str:
+    """Expression of a select item without its alias (explicit `AS x` or implicit `expr x`)."""
+    item = item.strip()
+    alias = select_item_alias(item)
+    if alias:
+        item = re.sub(rf'\s+(?:as\s+)?[`"]?{re.escape(alias)}[`"]?$', '', item, flags=re.IGNORECASE)
+    return item
+
+
+def _finding(path: Path, sql: str, offset: int, rule: str, message: str) -> Dict[str, Any]:
+    return {
+        "file": str(path.relative_to(SQL_DIR.parent.parent)) if path.is_absolute() else str(path),
+        "line": line_of(sql, offset),
+        "rule": rule,
+        "severity": RULES[rule],
+        "message": message,
+    }
+
+
+# --- Checks ---
+def check_sql(path: Path, sql: str) -> List[Dict[str, Any]]:
+    """Run every check on one query text."""
+    findings = []
+    code = mask_sql(sql)
+
+    for m in _WRAPPED_FILTER.finditer(code):
+        findings.append(_finding(
+            path, sql, m.start(), "function-wrapped-filter",
+            f"{m.group(1)}() around a filtered column, compare the raw column against a range instead"
+        ))
+
+    for m in _DISTINCT_JOIN.finditer(code):
+        findings.append(_finding(
+            path, sql, m.start(), "distinct-subquery-join",
+            "JOIN on a SELECT DISTINCT subquery, join the source directly or use EXISTS"
+        ))
+
+    for m in _DATE_LITERAL.finditer(mask_sql(sql, keep_literals=True)):
+        findings.append(_finding(
+            path, sql, m.start(), "hardcoded-literal",
+            f"hardcoded date {m.group(0)}, use :start_date / :end_date"
+        ))
+    for m in _ID_LITERAL.finditer(code):
+        findings.append(_finding(
+            path, sql, m.start(), "hardcoded-literal",
+            f"hardcoded ID in '{m.group(0)}', use a bound parameter"
+        ))
+
+    for name, offset, stmt in split_statements(sql):
+        described = describe_select(stmt)
+        if described is None:
+            continue
+
+        if name is None and described["order_by"] is not None:
+            findings.append(_finding(
+                path, sql, offset + described["order_by"], "final-order-by",
+                "ORDER BY on the full result set, sorting every exported row in the database"
+            ))
+
+        if described["group_by"] and not described["distinct"]:
+            findings.extend(_check_group_by(path, sql, offset, described, name))
+
+    return sorted(findings, key=lambda f: (f["line"], f["rule"]))
+
+
+def _check_group_by(path: Path, sql: str, offset: int, described: dict, name: Optional[str]) -> List[Dict[str, Any]]:
+    group_exprs = {_normalize(expr) for _, expr in described["group_by"]}
+    group_names = {expr.split('.')[-1] for expr in group_exprs}
+    findings = []
+    for item_offset, item in described["items"]:
+        expr = _strip_alias(item)
+        alias = select_item_alias(item)
+        if not expr or expr == '*' or _AGGREGATE.search(expr) or _LITERAL.match(expr):
+            continue
+        normalized = _normalize(expr)
+        if normalized in group_exprs or (alias and alias.lower() in group_exprs):
+            continue
+        if re.fullmatch(r'[\w.]+', normalized) and normalized.split('.')[-1] in group_names:
+            continue
+        # Columns of a table grouped by its primary key are functionally dependent on it
+        qualifiers = set(re.findall(r'(\w+)\.\w+', normalized))
+        if qualifiers and all(f"{q}.id" in group_exprs for q in qualifiers):
+            continue
+        statement = f"CTE {name}" if name else "final statement"
+        findings.append(_finding(
+            path, sql, offset + item_offset + len(item) - len(item.lstrip()), "non-aggregated-column",
+            f"'{expr}' is neither aggregated nor in GROUP BY ({statement})"
+        ))
+    return findings
+
+
+def iter_query_files(sources: Optional[List[str]] = None):
+    """(data_source, query_type, path) of every SQL file of the registered sources."""
+    for data_source in sources or DATA_SOURCE_CONFIGS:
+        if data_source not in DATA_SOURCE_CONFIGS:
+            raise ValueError(f"Unknown data source: {data_source}. Available: {list(DATA_SOURCE_CONFIGS)}")
+        for query_type in QUERY_TYPES:
+            path = SQL_DIR / f"{data_source}_{query_type}.sql"
+            if path.exists():
+                yield data_source, query_type, path
+
+
+def analyze(sources: Optional[List[str]] = None, raw: bool = False) -> List[Dict[str, Any]]:
+    """Analyze the SQL files of the given sources (all registered sources by default)."""
+    findings = []
+    for _, _, path in iter_query_files(sources):
+        sql = path.read_text(encoding='utf-8')
+        findings.extend(check_sql(path, sql if raw else prepare_template(sql)))
+    return findings
+
+
+# --- EXPLAIN baseline ---
+def default_explain_params() -> Dict[str, Any]:
+    """Representative parameters: a week of data for one storefront, no optional filters."""
+    yesterday = date.today() - timedelta(days=1)
+    return {
+        "workspace_id": 1,
+        "storefront_ids": [1],
+        "start_date": (yesterday - timedelta(days=6)).strftime('%Y-%m-%d'),
+        "end_date": yesterday.strftime('%Y-%m-%d'),
+    }
+
+
+def render_query(sql: str, params: Dict[str, Any]):
+    """Prepare a query file the way the export path does (see logic.build_query)."""
+    null_params = {p for p in referenced_params(sql) if params.get(p) is None}
+    query = prepare_template(sql, null_params)
+    bind = dict(params)
+    if isinstance(bind.get("storefront_ids"), (list, tuple)):
+        query = inline_id_list(query, "storefront_ids", bind.pop("storefront_ids"))
+    if bind.get("end_date"):
+        end = date.fromisoformat(str(bind["end_date"])[:10])
+        bind["end_date_next"] = (end + timedelta(days=1)).strftime('%Y-%m-%d')
+    used = referenced_params(query)
+    return query, {k: v for k, v in bind.items() if k in used}
+
+
+def collect_plans(database_url: str, params: Dict[str, Any], sources: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """EXPLAIN every query on the given database, as plan lines per '<source>:<query type>'."""
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(database_url)
+    explain = "EXPLAIN"
+    if engine.dialect.name == "sqlite":
+        from tools.stand_in_db import register_stand_in
+        register_stand_in(engine)
+        explain = "EXPLAIN QUERY PLAN"
+    plans = {}
+    with engine.connect() as conn:
+        for data_source, query_type, path in iter_query_files(sources):
+            query, bind = render_query(path.read_text(encoding='utf-8'), params)
+            key = f"{data_source}:{query_type}"
+            try:
+                rows = conn.execute(text(f"{explain} {query}"), bind).fetchall()
+                plans[key] = [" | ".join("" if v is None else str(v) for v in row) for row in rows]
+            except Exception as e:
+                plans[key] = [f"ERROR: {type(e).__name__}: {str(e).splitlines()[0]}"]
+    engine.dispose()
+    return plans
+
+
+def compare_plans(baseline: Dict[str, List[str]], plans: Dict[str, List[str]]) -> List[str]:
+    """Unified diffs of every plan that differs from the baseline."""
+    diffs = []
+    for key in sorted(set(baseline) | set(plans)):
+        before, after = baseline.get(key, []), plans.get(key, [])
+        if before != after:
+            diffs.append("\n".join(difflib.unified_diff(
+                before, after, fromfile=f"baseline {key}", tofile=f"current {key}", lineterm=""
+            )))
+    return diffs
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Flag slow SQL patterns in data_logic/sql.")
+    parser.add_argument("sources", nargs="*", help="Data sources to check (default: all registered)")
+    parser.add_argument("--raw", action="store_true", help="Check the files as written, without loader rewrites")
+    parser.add_argument("--strict", action="store_true", help="Exit with status 1 on warnings too")
+    parser.add_argument("--json", action="store_true", help="Print findings as JSON")
+    parser.add_argument("--database-url", help="Stand-in database for EXPLAIN (SQLAlchemy URL)")
+    parser.add_argument("--explain-baseline", type=Path, help="JSON file with the expected plans")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the current plans to the baseline")
+    parser.add_argument("--params", help="JSON object of query parameters for EXPLAIN")
+    args = parser.parse_args(argv)
+
+    unknown = [s for s in args.sources if s not in DATA_SOURCE_CONFIGS]
+    if unknown:
+        parser.error(f"Unknown data source(s): {unknown}. Available: {list(DATA_SOURCE_CONFIGS)}")
+
+    findings = analyze(args.sources or None, raw=args.raw)
+    if args.json:
+        print(json.dumps(findings, indent=2))
+    else:
+        for f in findings:
+            print(f"{f['file']}:{f['line']}: {f['severity']}: [{f['rule']}] {f['message']}")
+        print(f"{len(findings)} finding(s)")
+
+    failed = any(f["severity"] == "error" or args.strict for f in findings)
+
+    if args.database_url:
+        params = {**default_explain_params(), **(json.loads(args.params) if args.params else {})}
+        plans = collect_plans(args.database_url, params, args.sources or None)
+        if args.explain_baseline and args.update_baseline:
+            args.explain_baseline.write_text(json.dumps(plans, indent=2, sort_keys=True), encoding='utf-8')
+            print(f"Wrote {len(plans)} plan(s) to {args.explain_baseline}")
+        elif args.explain_baseline:
+            baseline = json.loads(args.explain_baseline.read_text(encoding='utf-8'))
+            if args.sources:
+                prefixes = tuple(f"{s}:" for s in args.sources)
+                baseline = {k: v for k, v in baseline.items() if k.startswith(prefixes)}
+            diffs = compare_plans(baseline, plans)
+            for diff in diffs:
+                print(diff)
+            print(f"{len(diffs)} plan change(s) against {args.explain_baseline}")
+            failed = failed or bool(diffs)
+        else:
+            print(json.dumps(plans, indent=2, sort_keys=True))
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+"""
+Local Stand-in Database
+
+A SQLite file with the tables the data_logic SQL reads (kw_discovery_*, onsite_*,
+metric_share_of_search_*, dashboard_ads, ads_ops_*, ...), seeded with synthetic data at a
+configurable scale. The export path runs against it unchanged through DATABASE_URL:
+
+    python -m tools.stand_in_db create stand_in.db --workspaces 2 --storefronts 10 --days 60
+    DATABASE_URL=sqlite:///stand_in.db EXPORT_FETCH_ENGINE=pandas streamlit run app.py
+
+MySQL functions the queries use (month, year, concat) are registered on every connection
+by register_stand_in(engine); tools/load_test.py and tools/sql_analyzer.py do this
+automatically for sqlite URLs.
+
+IDs follow production: storefront_ids parameters are ads_ops_storefront IDs, and every
+onsite storefront links to exactly one ads_ops storefront. Dates cover the `days` days
+up to yesterday.
+"""
+
+import argparse
+import random
+import re
+import sqlite3
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+# table -> columns. Columns that the queries reference without a table prefix exist in
+# only one of the tables joined there, as in production (SQLite rejects ambiguous names).
+SCHEMA = {
+    "passport_workspace": "id INTEGER PRIMARY KEY, name TEXT",
+    "global_company": "id INTEGER PRIMARY KEY, name TEXT",
+    "ads_ops_storefront": (
+        "id INTEGER PRIMARY KEY, name TEXT, country_code TEXT, marketplace_code TEXT, global_company_id INTEGER"
+    ),
+    "onsite_storefront": (
+        "id INTEGER PRIMARY KEY, storefront_sid INTEGER, ads_ops_storefront_id INTEGER, storefront_name TEXT, "
+        "country_code TEXT, country_name TEXT, marketplace_code TEXT, marketplace_name TEXT, storefront_type TEXT, "
+        "storefront_url TEXT, global_company_id INTEGER, udc__search_group_tag TEXT, shop_created_at TEXT, "
+        "operational_status TEXT, category_name TEXT, shop_ads_status TEXT, product_ads_status TEXT, "
+        "storefront_division TEXT"
+    ),
+    "kw_discovery_storefront_workspace": "workspace_id INTEGER, storefront_id INTEGER",
+    "onsite_storefront_workspace": "storefront_id INTEGER, workspace_id INTEGER, ads_ops_storefront_id INTEGER",
+    "onsite_keyword": "id INTEGER PRIMARY KEY, keyword TEXT, translation TEXT",
+    "onsite_keyword_sharded": (
+        "id INTEGER PRIMARY KEY, keyword TEXT, keyword_type TEXT, country_name TEXT, marketplace_name TEXT, "
+        "first_interaction_at TEXT"
+    ),
+    "onsite_keyword_workspace": "id INTEGER PRIMARY KEY, workspace_id INTEGER, keyword_id INTEGER, status TEXT",
+    "onsite_workspace_tag": "id INTEGER PRIMARY KEY, name TEXT",
+    "onsite_keyword_workspace_tag": "keyword_workspace_id INTEGER, workspace_tag_id INTEGER",
+    "kw_discovery_storefront_keyword": (
+        "storefront_id INTEGER, keyword_id INTEGER, keyword_type TEXT, brand_name TEXT, "
+        "tag_1 TEXT, tag_2 TEXT, tag_3 TEXT, note_1 TEXT, note_2 TEXT"
+    ),
+    "kw_discovery_storefront_keyword_perf": (
+        "storefront_id INTEGER, keyword_id INTEGER, created_datetime TEXT, est_daily_search_volume REAL, "
+        "ads_gmv REAL, cost REAL, click REAL, impression REAL, ads_item_sold REAL, active_skus REAL, "
+        "current_avg_bidding_price REAL, suggested_bidding_price REAL, peak_day_ads_gmv REAL, "
+        "peak_day_bau_ads_gmv REAL, company_competitor REAL, product_competitor REAL, storefront_competitor REAL"
+    ),
+    "onsite_storefront_keyword_ads_performance": (
+        "ads_ops_storefront_id INTEGER, keyword_id INTEGER, timing TEXT, tool_id INTEGER, created_datetime TEXT, "
+        "ads_order REAL, cost REAL, direct_order REAL, ads_gmv REAL, direct_atc REAL, direct_gmv REAL, "
+        "direct_item_sold REAL, click REAL, atc REAL, ads_item_sold REAL, impression REAL, active_skus REAL, "
+        "direct_conversion REAL, conversion REAL, active_shops REAL"
+    ),
+    "metric_share_of_search_storefront": (
+        "timing TEXT, keyword_id INTEGER, storefront_id INTEGER, created_datetime TEXT, display_type TEXT, "
+        "product_position TEXT, device_type TEXT, share_of_search REAL, suggested_bidding_price REAL, "
+        "search_volume REAL"
+    ),
+    "onsite_product": (
+        "id INTEGER PRIMARY KEY, storefront_id INTEGER, product_name TEXT, brand_name TEXT, historical_sold REAL, "
+        "sold REAL, selling_price REAL, discount REAL, currency TEXT, product_url TEXT, marketplace_name TEXT"
+    ),
+    "metric_share_of_search_product": (
+        "timing TEXT, keyword_id INTEGER, product_id INTEGER, device_type TEXT, display_type TEXT, slot REAL, "
+        "created_datetime TEXT"
+    ),
+    "dashboard_ads": (
+        "storefront_id INTEGER, created_datetime TEXT, gmv REAL, cost REAL, click REAL, impression REAL, "
+        "ads_order REAL, direct_gmv REAL, direct_ads_order REAL, direct_item_sold REAL, item_sold REAL"
+    ),
+    "ads_ops_ads_campaigns": (
+        "id INTEGER PRIMARY KEY, storefront_id INTEGER, campaign_code TEXT, general_tag TEXT, country_code TEXT, "
+        "marketplace_code TEXT, tool_code TEXT, name TEXT, note TEXT, status TEXT, target TEXT, objective TEXT, "
+        "ads_status TEXT, budget_distributed_method TEXT, daily_budget REAL, assessment TEXT, timeline_from TEXT, "
+        "timeline_to TEXT, first_search_slot INTEGER, max_bidding_price REAL"
+    ),
+    "ads_ops_ads_campaigns_performance": (
+        "ads_campaign_id INTEGER, created_at TEXT, created_datetime TEXT, click REAL, impression REAL, "
+        "ads_gmv REAL, cost REAL"
+    ),
+    "ads_ops_ads_objects": (
+        "id INTEGER PRIMARY KEY, parent_id INTEGER, country_code TEXT, marketplace_code TEXT, tool_code TEXT, "
+        "name TEXT, note TEXT, status TEXT, timeline_from TEXT, timeline_to TEXT"
+    ),
+    "ads_ops_ads_objects_performance": (
+        "ads_object_id INTEGER, created_at TEXT, created_datetime TEXT, click REAL, impression REAL, "
+        "ads_gmv REAL, cost REAL"
+    ),
+}
+
+# Indexes on the join and filter columns (production tables are sharded/sorted on these)
+INDEXES = {
+    "kw_discovery_storefront_workspace": ["workspace_id, storefront_id", "storefront_id"],
+    "onsite_storefront_workspace": ["workspace_id", "storefront_id"],
+    "onsite_keyword_workspace": ["workspace_id", "keyword_id"],
+    "onsite_keyword_workspace_tag": ["keyword_workspace_id"],
+    "kw_discovery_storefront_keyword": ["storefront_id, keyword_id"],
+    "kw_discovery_storefront_keyword_perf": ["storefront_id, keyword_id, created_datetime"],
+    "onsite_storefront_keyword_ads_performance": ["ads_ops_storefront_id, keyword_id, created_datetime"],
+    "metric_share_of_search_storefront": ["keyword_id, storefront_id, created_datetime", "created_datetime"],
+    "metric_share_of_search_product": ["created_datetime", "keyword_id"],
+    "onsite_product": ["storefront_id"],
+    "dashboard_ads": ["storefront_id, created_datetime"],
+    "ads_ops_ads_campaigns": ["storefront_id"],
+    "ads_ops_ads_campaigns_performance": ["ads_campaign_id, created_datetime"],
+    "ads_ops_ads_objects": ["parent_id"],
+    "ads_ops_ads_objects_performance": ["ads_object_id, created_datetime"],
+}
+
+MARKETPLACES = [("SHOPEE", "Shopee"), ("LAZADA", "Lazada"), ("TOKOPEDIA", "Tokopedia"), ("TIKTOK", "TikTok Shop")]
+COUNTRIES = [("VN", "Vietnam"), ("ID", "Indonesia"), ("TH", "Thailand"), ("PH", "Philippines"), ("MY", "Malaysia")]
+DISPLAY_TYPES = ["paid", "organic", "top"]
+DEVICE_TYPES = ["mobile", "desktop"]
+PRODUCT_POSITIONS = ["1-5", "6-10", "11-20", "21-50"]
+CAMPAIGN_STATUSES = ["ongoing", "ongoing", "paused", "ended", "draft"]
+
+
+# --- SQLite dialect support ---
+def _month(value):
+    if value is None:
+        return None
+    return int(str(value)[5:7])
+
+
+def _year(value):
+    if value is None:
+        return None
+    return int(str(value)[:4])
+
+
+def _concat(*values):
+    # MySQL: NULL if any argument is NULL
+    if any(v is None for v in values):
+        return None
+    return "".join(str(v) for v in values)
+
+
+def install_sqlite_functions(dbapi_connection) -> None:
+    """Register the MySQL functions used by data_logic/sql on a sqlite3 connection."""
+    dbapi_connection.create_function("month", 1, _month, deterministic=True)
+    dbapi_connection.create_function("year", 1, _year, deterministic=True)
+    dbapi_connection.create_function("concat", -1, _concat, deterministic=True)
+
+
+# SQLite casts DATETIME to a number ('2024-01-01 ...' -> 2024), keep the text instead
+_CAST_DATETIME = re.compile(r'\bas\s+datetime\s*\)', re.IGNORECASE)
+
+
+def register_stand_in(engine) -> None:
+    """Make a SQLAlchemy engine on a stand-in SQLite file run the production SQL."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        install_sqlite_functions(dbapi_connection)
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _rewrite(conn, cursor, statement, parameters, context, executemany):
+        return _CAST_DATETIME.sub("AS TEXT)", statement), parameters
+
+
+# --- Seeding ---
+def _days(days: int) -> List[str]:
+    yesterday = date.today() - timedelta(days=1)
+    return [(yesterday - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days - 1, -1, -1)]
+
+
+def _insert(conn: sqlite3.Connection, table: str, rows: Iterable[tuple]) -> None:
+    columns = SCHEMA[table].count(",") + 1
+    conn.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * columns)})", rows)
+
+
+def create_stand_in(
+    path: Path,
+    workspaces: int = 2,
+    storefronts: int = 10,
+    keywords: int = 100,
+    products: int = 10,
+    campaigns: int = 4,
+    days: int = 60,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Create (or replace) a stand-in database file and fill it with synthetic data.
+
+    Args:
+        path: SQLite file to create
+        workspaces: Number of workspaces
+        storefronts: Storefronts per workspace
+        keywords: Tracked keywords per workspace (every storefront tracks all of them)
+        products: Products per storefront
+        campaigns: Ads campaigns per storefront (3 ads objects each)
+        days: Days of metrics, up to yesterday
+        seed: Random seed
+
+    Returns:
+        Dict with 'workspaces' ({workspace_id: [ads_ops storefront IDs]}), 'start_date',
+        'end_date' and 'rows' (row count per table)
+    """
+    path = Path(path)
+    path.unlink(missing_ok=True)
+    rng = random.Random(seed)
+    day_list = _days(days)
+
+    def metric(scale: float) -> float:
+        return round(rng.expovariate(1 / scale), 2)
+
+    conn = sqlite3.connect(str(path))
+    try:
+        for table, columns in SCHEMA.items():
+            conn.execute(f"CREATE TABLE {table} ({columns})")
+
+        workspace_map: Dict[int, List[int]] = {}
+        for ws in range(1, workspaces + 1):
+            conn.execute("INSERT INTO passport_workspace VALUES (?, ?)", (ws, f"Workspace {ws}"))
+            conn.execute("INSERT INTO onsite_workspace_tag VALUES (?, ?)", (ws * 10 + 1, f"Brand keywords {ws}"))
+            conn.execute("INSERT INTO onsite_workspace_tag VALUES (?, ?)", (ws * 10 + 2, f"Generic keywords {ws}"))
+
+            keyword_ids = [ws * 100_000 + k for k in range(1, keywords + 1)]
+            market_code, market_name = MARKETPLACES[ws % len(MARKETPLACES)]
+            country_code, country_name = COUNTRIES[ws % len(COUNTRIES)]
+            for kw_id in keyword_ids:
+                keyword = f"keyword {kw_id}"
+                conn.execute("INSERT INTO onsite_keyword VALUES (?, ?, ?)", (kw_id, keyword, f"translation {kw_id}"))
+                conn.execute(
+                    "INSERT INTO onsite_keyword_sharded VALUES (?, ?, ?, ?, ?, ?)",
+                    (kw_id, keyword, rng.choice(["brand", "generic", "competitor"]), country_name,
+                     market_name, day_list[0])
+                )
+                conn.execute("INSERT INTO onsite_keyword_workspace VALUES (?, ?, ?, ?)",
+                             (kw_id, ws, kw_id, "ACTIVATED" if rng.random() < 0.9 else "PAUSED"))
+                conn.execute("INSERT INTO onsite_keyword_workspace_tag VALUES (?, ?)",
+                             (kw_id, ws * 10 + rng.choice([1, 2])))
+
+            ads_ids = []
+            for s in range(1, storefronts + 1):
+                sf_id = ws * 1000 + s
+                ads_id = 500_000 + sf_id
+                company_id = sf_id // 2
+                ads_ids.append(ads_id)
+                conn.execute("INSERT OR IGNORE INTO global_company VALUES (?, ?)", (company_id, f"Company {company_id}"))
+                conn.execute("INSERT INTO ads_ops_storefront VALUES (?, ?, ?, ?, ?)",
+                             (ads_id, f"Storefront {sf_id}", country_code, market_code, company_id))
+                conn.execute(
+                    "INSERT INTO onsite_storefront VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (sf_id, 900_000 + sf_id, ads_id, f"Storefront {sf_id}", country_code, country_name,
+                     market_code, market_name, rng.choice(["mall", "normal"]), f"https://shop.example/{sf_id}",
+                     company_id, "group", day_list[0], "active", rng.choice(["Beauty", "Electronics", "Home"]),
+                     "on", "on", rng.choice(["north", "south"]))
+                )
+                conn.execute("INSERT INTO kw_discovery_storefront_workspace VALUES (?, ?)", (ws, sf_id))
+                conn.execute("INSERT INTO onsite_storefront_workspace VALUES (?, ?, ?)", (sf_id, ws, ads_id))
+
+                _insert(
+                    conn, "kw_discovery_storefront_keyword",
+                    ((sf_id, kw, rng.choice(["relevant", "relevant", "irrelevant"]), f"Brand {sf_id}",
+                      "tag a", "tag b", None, None, None) for kw in keyword_ids)
+                )
+                _insert(
+                    conn, "kw_discovery_storefront_keyword_perf",
+                    ((sf_id, kw, f"{day} 00:00:00", metric(500), metric(200), metric(50), metric(30), metric(900),
+                      metric(5), metric(40), metric(1), metric(1), metric(400), metric(300), rng.randint(0, 20),
+                      rng.randint(0, 50), rng.randint(0, 20))
+                     for kw in keyword_ids for day in day_list)
+                )
+                _insert(
+                    conn, "onsite_storefront_keyword_ads_performance",
+                    ((ads_id, kw, "daily", rng.randint(1, 3), f"{day} 00:00:00", metric(3), metric(50), metric(2),
+                      metric(200), metric(4), metric(150), metric(3), metric(30), metric(5), metric(4), metric(900),
+                      metric(40), metric(1), metric(2), metric(10))
+                     for kw in keyword_ids for day in day_list)
+                )
+                _insert(
+                    conn, "metric_share_of_search_storefront",
+                    (("daily", kw, sf_id, f"{day} 00:00:00", rng.choice(DISPLAY_TYPES), rng.choice(PRODUCT_POSITIONS),
+                      rng.choice(DEVICE_TYPES), round(rng.random(), 4), metric(1), metric(500))
+                     for kw in keyword_ids for day in day_list)
+                )
+
+                product_ids = [sf_id * 1000 + p for p in range(1, products + 1)]
+                _insert(conn, "onsite_product", (
+                    (pid, sf_id, f"Product {pid}", f"Brand {sf_id}", metric(5000), metric(300), metric(20),
+                     round(rng.random() * 0.5, 2), "USD", f"https://shop.example/p/{pid}", market_name)
+                    for pid in product_ids
+                ))
+                _insert(
+                    conn, "metric_share_of_search_product",
+                    (("daily", kw, pid, rng.choice(DEVICE_TYPES), rng.choice(DISPLAY_TYPES), rng.randint(1, 60),
+                      f"{day} 00:00:00")
+                     for pid in product_ids for kw in rng.sample(keyword_ids, min(3, len(keyword_ids)))
+                     for day in day_list)
+                )
+
+                _insert(conn, "dashboard_ads", (
+                    (ads_id, f"{day} 00:00:00", metric(5000), metric(800), metric(700), metric(20000), metric(60),
+                     metric(3000), metric(40), metric(50), metric(90))
+                    for day in day_list
+                ))
+
+                for c in range(1, campaigns + 1):
+                    camp_id = sf_id * 100 + c
+                    conn.execute(
+                        "INSERT INTO ads_ops_ads_campaigns VALUES "
+                        "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (camp_id, ads_id, f"C{camp_id}", "always-on", country_code, market_code, "SEARCH",
+                         f"Campaign {camp_id}", None, rng.choice(CAMPAIGN_STATUSES), "gmv", "sales", "running",
+                         "even", metric(100), "good", day_list[0], day_list[-1], rng.randint(1, 5), metric(2))
+                    )
+                    _insert(
+                        conn, "ads_ops_ads_campaigns_performance",
+                        ((camp_id, f"{day} 00:00:00", f"{day} 00:00:00", metric(200), metric(6000), metric(1500),
+                          metric(250)) for day in day_list)
+                    )
+                    for o in range(1, 4):
+                        obj_id = camp_id * 10 + o
+                        conn.execute(
+                            "INSERT INTO ads_ops_ads_objects VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            (obj_id, camp_id, country_code, market_code, "SEARCH", f"Object {obj_id}", None,
+                             rng.choice(CAMPAIGN_STATUSES), day_list[0], day_list[-1])
+                        )
+                        _insert(
+                            conn, "ads_ops_ads_objects_performance",
+                            ((obj_id, f"{day} 00:00:00", f"{day} 00:00:00", metric(70), metric(2000), metric(500),
+                              metric(80)) for day in day_list)
+                        )
+            workspace_map[ws] = ads_ids
+
+        for table, indexes in INDEXES.items():
+            for i, columns in enumerate(indexes):
+                conn.execute(f"CREATE INDEX idx_{table}_{i} ON {table} ({columns})")
+        conn.execute("ANALYZE")
+        conn.commit()
+
+        rows = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in SCHEMA}
+    finally:
+        conn.close()
+
+    return {"workspaces": workspace_map, "start_date": day_list[0], "end_date": day_list[-1], "rows": rows}
+
+
+def describe_stand_in(path: Path) -> Dict[str, Any]:
+    """Workspaces, storefronts and date range of an existing stand-in file (as returned by create_stand_in)."""
+    conn = sqlite3.connect(str(path))
+    try:
+        workspace_map: Dict[int, List[int]] = {}
+        for ws, ads_id in conn.execute(
+            "SELECT w.workspace_id, s.ads_ops_storefront_id FROM kw_discovery_storefront_workspace w "
+            "JOIN onsite_storefront s ON s.id = w.storefront_id ORDER BY 1, 2"
+        ):
+            workspace_map.setdefault(ws, []).append(ads_id)
+        start, end = conn.execute("SELECT MIN(created_datetime), MAX(created_datetime) FROM dashboard_ads").fetchone()
+        rows = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in SCHEMA}
+    finally:
+        conn.close()
+    return {
+        "workspaces": workspace_map,
+        "start_date": str(start)[:10] if start else None,
+        "end_date": str(end)[:10] if end else None,
+        "rows": rows,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create a local stand-in database with synthetic data.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    create = sub.add_parser("create", help="Create and seed a stand-in SQLite file")
+    create.add_argument("path", type=Path)
+    create.add_argument("--workspaces", type=int, default=2)
+    create.add_argument("--storefronts", type=int, default=10, help="Storefronts per workspace")
+    create.add_argument("--keywords", type=int, default=100, help="Keywords per workspace")
+    create.add_argument("--products", type=int, default=10, help="Products per storefront")
+    create.add_argument("--campaigns", type=int, default=4, help="Campaigns per storefront")
+    create.add_argument("--days", type=int, default=60)
+    create.add_argument("--seed", type=int, default=0)
+    describe = sub.add_parser("describe", help="Show the contents of a stand-in file")
+    describe.add_argument("path", type=Path)
+    args = parser.parse_args(argv)
+
+    if args.command == "create":
+        started = datetime.now()
+        info = create_stand_in(args.path, args.workspaces, args.storefronts, args.keywords,
+                               args.products, args.campaigns, args.days, args.seed)
+        print(f"Created {args.path} in {(datetime.now() - started).total_seconds():.1f}s")
+    else:
+        info = describe_stand_in(args.path)
+
+    print(f"Dates: {info['start_date']} to {info['end_date']}")
+    for ws, ads_ids in info["workspaces"].items():
+        print(f"Workspace {ws}: storefront_ids {ads_ids[0]}..{ads_ids[-1]} ({len(ads_ids)})")
+    for table, count in info["rows"].items():
+        print(f"  {table:<45} {count:>10,} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Synthetic Export Frames
+
+Generates DataFrames shaped like the result of each source's data query, for benchmarks
+and load tests without a database:
+
+- columns and their order come from the source's data SQL (data_logic/sql/{source}_data.sql)
+- merge keys and metrics come from get_merge_config
+- key cardinalities follow production (hundreds of storefronts, tens of thousands of
+  keywords, a handful of marketplaces/countries, one value per day or month)
+
+Columns arrive as the database driver returns them: text as Python strings (object
+dtype), metrics as float64, counts as int64. Generation is seeded, so the same
+(source, rows, seed) always gives the same frame.
+
+Usage:
+    from tools.synthetic_data import generate_frame, generate_batches
+    df = generate_frame("keyword_lab", 1_000_000)
+    batches = generate_batches("keyword_lab", 1_000_000, num_batches=8)
+"""
+
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.core.batch_export import get_merge_config
+from utils.core.sql_rewrite import get_select_columns
+
+SQL_DIR = Path(__file__).resolve().parent.parent / "data_logic" / "sql"
+
+# Sizes used by the benchmark suite
+ROW_COUNTS = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# kind, cardinality (distinct values); text columns not listed get DEFAULT_TEXT_CARDINALITY
+COLUMN_SPECS: Dict[str, Tuple[str, int]] = {
+    "keyword": ("text", 50_000),
+    "keyword_id": ("id", 50_000),
+    "translation": ("text", 50_000),
+    "product_name": ("text", 200_000),
+    "storefront_name": ("text", 500),
+    "storefront_sid": ("id", 500),
+    "storefront_id": ("id", 500),
+    "ads_ops_storefront_id": ("id", 500),
+    "aos_id": ("id", 500),
+    "company_name": ("text", 150),
+    "global_company_name": ("text", 150),
+    "brand_name": ("text", 300),
+    "category_name": ("text", 60),
+    "campaign_name": ("text", 5_000),
+    "campaign_code": ("text", 5_000),
+    "object_name": ("text", 40_000),
+    "marketplace_code": ("text", 6),
+    "marketplace_name": ("text", 6),
+    "country_code": ("text", 6),
+    "display_type": ("text", 3),
+    "device_type": ("text", 2),
+    "product_position": ("text", 10),
+    "keyword_type": ("text", 4),
+    "operational_status": ("text", 3),
+    "month": ("month", 12),
+    "created_datetime": ("day", 90),
+}
+DEFAULT_TEXT_CARDINALITY = 20
+
+# Metrics that are counts in the database (integers), everything else is a float
+COUNT_METRICS = {
+    "click", "impression", "ads_order", "atc", "direct_atc", "direct_order", "conversion",
+    "direct_conversion", "ads_item_sold", "direct_item_sold", "item_sold", "direct_ads_order",
+    "active_skus", "active_shops", "object_clicks", "object_impressions",
+    "campaign_clicks", "campaign_impressions", "search_volume", "item_sold_l30d",
+}
+
+
+def get_source_schema(data_source: str) -> Dict[str, List[str]]:
+    """
+    Columns of a source's data query, split into merge keys, metrics and other columns.
+
+    Returns:
+        Dict with 'columns' (query order), 'merge_keys', 'metrics' and 'other'
+    """
+    merge_keys, agg_dict = get_merge_config(data_source)
+    sql_path = SQL_DIR / f"{data_source}_data.sql"
+    columns = get_select_columns(sql_path.read_text(encoding='utf-8')) if sql_path.exists() else []
+    for column in list(merge_keys) + list(agg_dict):
+        if column not in columns:
+            columns.append(column)
+    return {
+        "columns": columns,
+        "merge_keys": list(merge_keys),
+        "metrics": [c for c in columns if c in agg_dict],
+        "other": [c for c in columns if c not in agg_dict and c not in merge_keys],
+    }
+
+
+def _text_pool(column: str, cardinality: int) -> np.ndarray:
+    return np.array([f"{column}_{i}" for i in range(cardinality)], dtype=object)
+
+
+def _generate_column(column: str, is_metric: bool, rows: int, rng: np.random.Generator) -> np.ndarray:
+    if is_metric:
+        if column in COUNT_METRICS:
+            return rng.poisson(40, rows).astype(np.int64)
+        # Skewed like money and ratio metrics: most values small, a long tail
+        return np.round(rng.gamma(1.5, 250.0, rows), 4)
+
+    kind, cardinality = COLUMN_SPECS.get(column, ("text", DEFAULT_TEXT_CARDINALITY))
+    # Zipf-like popularity: a few keys (large storefronts, head keywords) dominate
+    weights = 1.0 / np.arange(1, cardinality + 1)
+    index = rng.choice(cardinality, size=rows, p=weights / weights.sum())
+    if kind == "id":
+        return (index + 1000).astype(np.int64)
+    if kind == "month":
+        return (index % 12 + 1).astype(np.int64)
+    if kind == "day":
+        start = date.today() - timedelta(days=cardinality)
+        days = np.array([(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(cardinality)], dtype=object)
+        return days[index]
+    return _text_pool(column, cardinality)[index]
+
+
+def generate_frame(data_source: str, rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate one result frame of a source.
+
+    Args:
+        data_source: Data source key (must have a merge config)
+        rows: Number of rows
+        seed: Random seed
+
+    Returns:
+        DataFrame with the source's data query columns
+    """
+    schema = get_source_schema(data_source)
+    metrics = set(schema["metrics"])
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        column: _generate_column(column, column in metrics, rows, rng)
+        for column in schema["columns"]
+    })
+
+
+def generate_batches(
+    data_source: str,
+    rows: int,
+    num_batches: int = 4,
+    overlap: float = 0.1,
+    seed: int = 0,
+) -> List[pd.DataFrame]:
+    """
+    Generate the batch results of one export, as run_batched_export collects them.
+
+    Args:
+        data_source: Data source key
+        rows: Total number of rows across all batches
+        num_batches: Number of batches
+        overlap: Share of each batch's rows repeated in the next batch (same merge keys,
+            as with overlapping date ranges), which merge_batches has to re-aggregate
+        seed: Random seed
+
+    Returns:
+        List of DataFrames
+    """
+    df = generate_frame(data_source, rows, seed)
+    bounds = np.linspace(0, rows, num_batches + 1).astype(int)
+    batches = []
+    for i in range(num_batches):
+        start, end = bounds[i], bounds[i + 1]
+        if i > 0 and overlap > 0:
+            start = max(0, start - int((end - start) * overlap))
+        batches.append(df.iloc[start:end].reset_index(drop=True))
+    return batches
@@ -1,4 +1,132 @@
+import os
 from pathlib import Path
 
 # Define the project root directory
 PROJECT_ROOT = Path(__file__).parent.parent
+
+# Settings below can be overridden in a .env file next to the app. python-dotenv is only
+# imported when that file exists, so deployments that set real environment variables
+# don't pay for it (or for its search of the call stack) on every page import.
+_ENV_FILE = PROJECT_ROOT / ".env"
+if _ENV_FILE.is_file():
+    from dotenv import load_dotenv
+    load_dotenv(_ENV_FILE)
+
+# Local directory for runtime state (learned export costs, caches, ...)
+STATE_DIR = Path(os.getenv("EXPORT_STATE_DIR", str(PROJECT_ROOT / ".export_state")))
+
+# --- Export admission control ---
+# Maximum estimated database time (in seconds) a single export batch is allowed to cost.
+# Exports above the budget are split into smaller batches instead of being refused.
+EXPORT_COST_BUDGET_SECONDS = float(os.getenv("EXPORT_COST_BUDGET_SECONDS", "120"))
+
+# How many exports that exceed the budget even at 1-day batches may run at the same time.
+# Additional ones wait in a queue.
+MAX_CONCURRENT_OVER_BUDGET_EXPORTS = int(os.getenv("MAX_CONCURRENT_OVER_BUDGET_EXPORTS", "1"))
+# Longest time (in seconds) such an export waits for its turn before the user is asked to retry later
+OVER_BUDGET_QUEUE_TIMEOUT_SECONDS = float(os.getenv("OVER_BUDGET_QUEUE_TIMEOUT_SECONDS", "600"))
+
+# --- Database pool & export scheduling ---
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "25"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "15"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "45"))
+
+# Connection health (utils/core/pool_health.py): idle pooled connections are validated in the
+# background every DB_POOL_HEALTH_CHECK_INTERVAL seconds and dead ones are evicted, so a
+# checkout doesn't pay a ping round trip. 0 pings on every checkout instead (pool_pre_ping).
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", "30"))
+
+# Read replicas (utils/core/routing.py): comma-separated SQLAlchemy URLs, optionally named
+# ("analytics=singlestoredb://..."). Queries of the scheduler lanes in DB_REPLICA_LANES (bulk
+# export batches by default) run on the replicas, everything else on the primary
+# (DATABASE_URL / DB_*). An engine failing with a connection error is skipped for
+# DB_FAILOVER_COOLDOWN seconds and its queries go to the next engine.
+DB_REPLICA_URLS = os.getenv("DB_REPLICA_URLS", "")
+DB_REPLICA_LANES = [lane.strip() for lane in os.getenv("DB_REPLICA_LANES", "bulk").split(",") if lane.strip()]
+DB_FAILOVER_COOLDOWN = float(os.getenv("DB_FAILOVER_COOLDOWN", "30"))
+
+# Adaptive concurrency (utils/core/pool_telemetry.py): the scheduler's slot limit is raised
+# by one while work queues and the database is healthy, and cut by a quarter on database
+# errors, pool timeouts or slow pool checkouts. The pool itself is sized for the maximum.
+DB_POOL_AUTOSIZE = os.getenv("DB_POOL_AUTOSIZE", "0").lower() in ("1", "true", "yes")
+DB_POOL_AUTOSIZE_MIN = int(os.getenv("DB_POOL_AUTOSIZE_MIN", "4"))
+DB_POOL_AUTOSIZE_MAX = int(os.getenv("DB_POOL_AUTOSIZE_MAX", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+DB_POOL_AUTOSIZE_INTERVAL = float(os.getenv("DB_POOL_AUTOSIZE_INTERVAL", "10"))
+# p95 pool checkout wait (seconds) above which the limit is lowered
+DB_POOL_AUTOSIZE_TARGET_WAIT = float(os.getenv("DB_POOL_AUTOSIZE_TARGET_WAIT", "0.2"))
+
+# Connections always kept available for interactive count/preview queries
+INTERACTIVE_RESERVED_SLOTS = int(os.getenv("INTERACTIVE_RESERVED_SLOTS", "10"))
+# Maximum number of export batches running at the same time across all sessions
+BULK_MAX_CONCURRENCY = int(os.getenv("BULK_MAX_CONCURRENCY", "8"))
+
+# Hedged export batches (utils/core/hedging.py): a batch whose query runs longer than the
+# EXPORT_HEDGE_PERCENTILE of recent batches of its data source (per batch day, at least
+# EXPORT_HEDGE_MIN_SECONDS) gets a duplicate on another connection or replica; the first
+# result wins and the other query is cancelled. Learned after EXPORT_HEDGE_MIN_SAMPLES batches.
+EXPORT_HEDGING = os.getenv("EXPORT_HEDGING", "0").lower() in ("1", "true", "yes")
+EXPORT_HEDGE_PERCENTILE = float(os.getenv("EXPORT_HEDGE_PERCENTILE", "95"))
+EXPORT_HEDGE_MIN_SAMPLES = int(os.getenv("EXPORT_HEDGE_MIN_SAMPLES", "20"))
+EXPORT_HEDGE_MIN_SECONDS = float(os.getenv("EXPORT_HEDGE_MIN_SECONDS", "5"))
+# Hedge attempts running at the same time in this process
+EXPORT_HEDGE_MAX_INFLIGHT = int(os.getenv("EXPORT_HEDGE_MAX_INFLIGHT", "2"))
+# Connect (and, for the MySQL drivers, read) timeout in seconds of the unpooled connection
+# that sends KILL QUERY to the losing attempt
+DB_CANCEL_TIMEOUT = float(os.getenv("DB_CANCEL_TIMEOUT", "5"))
+
+# --- Query result cache ---
+# "sqlite" (file, share it between replicas via a shared volume), "redis" or "memory"
+EXPORT_CACHE_BACKEND = os.getenv("EXPORT_CACHE_BACKEND", "sqlite").lower()
+EXPORT_CACHE_PATH = Path(os.getenv("EXPORT_CACHE_PATH", str(STATE_DIR / "query_cache.sqlite")))
+# Connection URL for the redis backend, e.g. redis://cache-host:6379/0
+EXPORT_CACHE_URL = os.getenv("EXPORT_CACHE_URL")
+EXPORT_CACHE_TTL_SECONDS = int(os.getenv("EXPORT_CACHE_TTL_SECONDS", "3600"))
+# Largest result that is cached (MB, Arrow IPC): bigger ones, e.g. large export batches, aren't
+EXPORT_CACHE_MAX_ENTRY_MB = float(os.getenv("EXPORT_CACHE_MAX_ENTRY_MB", "64"))
+# Size of the sqlite/memory cache (MB), the oldest entries are evicted beyond it
+EXPORT_CACHE_MAX_MB = float(os.getenv("EXPORT_CACHE_MAX_MB", "2048"))
+
+# --- Export artifact store (finished exports kept for re-download and sharing) ---
+EXPORT_ARTIFACT_DIR = Path(os.getenv("EXPORT_ARTIFACT_DIR", str(STATE_DIR / "artifacts")))
+EXPORT_ARTIFACT_TTL_HOURS = float(os.getenv("EXPORT_ARTIFACT_TTL_HOURS", "72"))
+EXPORT_ARTIFACT_QUOTA_MB = float(os.getenv("EXPORT_ARTIFACT_QUOTA_MB", "2048"))
+
+# --- Recurring scheduled exports ---
+EXPORT_SCHEDULES_FILE = Path(os.getenv("EXPORT_SCHEDULES_FILE", str(PROJECT_ROOT / "schedules.json")))
+
+# --- Dimension cache (client-side joins for sources with a *_fact.sql query) ---
+EXPORT_DIMENSION_CACHE = os.getenv("EXPORT_DIMENSION_CACHE", "1").lower() in ("1", "true", "yes")
+EXPORT_DIMENSION_TTL_SECONDS = int(os.getenv("EXPORT_DIMENSION_TTL_SECONDS", "21600"))
+
+# --- Result fetching ---
+# "arrow": columnar results from the driver converted to pandas (falls back to "pandas"
+# when pyarrow or the driver can't do it), "pandas": pd.read_sql through SQLAlchemy rows
+EXPORT_FETCH_ENGINE = os.getenv("EXPORT_FETCH_ENGINE", "arrow").lower()
+
+# --- Workload recording ---
+# JSON-lines file that receives one record per count/preview/export request (unset = off).
+# Replay it with `python -m tools.replay_workload`.
+EXPORT_WORKLOAD_LOG = Path(os.environ["EXPORT_WORKLOAD_LOG"]) if os.getenv("EXPORT_WORKLOAD_LOG") else None
+
+# --- Tracing (utils/core/tracing.py) ---
+# Share of traces that are recorded (1 = all, 0 = off); spans of a trace are kept or dropped together
+EXPORT_TRACE_SAMPLE_RATE = float(os.getenv("EXPORT_TRACE_SAMPLE_RATE", "1.0"))
+# Finished spans kept in memory (oldest are dropped first)
+EXPORT_TRACE_BUFFER_SIZE = int(os.getenv("EXPORT_TRACE_BUFFER_SIZE", "2000"))
+# Longest captured argument / result summary
+EXPORT_TRACE_MAX_ARG_CHARS = int(os.getenv("EXPORT_TRACE_MAX_ARG_CHARS", "200"))
+
+# --- Metrics (utils/core/metrics.py) ---
+# Port of the local Prometheus endpoint serving /metrics (0 = off)
+EXPORT_METRICS_PORT = int(os.getenv("EXPORT_METRICS_PORT", "0"))
+EXPORT_METRICS_HOST = os.getenv("EXPORT_METRICS_HOST", "127.0.0.1")
+
+# --- Slow-query log (utils/core/slow_query_log.py) ---
+# Database executions slower than this are logged (0 = off)
+EXPORT_SLOW_QUERY_SECONDS = float(os.getenv("EXPORT_SLOW_QUERY_SECONDS", "10"))
+EXPORT_SLOW_QUERY_LOG = Path(os.getenv("EXPORT_SLOW_QUERY_LOG", str(STATE_DIR / "slow_queries.jsonl")))
+# Plan captured for slow queries: "explain", "profile" (SingleStore PROFILE, re-runs the query) or "off"
+EXPORT_SLOW_QUERY_PLAN = os.getenv("EXPORT_SLOW_QUERY_PLAN", "explain").lower()
+# Rotate the log at this size, keeping EXPORT_SLOW_QUERY_BACKUPS older files
+EXPORT_SLOW_QUERY_MAX_MB = float(os.getenv("EXPORT_SLOW_QUERY_MAX_MB", "20"))
+EXPORT_SLOW_QUERY_BACKUPS = int(os.getenv("EXPORT_SLOW_QUERY_BACKUPS", "3"))
@@ -0,0 +1,336 @@
+"""
+Export Artifact Store
+
+Finished exports are written to disk so they can be downloaded again, shared with a
+colleague running the same request, or picked up after the browser tab was closed,
+without recomputing anything.
+
+Artifacts are keyed by a hash of (data_source, normalized params, data freshness).
+Data is refreshed daily, so the freshness token is the current date: the same request
+on the same day is answered from the stored file, the next day it is recomputed.
+
+Old artifacts are removed after EXPORT_ARTIFACT_TTL_HOURS, and the least recently used
+ones are evicted when the store grows beyond EXPORT_ARTIFACT_QUOTA_MB.
+
+The store also remembers the last successful export of each parameter set (ignoring the
+date range) as a DataFrame, so recurring exports can fetch only the new days. These frames
+are stored as Arrow IPC files (never pickles, the state dir may be shared), belong to the
+artifact of the export that produced them, count against the same quota and are removed
+together with it.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from utils.config import EXPORT_ARTIFACT_DIR, EXPORT_ARTIFACT_TTL_HOURS, EXPORT_ARTIFACT_QUOTA_MB
+
+# Keys in session params that are UI state rather than query parameters
+NON_SQL_PARAM_KEYS = ('data_source', 'current_page', 'num_row')
+
+_INDEX_FILE = EXPORT_ARTIFACT_DIR / "index.sqlite"
+_lock = threading.Lock()
+
+
+def normalize_export_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop UI-only keys and order list values so equivalent requests compare equal."""
+    normalized = {}
+    for key, value in params.items():
+        if key in NON_SQL_PARAM_KEYS:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = sorted(value)
+        normalized[key] = value
+    return normalized
+
+
+def get_data_freshness() -> str:
+    """Token identifying the current state of the source data (refreshed daily)."""
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+def make_artifact_key(data_source: str, params: Dict[str, Any], freshness: Optional[str] = None) -> str:
+    """Hash of (data_source, normalized params, data freshness)."""
+    payload = json.dumps(
+        {
+            "data_source": data_source,
+            "params": normalize_export_params(params),
+            "freshness": freshness or get_data_freshness()
+        },
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _connect() -> sqlite3.Connection:
+    EXPORT_ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(_INDEX_FILE), timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS artifacts ("
+        "key TEXT PRIMARY KEY, data_source TEXT NOT NULL, params TEXT NOT NULL, "
+        "freshness TEXT NOT NULL, file_name TEXT NOT NULL, path TEXT NOT NULL, "
+        "size_bytes INTEGER NOT NULL, row_count INTEGER, "
+        "created_at REAL NOT NULL, last_accessed_at REAL NOT NULL, expires_at REAL NOT NULL)"
+    )
+    _ensure_lineage_table(conn)
+    return conn
+
+
+def _ensure_lineage_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS export_lineage ("
+        "lineage_key TEXT PRIMARY KEY, data_source TEXT NOT NULL, artifact_key TEXT NOT NULL, "
+        "start_date TEXT, end_date TEXT, frame_path TEXT NOT NULL, size_bytes INTEGER NOT NULL, "
+        "updated_at REAL NOT NULL, expires_at REAL NOT NULL)"
+    )
+
+
+def _to_record(row: sqlite3.Row) -> Dict[str, Any]:
+    record = dict(row)
+    record["params"] = json.loads(record["params"])
+    return record
+
+
+def find_artifact(data_source: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Look up a stored export for an identical request.
+
+    Returns:
+        Artifact record (dict) or None if there is no valid artifact
+    """
+    key = make_artifact_key(data_source, params)
+    with _lock:
+        conn = _connect()
+        try:
+            row = conn.execute("SELECT * FROM artifacts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row["expires_at"] < time.time() or not Path(row["path"]).exists():
+                _delete_rows(conn, [row])
+                return None
+            with conn:
+                conn.execute("UPDATE artifacts SET last_accessed_at = ? WHERE key = ?", (time.time(), key))
+            return _to_record(row)
+        finally:
+            conn.close()
+
+
+def save_artifact(
+    data_source: str,
+    params: Dict[str, Any],
+    csv_data: str,
+    file_name: str,
+    row_count: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Store a finished export.
+
+    Args:
+        data_source: Data source key
+        params: Parameters of the export (UI-only keys are ignored)
+        csv_data: Encoded CSV content
+        file_name: Download file name shown to the user
+        row_count: Number of exported rows
+
+    Returns:
+        The stored artifact record
+    """
+    freshness = get_data_freshness()
+    key = make_artifact_key(data_source, params, freshness)
+    path = EXPORT_ARTIFACT_DIR / f"{key}.csv"
+    now = time.time()
+
+    EXPORT_ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(csv_data)
+    tmp_path.replace(path)
+
+    record = {
+        "key": key,
+        "data_source": data_source,
+        "params": normalize_export_params(params),
+        "freshness": freshness,
+        "file_name": file_name,
+        "path": str(path),
+        "size_bytes": path.stat().st_size,
+        "row_count": row_count,
+        "created_at": now,
+        "last_accessed_at": now,
+        "expires_at": now + EXPORT_ARTIFACT_TTL_HOURS * 3600,
+    }
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO artifacts VALUES "
+                    "(:key, :data_source, :params, :freshness, :file_name, :path, "
+                    ":size_bytes, :row_count, :created_at, :last_accessed_at, :expires_at)",
+                    {**record, "params": json.dumps(record["params"], sort_keys=True, default=str)}
+                )
+        finally:
+            conn.close()
+
+    cleanup_artifacts()
+    return record
+
+
+def read_artifact(record: Dict[str, Any]) -> bytes:
+    """Read the stored file of an artifact."""
+    with open(record["path"], 'rb') as f:
+        return f.read()
+
+
+def list_artifacts(data_source: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """Most recent valid artifacts, optionally for one data source (export history)."""
+    query = "SELECT * FROM artifacts WHERE expires_at >= ?"
+    args: list = [time.time()]
+    if data_source:
+        query += " AND data_source = ?"
+        args.append(data_source)
+    query += " ORDER BY created_at DESC LIMIT ?"
+    args.append(limit)
+
+    with _lock:
+        conn = _connect()
+        try:
+            rows = conn.execute(query, args).fetchall()
+        finally:
+            conn.close()
+    return [_to_record(row) for row in rows if Path(row["path"]).exists()]
+
+
+def make_lineage_key(data_source: str, params: Dict[str, Any]) -> str:
+    """Hash of (data_source, params without the date range): identifies a recurring export."""
+    params = {k: v for k, v in normalize_export_params(params).items() if k not in ('start_date', 'end_date')}
+    payload = json.dumps({"data_source": data_source, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_last_export(data_source: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Get the last successful export of the same parameter set (ignoring the date range).
+
+    Returns:
+        Dict with start_date, end_date and the exported DataFrame under 'df', or None
+    """
+    key = make_lineage_key(data_source, params)
+    with _lock:
+        conn = _connect()
+        try:
+            row = conn.execute("SELECT * FROM export_lineage WHERE lineage_key = ?", (key,)).fetchone()
+            if row is None or row["expires_at"] < time.time() or not Path(row["frame_path"]).exists():
+                return None
+            # Reusing the frame is a use of its artifact: keep both from being evicted
+            with conn:
+                conn.execute(
+                    "UPDATE artifacts SET last_accessed_at = ? WHERE key = ?", (time.time(), row["artifact_key"])
+                )
+        finally:
+            conn.close()
+
+    from utils.core.cache_backend import deserialize_frame
+    return {
+        "start_date": row["start_date"],
+        "end_date": row["end_date"],
+        "updated_at": row["updated_at"],
+        "df": deserialize_frame(Path(row["frame_path"]).read_bytes())
+    }
+
+
+def remember_export(data_source: str, params: Dict[str, Any], df, artifact: Dict[str, Any]) -> None:
+    """
+    Keep the result of a successful export as the base for later incremental exports.
+
+    Args:
+        data_source: Data source key
+        params: Parameters of the export
+        df: Exported DataFrame
+        artifact: Record returned by save_artifact for this export; the frame is
+            removed together with it
+    """
+    from utils.core.cache_backend import serialize_frame
+
+    key = make_lineage_key(data_source, params)
+    lineage_dir = EXPORT_ARTIFACT_DIR / "lineage"
+    lineage_dir.mkdir(parents=True, exist_ok=True)
+    frame_path = lineage_dir / f"{key}.arrow"
+    tmp_path = frame_path.with_suffix('.tmp')
+    tmp_path.write_bytes(serialize_frame(df))
+    tmp_path.replace(frame_path)
+
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO export_lineage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, data_source, artifact["key"], params.get('start_date'), params.get('end_date'),
+                     str(frame_path), frame_path.stat().st_size, now, artifact["expires_at"])
+                )
+        finally:
+            conn.close()
+
+    cleanup_artifacts()
+
+
+def _delete_rows(conn: sqlite3.Connection, rows: List[sqlite3.Row]) -> None:
+    """Delete artifacts with their files and the incremental-export frames they own."""
+    with conn:
+        for row in rows:
+            Path(row["path"]).unlink(missing_ok=True)
+            conn.execute("DELETE FROM artifacts WHERE key = ?", (row["key"],))
+        _delete_orphaned_lineage(conn)
+
+
+def _delete_orphaned_lineage(conn: sqlite3.Connection) -> None:
+    orphaned = conn.execute(
+        "SELECT * FROM export_lineage WHERE expires_at < ? OR artifact_key NOT IN (SELECT key FROM artifacts)",
+        (time.time(),)
+    ).fetchall()
+    for row in orphaned:
+        Path(row["frame_path"]).unlink(missing_ok=True)
+        conn.execute("DELETE FROM export_lineage WHERE lineage_key = ?", (row["lineage_key"],))
+
+
+def cleanup_artifacts() -> int:
+    """
+    Remove expired artifacts, then evict least recently used ones until the store fits the quota.
+
+    The incremental-export frames count against the quota and are removed with their artifact.
+
+    Returns:
+        Number of artifacts removed
+    """
+    quota_bytes = EXPORT_ARTIFACT_QUOTA_MB * 1024 * 1024
+    with _lock:
+        conn = _connect()
+        try:
+            expired = conn.execute("SELECT * FROM artifacts WHERE expires_at < ?", (time.time(),)).fetchall()
+            _delete_rows(conn, expired)
+
+            lineage_bytes: Dict[str, int] = {}
+            for row in conn.execute("SELECT artifact_key, size_bytes FROM export_lineage"):
+                lineage_bytes[row["artifact_key"]] = lineage_bytes.get(row["artifact_key"], 0) + row["size_bytes"]
+
+            remaining = conn.execute("SELECT * FROM artifacts ORDER BY last_accessed_at ASC").fetchall()
+            total_bytes = sum(row["size_bytes"] for row in remaining) + sum(lineage_bytes.values())
+            evicted = []
+            for row in remaining:
+                if total_bytes <= quota_bytes:
+                    break
+                evicted.append(row)
+                total_bytes -= row["size_bytes"] + lineage_bytes.get(row["key"], 0)
+            _delete_rows(conn, evicted)
+        finally:
+            conn.close()
+    return len(expired) + len(evicted)
@@ -39,6 +39,35 @@ def split_date_range_by_days(start_date: str, end_date: str, batch_days: int = 7
     return batches
 
 
+def split_date_range_by_months(start_date: str, end_date: str) -> List[Tuple[str, str]]:
+    """
+    Split a date range at calendar month boundaries.
+    
+    Args:
+        start_date: Start date string (YYYY-MM-DD)
+        end_date: End date string (YYYY-MM-DD)
+    
+    Returns:
+        List of tuples: [(start, end), ...], one per (partial) month
+    """
+    start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    
+    batches = []
+    current_start = start
+    
+    while current_start <= end:
+        next_month = (current_start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        current_end = min(next_month - timedelta(days=1), end)
+        batches.append((
+            current_start.strftime('%Y-%m-%d'),
+            current_end.strftime('%Y-%m-%d')
+        ))
+        current_start = current_end + timedelta(days=1)
+    
+    return batches
+
+
 def get_merge_config(product: str) -> Tuple[List[str], Dict[str, Any]]:
     """
     Get merge keys and aggregation dictionary for each product type.
@@ -261,6 +290,8 @@ def merge_batches(dfs: List[pd.DataFrame], product: str = 'keyword_lab') -> pd.D
     df = pd.concat(dfs, ignore_index=True)
     
     merge_keys, agg_dict = get_merge_config(product)
+    # Exports with a column selection only carry some of the metrics
+    agg_dict = {col: func for col, func in agg_dict.items() if col in df.columns}
     
     missing_keys = [k for k in merge_keys if k not in df.columns]
     if missing_keys:
@@ -274,7 +305,8 @@ def merge_batches(dfs: List[pd.DataFrame], product: str = 'keyword_lab') -> pd.D
     for c in other_cols:
         agg_dict_full[c] = 'first'
     
-    df_merged = df.groupby(merge_keys, as_index=False).agg(agg_dict_full)
+    # observed=True: categorical keys must not expand to every combination of categories
+    df_merged = df.groupby(merge_keys, as_index=False, observed=True).agg(agg_dict_full)
     return df_merged
 
 
@@ -325,4 +357,120 @@ def get_recommended_batch_size(num_storefronts: int, date_range_days: int) -> in
     elif num_storefronts <= 5:
         return 7   # 1 week
     else:
-        return 7   # 1 week for 5+ storefronts
\ No newline at end of file
+        return 7   # 1 week for 5+ storefronts
+
+# Time granularity of each product's output rows, used for incremental exports.
+# - 'day':   rows carry a daily date column, so old days can simply be dropped
+# - 'month': rows are aggregated per month, so new days must be re-aggregated into them
+# - None:    rows are aggregated over the whole date range
+DATE_GRAIN_CONFIGS = {
+    'keyword_lab': {'date_grain': 'month', 'date_column': 'month'},
+    'keyword_performance': {'date_grain': 'month', 'date_column': 'created_datetime'},
+    'product_tracking': {'date_grain': 'day', 'date_column': 'created_datetime'},
+    'competition_landscape': {'date_grain': 'day', 'date_column': 'created_datetime'},
+    'storefront_optimization': {'date_grain': None, 'date_column': None},
+    'campaign_optimization': {'date_grain': 'month', 'date_column': 'month'},
+    'ads_object_optimization': {'date_grain': 'month', 'date_column': 'month'},
+}
+
+
+def get_date_grain_config(product: str) -> Dict[str, Optional[str]]:
+    """
+    Get the date granularity of a product's output rows.
+    
+    Args:
+        product: Product type identifier
+    
+    Returns:
+        Dict with 'date_grain' ('day', 'month' or None) and 'date_column'
+    """
+    if product not in DATE_GRAIN_CONFIGS:
+        raise ValueError(f"Invalid product: {product}. Available: {list(DATE_GRAIN_CONFIGS.keys())}")
+    return DATE_GRAIN_CONFIGS[product]
+
+
+def plan_incremental_export(
+    product: str,
+    start_date: str,
+    end_date: str,
+    previous_start: Optional[str],
+    previous_end: Optional[str],
+) -> Dict[str, Any]:
+    """
+    Decide how a new export can reuse the previous export of the same parameter set.
+    
+    Modes:
+    - 'full': previous export can't be reused, fetch everything
+    - 'reuse': previous export already covers exactly this range
+    - 'append': same start date, fetch only the days after the previous end date
+      and re-aggregate them into the previous rows
+    - 'slide': later start date (daily-grain products only), drop days before the new
+      start and append the new days
+    
+    Returns:
+        Dict with 'mode' and, when something has to be fetched, 'fetch_start' / 'fetch_end'
+    """
+    full = {"mode": "full", "fetch_start": start_date, "fetch_end": end_date}
+    if not previous_start or not previous_end:
+        return full
+    
+    start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    prev_start = datetime.strptime(previous_start, '%Y-%m-%d').date()
+    prev_end = datetime.strptime(previous_end, '%Y-%m-%d').date()
+    
+    # The new range must continue the previous one without gaps or shrinking at the end
+    if end < prev_end or start > prev_end + timedelta(days=1) or start < prev_start:
+        return full
+    
+    if start == prev_start and end == prev_end:
+        return {"mode": "reuse"}
+    
+    if start == prev_start:
+        mode = "append"
+    elif get_date_grain_config(product)['date_grain'] == 'day':
+        mode = "slide"
+    else:
+        # Month/range aggregated rows can't be un-aggregated when the start moves
+        return full
+    
+    if end == prev_end:
+        return {"mode": mode}
+    
+    return {
+        "mode": mode,
+        "fetch_start": (prev_end + timedelta(days=1)).strftime('%Y-%m-%d'),
+        "fetch_end": end_date
+    }
+
+
+def merge_incremental(
+    previous_df: pd.DataFrame,
+    delta_df: Optional[pd.DataFrame],
+    product: str,
+    start_date: str,
+    mode: str,
+) -> pd.DataFrame:
+    """
+    Merge newly fetched days into a previous export.
+    
+    Args:
+        previous_df: Result of the previous export
+        delta_df: Rows for the new days (may be None/empty)
+        product: Product type identifier
+        start_date: Start date of the new export (YYYY-MM-DD)
+        mode: 'append' or 'slide' (see plan_incremental_export)
+    
+    Returns:
+        DataFrame equivalent to a full export of the new range
+    """
+    base_df = previous_df
+    if mode == 'slide':
+        date_column = get_date_grain_config(product)['date_column']
+        keep = pd.to_datetime(base_df[date_column]) >= pd.Timestamp(start_date)
+        base_df = base_df[keep]
+    
+    if delta_df is None or delta_df.empty:
+        return base_df.reset_index(drop=True)
+    
+    return merge_batches([base_df, delta_df], product=product)
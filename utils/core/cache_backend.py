@@ -0,0 +1,277 @@
+"""
+Query Result Cache Backends
+
+`st.cache_data` keeps a separate store in every Streamlit process, so each replica behind
+the load balancer computes the same exports again. Query results are cached through the
+backend interface below instead, which can be shared between processes and restarts.
+
+Backends (EXPORT_CACHE_BACKEND):
+- "sqlite" (default): a SQLite file, put it on a shared volume for multi-replica setups
+- "redis": any Redis-compatible server (requires the `redis` package)
+- "memory": process-local dictionary, a stand-in for local development and tests
+
+Values are DataFrames stored as (zstd-compressed) Arrow IPC streams, not pickles: a cache
+on a shared volume or Redis server must not be able to run code in the app when it is
+read. Results larger than EXPORT_CACHE_MAX_ENTRY_MB (big export batches) are not cached,
+and the sqlite and memory backends evict their oldest entries beyond EXPORT_CACHE_MAX_MB
+(for Redis, configure maxmemory with an eviction policy on the server).
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+import pandas as pd
+
+from utils.config import (
+    EXPORT_CACHE_BACKEND, EXPORT_CACHE_PATH, EXPORT_CACHE_URL, EXPORT_CACHE_MAX_ENTRY_MB, EXPORT_CACHE_MAX_MB
+)
+
+# Returned by get() when a key is not cached (None can be a valid cached value)
+MISSING = object()
+
+MAX_ENTRY_BYTES = int(EXPORT_CACHE_MAX_ENTRY_MB * 1024 * 1024)
+MAX_TOTAL_BYTES = int(EXPORT_CACHE_MAX_MB * 1024 * 1024)
+
+
+def serialize_frame(df: pd.DataFrame) -> bytes:
+    """DataFrame -> Arrow IPC stream bytes."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema, options=pa.ipc.IpcWriteOptions(compression="zstd")) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def deserialize_frame(payload: bytes) -> pd.DataFrame:
+    """Arrow IPC stream bytes -> DataFrame."""
+    import pyarrow as pa
+
+    with pa.ipc.open_stream(pa.py_buffer(payload)) as reader:
+        return reader.read_all().to_pandas()
+
+
+class CacheBackend:
+    """Interface for query result caches. Values are DataFrames."""
+
+    def get(self, key: str) -> Any:
+        """Return the cached value or MISSING."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: pd.DataFrame, ttl: Optional[float] = None) -> None:
+        """Store a DataFrame, expiring after `ttl` seconds (None = never). Skipped above MAX_ENTRY_BYTES."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Process-local cache. Does not survive restarts or share across replicas."""
+
+    def __init__(self, max_bytes: int = MAX_TOTAL_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Oldest first: (expires_at, payload) per key
+        self._data: OrderedDict = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, payload = entry
+            if expires_at is not None and expires_at < time.time():
+                self._pop(key)
+                return MISSING
+        return deserialize_frame(payload)
+
+    def set(self, key: str, value: pd.DataFrame, ttl: Optional[float] = None) -> None:
+        payload = serialize_frame(value)
+        if len(payload) > MAX_ENTRY_BYTES:
+            return
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (expires_at, payload)
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes and self._data:
+                self._pop(next(iter(self._data)))
+
+    def _pop(self, key: str) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Cache stored in a SQLite file. Shared by every process that can reach the file."""
+
+    def __init__(self, path: Path, max_bytes: int = MAX_TOTAL_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            # size and the timestamps come before the value so that the eviction queries
+            # don't read the blobs
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS frame_cache ("
+                "key TEXT PRIMARY KEY, expires_at REAL, stored_at REAL NOT NULL, "
+                "size INTEGER NOT NULL, value BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS frame_cache_stored_at ON frame_cache (stored_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per operation keeps this safe across threads and processes
+        return sqlite3.connect(str(self.path), timeout=30)
+
+    def get(self, key: str) -> Any:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value, expires_at FROM frame_cache WHERE key = ?", (key,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return MISSING
+        payload, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            self.delete(key)
+            return MISSING
+        return deserialize_frame(payload)
+
+    def set(self, key: str, value: pd.DataFrame, ttl: Optional[float] = None) -> None:
+        payload = serialize_frame(value)
+        if len(payload) > MAX_ENTRY_BYTES:
+            return
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO frame_cache (key, expires_at, stored_at, size, value) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, expires_at, now, len(payload), sqlite3.Binary(payload))
+                )
+                self._evict(conn, now)
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then the oldest ones until the cache fits in max_bytes."""
+        conn.execute("DELETE FROM frame_cache WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM frame_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evict = []
+        for key, size in conn.execute("SELECT key, size FROM frame_cache ORDER BY stored_at"):
+            if total <= self.max_bytes:
+                break
+            evict.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM frame_cache WHERE key = ?", evict)
+
+    def delete(self, key: str) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM frame_cache WHERE key = ?", (key,))
+        finally:
+            conn.close()
+
+    def clear(self) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM frame_cache")
+        finally:
+            conn.close()
+
+
+class RedisCacheBackend(CacheBackend):
+    """Cache stored in a Redis-compatible server."""
+
+    KEY_PREFIX = "data_export:frame:"
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError(
+                "The 'redis' package is required for EXPORT_CACHE_BACKEND=redis. "
+                "Install it with: pip install redis"
+            ) from e
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Any:
+        payload = self._client.get(self.KEY_PREFIX + key)
+        if payload is None:
+            return MISSING
+        return deserialize_frame(payload)
+
+    def set(self, key: str, value: pd.DataFrame, ttl: Optional[float] = None) -> None:
+        payload = serialize_frame(value)
+        if len(payload) > MAX_ENTRY_BYTES:
+            return
+        self._client.set(self.KEY_PREFIX + key, payload, ex=int(ttl) if ttl else None)
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self.KEY_PREFIX + key)
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match=self.KEY_PREFIX + "*"):
+            self._client.delete(key)
+
+
+_backend: Optional[CacheBackend] = None
+_backend_lock = threading.Lock()
+
+
+def create_cache_backend(name: str) -> CacheBackend:
+    """Build a backend by name ('sqlite', 'redis' or 'memory')."""
+    if name == "sqlite":
+        return SQLiteCacheBackend(EXPORT_CACHE_PATH)
+    if name == "redis":
+        if not EXPORT_CACHE_URL:
+            raise ValueError("EXPORT_CACHE_URL must be set when EXPORT_CACHE_BACKEND=redis")
+        return RedisCacheBackend(EXPORT_CACHE_URL)
+    if name == "memory":
+        return MemoryCacheBackend()
+    raise ValueError(f"Unknown cache backend: {name}. Available: ['sqlite', 'redis', 'memory']")
+
+
+def get_cache_backend() -> CacheBackend:
+    """Get the configured process-wide cache backend (created on first use)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_cache_backend(EXPORT_CACHE_BACKEND)
+    return _backend
+
+
+def set_cache_backend(backend: CacheBackend) -> None:
+    """Replace the process-wide backend (e.g. with a MemoryCacheBackend in tools)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
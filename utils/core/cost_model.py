@@ -0,0 +1,188 @@
+"""
+Export Cost Model & Admission Control
+
+Estimates how expensive an export is for the database and decides how it is admitted,
+instead of refusing requests based on fixed date-range limits.
+
+    estimated_cost = rows x seconds_per_row(data_source)
+
+`seconds_per_row` starts from a per-source prior and is learned from past exports
+(exponential moving average). Learned values are stored in a small JSON file under
+STATE_DIR so they survive restarts.
+"""
+
+import json
+import math
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Any, Optional
+
+from utils.config import (
+    STATE_DIR, EXPORT_COST_BUDGET_SECONDS, MAX_CONCURRENT_OVER_BUDGET_EXPORTS, OVER_BUDGET_QUEUE_TIMEOUT_SECONDS
+)
+from utils.core.scheduler import ExportScheduler
+
+# Starting point for each source before any export has been observed (seconds per result row).
+# Sources that aggregate a lot of raw data into few rows have a high per-row cost.
+DEFAULT_SECONDS_PER_ROW = {
+    'storefront_in_workspace': 0.00001,
+    'keyword_lab': 0.0005,
+    'keyword_performance': 0.002,
+    'product_tracking': 0.001,
+    'competition_landscape': 0.001,
+    'storefront_optimization': 0.05,
+    'campaign_optimization': 0.01,
+    'ads_object_optimization': 0.005,
+}
+FALLBACK_SECONDS_PER_ROW = 0.001
+
+# Weight of the newest observation in the moving average
+LEARNING_RATE = 0.3
+
+COST_STATS_FILE = STATE_DIR / "cost_stats.json"
+
+_stats_lock = threading.Lock()
+# Queue of the exports that exceed the budget even at 1-day batches: a scheduler of its own
+# with only the bulk lane in use, so waiting exports are served fairly and see their position
+_over_budget_queue = ExportScheduler(
+    total_slots=MAX_CONCURRENT_OVER_BUDGET_EXPORTS,
+    interactive_reserved=0,
+    bulk_limit=MAX_CONCURRENT_OVER_BUDGET_EXPORTS,
+)
+
+
+def _load_stats() -> Dict[str, Any]:
+    try:
+        with open(COST_STATS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_stats(stats: Dict[str, Any]) -> None:
+    COST_STATS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = COST_STATS_FILE.with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=2)
+    tmp_file.replace(COST_STATS_FILE)
+
+
+def get_seconds_per_row(data_source: str) -> float:
+    """Get the learned (or default) cost per result row for a data source."""
+    with _stats_lock:
+        stats = _load_stats().get(data_source)
+    if stats and stats.get('seconds_per_row'):
+        return float(stats['seconds_per_row'])
+    return DEFAULT_SECONDS_PER_ROW.get(data_source, FALLBACK_SECONDS_PER_ROW)
+
+
+def record_export_run(data_source: str, num_rows: int, duration_seconds: float) -> None:
+    """
+    Update the learned per-row cost of a data source with a finished export.
+
+    Args:
+        data_source: Data source key
+        num_rows: Row count reported by the count query for the export
+        duration_seconds: Database time spent fetching the data (summed query execution time,
+            without queueing for slots; see logic.track_database_work)
+    """
+    if not num_rows or num_rows <= 0 or duration_seconds <= 0:
+        return
+
+    observed = duration_seconds / num_rows
+    with _stats_lock:
+        all_stats = _load_stats()
+        stats = all_stats.get(data_source, {})
+        previous = stats.get('seconds_per_row')
+        if previous:
+            observed = (1 - LEARNING_RATE) * float(previous) + LEARNING_RATE * observed
+        all_stats[data_source] = {
+            'seconds_per_row': observed,
+            'runs': int(stats.get('runs', 0)) + 1,
+            'updated_at': datetime.now().isoformat()
+        }
+        _save_stats(all_stats)
+
+
+def estimate_export_cost(data_source: str, num_rows: int) -> float:
+    """Estimate the database cost (seconds) of exporting `num_rows` rows."""
+    return float(num_rows or 0) * get_seconds_per_row(data_source)
+
+
+def plan_admission(
+    data_source: str,
+    num_rows: int,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    budget: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Decide how an export should be admitted based on its estimated cost.
+
+    Args:
+        data_source: Data source key
+        num_rows: Row count from the count query
+        start_date: Start date string (YYYY-MM-DD), if the source is date based
+        end_date: End date string (YYYY-MM-DD), if the source is date based
+        budget: Cost budget in seconds (default: EXPORT_COST_BUDGET_SECONDS)
+
+    Returns:
+        Dictionary with:
+        - action: 'admit' (run as-is), 'partition' (smaller batches so each fits the budget)
+          or 'queue' (even 1-day batches exceed the budget, wait for a heavy-export slot)
+        - estimated_cost, budget
+        - batch_days: batch size to use, or None to keep the default
+    """
+    budget = EXPORT_COST_BUDGET_SECONDS if budget is None else budget
+    estimated_cost = estimate_export_cost(data_source, num_rows)
+    plan = {
+        "action": "admit",
+        "estimated_cost": estimated_cost,
+        "budget": budget,
+        "batch_days": None
+    }
+
+    if estimated_cost <= budget:
+        return plan
+
+    if not start_date or not end_date:
+        # Nothing to partition on, the export can only wait for its turn
+        plan["action"] = "queue"
+        return plan
+
+    total_days = (datetime.strptime(end_date, '%Y-%m-%d').date() -
+                  datetime.strptime(start_date, '%Y-%m-%d').date()).days + 1
+    cost_per_day = estimated_cost / max(total_days, 1)
+    batch_days = int(math.floor(budget / cost_per_day)) if cost_per_day > 0 else total_days
+
+    if batch_days >= 1:
+        plan["action"] = "partition"
+        plan["batch_days"] = min(batch_days, total_days)
+    else:
+        plan["action"] = "queue"
+        plan["batch_days"] = 1
+
+    return plan
+
+
+@contextmanager
+def over_budget_slot(
+    user_id: str = 'anonymous',
+    on_wait: Optional[Callable[[int], None]] = None,
+    timeout: Optional[float] = OVER_BUDGET_QUEUE_TIMEOUT_SECONDS,
+):
+    """
+    Wait for one of the limited slots reserved for exports that exceed the budget.
+
+    Args:
+        user_id: Identifier used for fair sharing between sessions
+        on_wait: Called with the 1-based queue position while the export waits. An
+            exception raised by it (e.g. a Streamlit rerun) leaves the queue.
+        timeout: Seconds to wait at most (None waits indefinitely)
+
+    Raises:
+        TimeoutError: If no slot became free within `timeout` seconds
+    """
+    with _over_budget_queue.slot('bulk', user_id, on_wait, timeout=timeout):
+        yield
@@ -1,49 +1,302 @@
+"""
+Database Engines
+
+Engines are created on first use, not on import: pages that never query (the guide page,
+a page before the user clicks "Get Data") don't load SQLAlchemy or the driver, and a
+missing configuration is reported where a query needs it (DatabaseConfigError) instead of
+stopping every page that happens to import this module.
+
+Every configured database has a name: PRIMARY ("main", DATABASE_URL or DB_*) and the read
+replicas of DB_REPLICA_URLS ("replica1", "replica2", ... or the names given there).
+utils/core/routing.py decides which one a query runs on.
+
+- get_engine(name): SQLAlchemy engine (SQLAlchemy rows, pd.read_sql)
+- get_arrow_engine(name): engine whose singlestoredb connections return Arrow tables; it
+  shares the connection budget of the database with get_engine(name) (_pool_sizes)
+- get_connection(name): session context manager on get_engine(name)
+
+Connections are not pinged on checkout: utils/core/pool_health.py validates idle ones in
+the background and callers retry once on a stale connection (is_stale_connection_error).
+"""
+
 import os
-import streamlit as st
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import QueuePool
+import threading
 from contextlib import contextmanager
-from dotenv import load_dotenv
-
-# Load environment variables from the .env file
-load_dotenv()
-
-# Get database configuration from environment variables
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
-
-# Check if all variables exist
-if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME]):
-    st.error("Database configuration error: One or more environment variables are missing. Please check your .env file.")
-    st.stop()
-
-# Build the database connection URL
-SQLALCHEMY_DATABASE_URL = (
-    f"singlestoredb://{DB_USER}:{DB_PASSWORD}@"
-    f"{DB_HOST}:{DB_PORT}/{DB_NAME}"
+from typing import Any, Dict, List
+from utils.config import (
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_AUTOSIZE, DB_POOL_AUTOSIZE_MAX,
+    DB_POOL_HEALTH_CHECK_INTERVAL, DB_REPLICA_URLS, DB_CANCEL_TIMEOUT
 )
 
-# Create the SQLAlchemy engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=25,
-    max_overflow=15,
-    pool_timeout=45,
-    pool_recycle=1800,
-    pool_pre_ping=True 
-)
+PRIMARY = "main"
+
+
+class DatabaseConfigError(RuntimeError):
+    """The database settings (DB_* or DATABASE_URL) are missing or incomplete."""
+
+
+_lock = threading.Lock()
+_database_url = None
+_replica_urls = None
+_engines: Dict[str, Any] = {}
+_session_factories: Dict[str, Any] = {}
+# Engines whose driver connections return results as Arrow tables (created on first use)
+_arrow_engines: Dict[str, Any] = {}
+# Unpooled engines that send KILL QUERY for cancel_query (created on first use)
+_cancel_engines: Dict[str, Any] = {}
+
+# With adaptive concurrency the pool must be able to serve the highest slot limit
+_max_overflow = max(DB_MAX_OVERFLOW, DB_POOL_AUTOSIZE_MAX - DB_POOL_SIZE) if DB_POOL_AUTOSIZE else DB_MAX_OVERFLOW
+# Share of DB_POOL_SIZE the main pool keeps open next to an Arrow pool (sessions, plan
+# captures and the pd.read_sql fallback); the data queries run on the Arrow pool
+_MAIN_POOL_SHARE_WITH_ARROW = 0.2
+
+
+def get_database_url() -> str:
+    """
+    SQLAlchemy URL of the primary database.
+
+    DATABASE_URL (e.g. a local stand-in for load tests, see tools/stand_in_db.py) replaces
+    the DB_USER / DB_PASSWORD / DB_HOST / DB_PORT / DB_NAME settings (.env is loaded by
+    utils.config).
+
+    Raises:
+        DatabaseConfigError: If neither DATABASE_URL nor all DB_* settings are set
+    """
+    global _database_url
+    if _database_url is not None:
+        return _database_url
+
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        settings = {name: os.getenv(name) for name in ("DB_USER", "DB_PASSWORD", "DB_HOST", "DB_PORT", "DB_NAME")}
+        missing = [name for name, value in settings.items() if not value]
+        if missing:
+            raise DatabaseConfigError(
+                f"Database configuration error: {', '.join(missing)} not set. Please check your .env file."
+            )
+        url = (
+            f"singlestoredb://{settings['DB_USER']}:{settings['DB_PASSWORD']}@"
+            f"{settings['DB_HOST']}:{settings['DB_PORT']}/{settings['DB_NAME']}"
+        )
+    _database_url = url
+    return url
+
+
+def get_replica_urls() -> Dict[str, str]:
+    """
+    Read replicas of DB_REPLICA_URLS as {name: url}.
+
+    Entries are comma-separated URLs, optionally prefixed with a name
+    ("analytics=singlestoredb://..."); unnamed ones are called replica1, replica2, ...
+
+    Raises:
+        DatabaseConfigError: If a name is used twice or clashes with the primary
+    """
+    global _replica_urls
+    if _replica_urls is not None:
+        return _replica_urls
+
+    replicas = {}
+    for i, entry in enumerate((e.strip() for e in DB_REPLICA_URLS.split(",") if e.strip()), start=1):
+        name, sep, url = entry.partition("=")
+        # "=" inside a URL (query string) is not a name separator
+        if not sep or "://" in name:
+            name, url = f"replica{i}", entry
+        name = name.strip()
+        if name == PRIMARY or name in replicas:
+            raise DatabaseConfigError(
+                f"Database configuration error: duplicate engine name '{name}' in DB_REPLICA_URLS."
+            )
+        replicas[name] = url.strip()
+    _replica_urls = replicas
+    return replicas
+
+
+def engine_names() -> List[str]:
+    """The primary followed by the configured replicas."""
+    return [PRIMARY, *get_replica_urls()]
+
+
+def get_engine_url(name: str = PRIMARY) -> str:
+    if name == PRIMARY:
+        return get_database_url()
+    try:
+        return get_replica_urls()[name]
+    except KeyError:
+        raise DatabaseConfigError(f"Unknown database engine '{name}'. Configured: {engine_names()}") from None
+
+
+def check_database_config() -> None:
+    """Raise DatabaseConfigError early (pages call this before rendering their forms)."""
+    get_database_url()
+    get_replica_urls()
+
+
+def _pool_sizes(url: str, arrow: bool) -> tuple:
+    """
+    (pool_size, max_overflow) of the main or the Arrow pool of a database.
+
+    Both pools of a database share one budget: together they keep DB_POOL_SIZE connections
+    open, and each can grow to DB_POOL_SIZE + overflow on its own (the queries hold a
+    scheduler slot, so both together stay within that too). Without an Arrow pool (drivers
+    other than singlestoredb) the main pool has the whole budget.
+    """
+    if not url.startswith("singlestoredb"):
+        return DB_POOL_SIZE, _max_overflow
+    main_size = max(1, round(DB_POOL_SIZE * _MAIN_POOL_SHARE_WITH_ARROW))
+    size = max(1, DB_POOL_SIZE - main_size) if arrow else main_size
+    return size, DB_POOL_SIZE + _max_overflow - size
+
+
+def _create_engine(url: str, pool_name: str, connect_args: dict, arrow: bool = False):
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import QueuePool
+    from utils.core.pool_telemetry import instrument_engine
+
+    pool_size, max_overflow = _pool_sizes(url, arrow)
+    engine = create_engine(
+        url,
+        connect_args=connect_args,
+        poolclass=QueuePool,
+        pool_logging_name=pool_name,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=1800,
+        # Idle connections are validated in the background instead (utils/core/pool_health.py)
+        pool_pre_ping=DB_POOL_HEALTH_CHECK_INTERVAL <= 0
+    )
+    instrument_engine(engine, pool_name)
+    if DB_POOL_HEALTH_CHECK_INTERVAL > 0:
+        from utils.core.pool_health import watch_engine
+        watch_engine(engine, pool_name)
+    return engine
+
+
+def get_engine(name: str = PRIMARY):
+    """SQLAlchemy engine of a configured database, created on first use."""
+    engine = _engines.get(name)
+    if engine is None:
+        with _lock:
+            engine = _engines.get(name)
+            if engine is None:
+                from sqlalchemy.orm import sessionmaker
+
+                url = get_engine_url(name)
+                # SQLite connections are shared between the pool's threads
+                connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+                engine = _create_engine(url, name, connect_args)
+                _session_factories[name] = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+                if DB_POOL_AUTOSIZE and name == PRIMARY:
+                    from utils.core.pool_telemetry import start_pool_autosizer
+                    start_pool_autosizer()
+                _engines[name] = engine
+    return engine
+
+
+def get_arrow_engine(name: str = PRIMARY):
+    """Engine for the Arrow fetch path: the singlestoredb driver returns pyarrow Tables."""
+    url = get_engine_url(name)
+    if not url.startswith("singlestoredb"):
+        raise RuntimeError("Arrow results need the singlestoredb driver")
+    engine = _arrow_engines.get(name)
+    if engine is None:
+        with _lock:
+            engine = _arrow_engines.get(name)
+            if engine is None:
+                engine = _create_engine(url, arrow_pool_name(name), {"results_type": "arrow"}, arrow=True)
+                _arrow_engines[name] = engine
+    return engine
+
+
+def arrow_pool_name(name: str) -> str:
+    """Metrics label of an Arrow engine's pool: "arrow" for the primary, "<name>_arrow" for replicas."""
+    return "arrow" if name == PRIMARY else f"{name}_arrow"
+
+
+def _any_engine(name: str):
+    return _engines.get(name) or _arrow_engines.get(name)
+
+
+def is_stale_connection_error(error: BaseException, name: str = PRIMARY) -> bool:
+    """True if a query failed on a dead pooled connection and can be retried once."""
+    engine = _any_engine(name)
+    if engine is None:
+        return False
+    from utils.core.pool_health import is_stale_connection_error as _is_stale
+    return _is_stale(error, engine)
+
+
+def is_connection_error(error: BaseException, name: str = PRIMARY) -> bool:
+    """True if a query failed because the database itself is unavailable (fail over to another one)."""
+    engine = _any_engine(name)
+    if engine is None:
+        return False
+    from utils.core.pool_health import is_connection_error as _is_connection_error
+    return _is_connection_error(error, engine)
+
+
+def _get_cancel_engine(name: str):
+    """
+    Engine without a pool for KILL QUERY: the pool of `name` is likely saturated when a
+    query gets cancelled, and a cancel must not queue behind it for DB_POOL_TIMEOUT.
+    """
+    engine = _cancel_engines.get(name)
+    if engine is None:
+        with _lock:
+            engine = _cancel_engines.get(name)
+            if engine is None:
+                from sqlalchemy import create_engine
+                from sqlalchemy.pool import NullPool
+
+                url = get_engine_url(name)
+                timeout = max(1, int(DB_CANCEL_TIMEOUT))
+                connect_args = {"connect_timeout": timeout}
+                # singlestoredb only has a connect timeout; the MySQL drivers also time out reads
+                if url.startswith("mysql"):
+                    connect_args.update(read_timeout=timeout, write_timeout=timeout)
+                engine = create_engine(url, connect_args=connect_args, poolclass=NullPool)
+                _cancel_engines[name] = engine
+    return engine
+
+
+def cancel_query(name: str, dbapi_connection) -> bool:
+    """
+    Abort the statement running on a driver connection of engine `name`, from another thread.
+
+    SQLite: connection.interrupt(). MySQL protocol (SingleStore): KILL QUERY <connection id>
+    on a new connection outside the pool, with DB_CANCEL_TIMEOUT. The connection itself
+    stays usable.
+
+    Returns:
+        False if the driver doesn't expose the connection id (the statement keeps running)
+    """
+    if get_engine_url(name).startswith("sqlite"):
+        dbapi_connection.interrupt()
+        return True
+
+    thread_id = getattr(dbapi_connection, "thread_id", None)
+    connection_id = thread_id() if callable(thread_id) else getattr(dbapi_connection, "connection_id", None)
+    if connection_id is None:
+        return False
+
+    from sqlalchemy import text
+    with _get_cancel_engine(name).connect() as conn:
+        conn.execute(text(f"KILL QUERY {int(connection_id)}"))
+    return True
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 @contextmanager
-def get_connection():
-    db = SessionLocal()
+def get_connection(name: str = PRIMARY):
+    from utils.core.pool_telemetry import timed_checkout
+
+    engine = get_engine(name)
+    with timed_checkout(name):
+        connection = engine.connect()
+    db = _session_factories[name](bind=connection)
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+        connection.close()
@@ -0,0 +1,301 @@
+"""
+Dimension Cache & Client-side Joins
+
+Every batch of an export used to re-join the same slowly changing dimension tables
+(onsite_storefront, ads_ops_storefront, global_company, onsite_keyword*, passport_workspace).
+For sources with a fact-only query variant (data_logic/sql/{source}_fact.sql) the database
+only returns IDs + metrics; names and attributes are attached here with vectorized joins
+against compact, indexed dimension frames.
+
+Dimension frames are loaded once per workspace and refreshed after EXPORT_DIMENSION_TTL_SECONDS.
+Dimensions looked up by ID (e.g. competitor storefronts outside the workspace) only fetch
+the IDs that are not cached yet.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import pandas as pd
+
+from utils.config import EXPORT_DIMENSION_CACHE, EXPORT_DIMENSION_TTL_SECONDS
+from utils.core.batch_export import get_merge_config
+
+# --- Dimension definitions ---
+# scope 'workspace': loaded completely for a workspace (:workspace_id)
+# scope 'ids': rows fetched on demand for the IDs found in fact rows (:ids)
+DIMENSIONS = {
+    "workspace": {
+        "scope": "workspace",
+        "key": "workspace_id",
+        "sql": """
+            SELECT ws.id AS workspace_id
+            FROM passport_workspace ws
+            WHERE ws.id = :workspace_id
+        """
+    },
+    "workspace_ads_storefront": {
+        "scope": "workspace",
+        "key": "storefront_id",
+        "sql": """
+            SELECT DISTINCT
+                ads_ops_storefront.id AS storefront_id,
+                ads_ops_storefront.name AS storefront_name,
+                ads_ops_storefront.country_code,
+                ads_ops_storefront.marketplace_code,
+                ads_ops_storefront.global_company_id
+            FROM kw_discovery_storefront_workspace workspace
+            JOIN onsite_storefront ON onsite_storefront.id = workspace.storefront_id
+            JOIN ads_ops_storefront ON onsite_storefront.ads_ops_storefront_id = ads_ops_storefront.id
+            WHERE workspace.workspace_id = :workspace_id
+        """
+    },
+    "workspace_keyword": {
+        "scope": "workspace",
+        "key": "keyword_id",
+        "sql": """
+            SELECT DISTINCT
+                k.id AS keyword_id,
+                k.keyword,
+                k.marketplace_name
+            FROM onsite_keyword_workspace kw_ws
+            JOIN onsite_keyword_sharded k ON k.id = kw_ws.keyword_id
+            WHERE kw_ws.workspace_id = :workspace_id
+        """
+    },
+    "onsite_storefront": {
+        "scope": "ids",
+        "key": "storefront_id",
+        "sql": """
+            SELECT sf.id AS storefront_id, sf.storefront_name, sf.global_company_id
+            FROM onsite_storefront sf
+            WHERE sf.id IN :ids
+        """
+    },
+    "global_company": {
+        "scope": "ids",
+        "key": "global_company_id",
+        "sql": """
+            SELECT gc.id AS global_company_id, gc.name AS global_company_name
+            FROM global_company gc
+            WHERE gc.id IN :ids
+        """
+    },
+}
+
+# Max IDs per lookup query for 'ids' dimensions
+_ID_CHUNK_SIZE = 5000
+
+
+def _compact(df: pd.DataFrame, key: str) -> pd.DataFrame:
+    """
+    Index on the key and store repeated strings as categories to keep frames small.
+
+    Columns that are later joined or grouped on (_KEY_COLUMNS) keep their dtype: a categorical
+    key makes groupbys produce every category combination and merges with frames of other
+    batches fall back to object.
+    """
+    df = df.drop_duplicates(subset=[key]).set_index(key)
+    for column in df.columns:
+        if column in _KEY_COLUMNS or len(df) == 0:
+            continue
+        if pd.api.types.is_string_dtype(df[column]) and df[column].nunique() < 0.5 * len(df):
+            df[column] = df[column].astype('category')
+    return df
+
+
+def _format_ids(ids: Iterable[Any]) -> str:
+    # IDs are cast to int, so formatting them into the SQL is safe (same approach as storefront_ids)
+    safe_ids = [int(i) for i in ids]
+    return f"({safe_ids[0]})" if len(safe_ids) == 1 else str(tuple(safe_ids))
+
+
+class DimensionCache:
+    """Process-wide cache of dimension frames, refreshed on a TTL."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # (dimension, workspace_id) -> {"loaded_at": float, "df": DataFrame}
+        self._entries: Dict[tuple, Dict[str, Any]] = {}
+
+    def _get_entry(self, name: str, workspace_id: int) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get((name, workspace_id))
+        if entry and time.time() - entry["loaded_at"] > self.ttl_seconds:
+            del self._entries[(name, workspace_id)]
+            return None
+        return entry
+
+    def get_workspace_dimension(self, name: str, workspace_id: int) -> pd.DataFrame:
+        """Get a workspace-scoped dimension, loading it on first use or after the TTL."""
+        from utils.core.logic import _execute_query
+
+        spec = DIMENSIONS[name]
+        with self._lock:
+            entry = self._get_entry(name, workspace_id)
+        if entry is not None:
+            return entry["df"]
+
+        df = _compact(_execute_query(spec["sql"], {"workspace_id": workspace_id}, data_source="dimensions", query_type=name), spec["key"])
+        with self._lock:
+            self._entries[(name, workspace_id)] = {"loaded_at": time.time(), "df": df}
+        return df
+
+    def lookup_ids(self, name: str, workspace_id: int, ids: Iterable[Any]) -> pd.DataFrame:
+        """Get dimension rows for the given IDs, fetching only the ones not cached yet."""
+        from utils.core.logic import _execute_query
+
+        spec = DIMENSIONS[name]
+        wanted = pd.Index(pd.Series(list(ids)).dropna().unique())
+        with self._lock:
+            entry = self._get_entry(name, workspace_id)
+            cached_df = entry["df"] if entry else None
+
+        missing = wanted if cached_df is None else wanted.difference(cached_df.index)
+        if len(missing) > 0:
+            new_frames = [
+                _execute_query(spec["sql"].replace(":ids", _format_ids(missing[i:i + _ID_CHUNK_SIZE])), {},
+                               data_source="dimensions", query_type=name)
+                for i in range(0, len(missing), _ID_CHUNK_SIZE)
+            ]
+            new_df = pd.concat(new_frames, ignore_index=True).drop_duplicates(subset=[spec["key"]])
+            combined = new_df.set_index(spec["key"])
+            if cached_df is not None:
+                combined = pd.concat([cached_df.astype(object), combined.astype(object)])
+            cached_df = _compact(combined.reset_index(), spec["key"])
+            with self._lock:
+                loaded_at = entry["loaded_at"] if entry else time.time()
+                self._entries[(name, workspace_id)] = {"loaded_at": loaded_at, "df": cached_df}
+
+        return cached_df
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+dimension_cache = DimensionCache(EXPORT_DIMENSION_TTL_SECONDS)
+
+
+# --- Per-source client-side joins ---
+# Output columns match the regular data query of each source
+STOREFRONT_OPTIMIZATION_COLUMNS = [
+    "company_name", "storefront_id", "storefront_name", "country_code", "marketplace_code",
+    "gmv", "cost", "roas", "cpc", "click", "impression", "ads_order",
+    "direct_gmv", "direct_ads_order", "direct_item_sold", "item_sold"
+]
+COMPETITION_LANDSCAPE_COLUMNS = [
+    "global_company_name", "search_volume", "share_of_search", "storefront_name",
+    "created_datetime", "marketplace_name", "keyword", "display_type",
+    "product_position", "device_type"
+]
+
+
+def _join_storefront_optimization(fact_df: pd.DataFrame, workspace_id: int) -> pd.DataFrame:
+    if fact_df.empty:
+        return pd.DataFrame(columns=STOREFRONT_OPTIMIZATION_COLUMNS)
+
+    storefronts = dimension_cache.get_workspace_dimension("workspace_ads_storefront", workspace_id)
+    companies = dimension_cache.lookup_ids(
+        "global_company", workspace_id, storefronts["global_company_id"]
+    )
+
+    # Inner joins, same as the joins they replace in storefront_optimization_data.sql
+    df = fact_df.join(storefronts, on="storefront_id", how="inner")
+    df = df.join(companies, on="global_company_id", how="inner")
+    df = df.rename(columns={"global_company_name": "company_name"})
+    # Metrics the user didn't select were not fetched (see FACT_JOIN_KEYS)
+    return df[[c for c in STOREFRONT_OPTIMIZATION_COLUMNS if c in df.columns]].reset_index(drop=True)
+
+
+def _join_competition_landscape(fact_df: pd.DataFrame, workspace_id: int) -> pd.DataFrame:
+    # The workspace check replaces the inner join on passport_workspace
+    if fact_df.empty or dimension_cache.get_workspace_dimension("workspace", workspace_id).empty:
+        return pd.DataFrame(columns=COMPETITION_LANDSCAPE_COLUMNS)
+
+    keywords = dimension_cache.get_workspace_dimension("workspace_keyword", workspace_id)
+    storefronts = dimension_cache.lookup_ids("onsite_storefront", workspace_id, fact_df["storefront_id"])
+    companies = dimension_cache.lookup_ids(
+        "global_company", workspace_id, storefronts["global_company_id"]
+    )
+
+    df = fact_df.join(keywords, on="keyword_id", how="inner")
+    df = df.join(storefronts, on="storefront_id", how="inner")
+    df = df.join(companies, on="global_company_id", how="left")
+    df = df[df["created_datetime"].notna()]
+
+    group_keys = [
+        "global_company_name", "storefront_name", "created_datetime", "marketplace_name",
+        "keyword", "display_type", "product_position", "device_type"
+    ]
+    metrics = {c: (c, "mean") for c in ("search_volume", "share_of_search") if c in df.columns}
+    if metrics:
+        df = df.groupby(group_keys, as_index=False, dropna=False, observed=True).agg(**metrics)
+    else:
+        df = df[group_keys].drop_duplicates()
+    df = df.sort_values(["created_datetime", "keyword"], kind="stable")
+    return df[[c for c in COMPETITION_LANDSCAPE_COLUMNS if c in df.columns]].reset_index(drop=True)
+
+
+CLIENT_SIDE_JOINS: Dict[str, Callable[[pd.DataFrame, int], pd.DataFrame]] = {
+    "storefront_optimization": _join_storefront_optimization,
+    "competition_landscape": _join_competition_landscape,
+}
+
+# Dimension columns the joins use as keys or that end up in the merge keys of the joined
+# sources (batch_export.merge_batches); _compact never turns them into categories
+_KEY_COLUMNS = {spec["key"] for spec in DIMENSIONS.values()} | {
+    column for source in CLIENT_SIDE_JOINS for column in get_merge_config(source)[0]
+}
+
+# Fact columns the joins need whatever the user selected; the fact query is projected to
+# these plus the requested columns (logic.build_query)
+FACT_JOIN_KEYS: Dict[str, list] = {
+    "storefront_optimization": ["storefront_id"],
+    "competition_landscape": [
+        "keyword_id", "storefront_id", "created_datetime", "display_type", "product_position", "device_type"
+    ],
+}
+
+
+# Sources whose fact rows are grouped again after the joins (several keyword / storefront
+# IDs can share a name). A LIMIT or an output filter on their fact rows would cut groups
+# apart, so previews and filtered exports of these run the regular data query, where the
+# database aggregates first.
+REAGGREGATED_SOURCES = {"competition_landscape"}
+
+
+def uses_client_side_joins(data_source: str, params: Optional[dict] = None, limit: Optional[int] = None) -> bool:
+    """
+    Whether a source's data query runs as fact-only query + client-side joins.
+
+    Args:
+        data_source: Data source key
+        params: SQL parameters of the request (output filters)
+        limit: Row limit of the request (previews)
+    """
+    if not EXPORT_DIMENSION_CACHE or data_source not in CLIENT_SIDE_JOINS:
+        return False
+    if data_source in REAGGREGATED_SOURCES:
+        from utils.core.logic import has_output_filters
+        return limit is None and not has_output_filters(data_source, params or {})
+    return True
+
+
+def load_with_client_side_joins(data_source: str, limit: int = None, **kwargs) -> pd.DataFrame:
+    """
+    Run the fact-only query of a source and attach dimension attributes.
+
+    Args:
+        data_source: Data source key (must be in CLIENT_SIDE_JOINS)
+        limit: Optional row limit for the fact query (previews)
+        **kwargs: SQL parameters, must include workspace_id; `columns` projects the fact query
+
+    Returns:
+        DataFrame with the same columns as the source's regular data query
+    """
+    from utils.core.logic import build_query, _execute_query
+
+    query, params = build_query("fact", data_source, limit=limit, **kwargs)
+    fact_df = _execute_query(query, params, data_source=data_source, query_type="fact")
+    return CLIENT_SIDE_JOINS[data_source](fact_df, int(kwargs["workspace_id"]))
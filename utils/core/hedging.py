@@ -0,0 +1,278 @@
+"""
+Hedged Export Batches
+
+In a batched export one slow batch sets the pace: now and then a batch lands on a busy
+leaf and takes many times the median. With EXPORT_HEDGING on, run_batched_export runs
+each batch through run_hedged():
+
+1. The batch starts as usual (primary attempt, in a worker thread).
+2. Once its query has been running (from the first acquired connection, so queueing for a
+   scheduler slot doesn't count) longer than the EXPORT_HEDGE_PERCENTILE of recent batches
+   of the same data source, scaled to the batch's days and at least
+   EXPORT_HEDGE_MIN_SECONDS, a duplicate (hedge attempt) is started on another engine when
+   there is one (utils/core/routing.py), otherwise on another pooled connection. Attempts
+   bypass request coalescing: a cancelled attempt must not fail other sessions.
+3. The first successful result wins and the other attempt's query is cancelled
+   (database.cancel_query: KILL QUERY, interrupt() on SQLite).
+
+At most EXPORT_HEDGE_MAX_INFLIGHT hedges run at once per process and a hedge waits for a
+bulk slot like any batch, so the extra load stays limited to the slow tail. Outcomes are
+counted in export_hedged_batches_total (hedge_won, primary_won, hedge_failed, no_budget).
+
+The fetch functions of utils/core/logic.py register the connection they run on with
+bound_connection(), which is how a losing attempt's query is found and cancelled.
+"""
+
+import contextvars
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Optional
+
+from utils.config import (
+    EXPORT_HEDGE_PERCENTILE, EXPORT_HEDGE_MIN_SAMPLES, EXPORT_HEDGE_MIN_SECONDS, EXPORT_HEDGE_MAX_INFLIGHT
+)
+from utils.core.metrics import Counter, register
+from utils.core.tracing import span
+
+HEDGED_BATCHES = register(Counter(
+    "export_hedged_batches_total",
+    "Batches that ran past the hedge threshold, by outcome (hedge_won, primary_won, hedge_failed, no_budget).",
+    ("data_source", "outcome")
+))
+
+# Recent batch durations (seconds per batch day) kept per data source
+HISTORY_SIZE = 200
+# How often the calling thread checks the attempts and forwards queue positions
+POLL_SECONDS = 0.05
+
+
+class AttemptCancelled(RuntimeError):
+    """The attempt lost the race and was cancelled before its query started."""
+
+
+class Attempt:
+    """One execution of a hedged batch (see module docstring)."""
+
+    def __init__(self, hedge: bool = False, avoid_engine: Optional[str] = None):
+        self.hedge = hedge
+        # Engine of the primary attempt, which a hedge should not run on
+        self.avoid_engine = avoid_engine
+        self.engine: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancelled = False
+        self.done = False
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self._connection = None
+        # Counts bind() calls: identifies the query a cancel() is aimed at
+        self._generation = 0
+        # Generation whose query cancel() is killing right now
+        self._killing: Optional[int] = None
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def bind(self, engine_name: str, dbapi_connection):
+        with self._cond:
+            if self.cancelled:
+                raise AttemptCancelled()
+            self._generation += 1
+            generation = self._generation
+            self.engine = engine_name
+            self._connection = dbapi_connection
+            if self.started_at is None:
+                self.started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._cond:
+                # A KILL aimed at this query must not reach the connection once it is back
+                # in the pool running someone else's query (cancel_query has a short timeout)
+                while self._killing == generation:
+                    self._cond.wait()
+                self._connection = None
+
+    def running_for(self) -> float:
+        """Seconds since the attempt's first query started (0 while it waits for a slot)."""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def cancel(self) -> None:
+        """Stop the attempt: its running query is killed, a later one doesn't start."""
+        from utils.core.database import cancel_query
+
+        # Only the flags are set under the lock, the KILL (network I/O) runs outside of it
+        with self._cond:
+            self.cancelled = True
+            if self._connection is None or self._killing is not None:
+                return
+            engine, connection, self._killing = self.engine, self._connection, self._generation
+        try:
+            cancel_query(engine, connection)
+        except Exception as e:
+            print(f"--- WARNING: cancelling a hedged query failed ({type(e).__name__}: {e}) ---")
+        finally:
+            with self._cond:
+                self._killing = None
+                self._cond.notify_all()
+
+
+_current_attempt: contextvars.ContextVar[Optional[Attempt]] = contextvars.ContextVar('hedge_attempt', default=None)
+
+
+def current_attempt() -> Optional[Attempt]:
+    """Attempt of the code currently running (None outside of run_hedged)."""
+    return _current_attempt.get()
+
+
+def is_cancelled() -> bool:
+    attempt = _current_attempt.get()
+    return attempt is not None and attempt.cancelled
+
+
+@contextmanager
+def bound_connection(engine_name: str, dbapi_connection):
+    """Register the driver connection a query runs on with the current attempt (if any)."""
+    attempt = _current_attempt.get()
+    if attempt is None:
+        yield
+        return
+    with attempt.bind(engine_name, dbapi_connection):
+        yield
+
+
+# --- Learned thresholds ---
+_history: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=HISTORY_SIZE))
+_history_lock = threading.Lock()
+
+
+def observe(data_source: str, seconds: float, days: int) -> None:
+    """Record the query time of a batch covering `days` days."""
+    with _history_lock:
+        _history[data_source].append(seconds / max(days, 1))
+
+
+def hedge_threshold(data_source: str, days: int) -> Optional[float]:
+    """
+    Seconds after which a batch of `days` days gets a hedge.
+
+    Returns:
+        None until EXPORT_HEDGE_MIN_SAMPLES batches of the data source were observed
+    """
+    with _history_lock:
+        samples = sorted(_history.get(data_source, ()))
+    if len(samples) < max(EXPORT_HEDGE_MIN_SAMPLES, 1):
+        return None
+    per_day = samples[min(len(samples) - 1, int(len(samples) * EXPORT_HEDGE_PERCENTILE / 100))]
+    return max(EXPORT_HEDGE_MIN_SECONDS, per_day * max(days, 1))
+
+
+def clear_history() -> None:
+    with _history_lock:
+        _history.clear()
+
+
+# --- Execution ---
+_hedge_slots = threading.BoundedSemaphore(max(EXPORT_HEDGE_MAX_INFLIGHT, 1))
+
+
+def _start(attempt: Attempt, fn: Callable, on_wait, finished: threading.Event) -> None:
+    def run():
+        _current_attempt.set(attempt)
+        try:
+            with span("attempt", hedge=attempt.hedge):
+                attempt.result = fn(on_wait)
+        except BaseException as e:
+            attempt.error = e
+        finally:
+            attempt.finished_at = time.perf_counter() if attempt.started_at is not None else None
+            attempt.done = True
+            if attempt.hedge:
+                _hedge_slots.release()
+            finished.set()
+
+    # The worker inherits the caller's context (scheduler lane, parent span)
+    context = contextvars.copy_context()
+    name = "hedge-attempt" if attempt.hedge else "batch-attempt"
+    threading.Thread(target=context.run, args=(run,), name=name, daemon=True).start()
+
+
+def run_hedged(
+    fn: Callable[[Optional[Callable[[int], None]]], Any],
+    data_source: str,
+    days: int,
+    on_wait: Optional[Callable[[int], None]] = None,
+) -> Any:
+    """
+    Run a batch fetch, hedged once it runs past the learned threshold.
+
+    Args:
+        fn: Callable(on_wait) fetching the batch; on_wait is passed on to export_lane
+        data_source: Data source key (the threshold is learned per source)
+        days: Days the batch covers (scales the threshold)
+        on_wait: Callback(queue_position) of the caller. It is called from the calling
+            thread (Streamlit elements can't be updated from the worker threads)
+
+    Returns:
+        Result of the attempt that finished first
+
+    Raises:
+        The primary attempt's exception if it failed and no hedge succeeded
+    """
+    threshold = hedge_threshold(data_source, days)
+    finished = threading.Event()
+    positions: Deque[int] = deque()
+
+    primary = Attempt()
+    _start(primary, fn, positions.append if on_wait else None, finished)
+    hedge: Optional[Attempt] = None
+    hedge_failure_counted = False
+
+    try:
+        while True:
+            finished.wait(POLL_SECONDS)
+            finished.clear()
+            while positions:
+                on_wait(positions.popleft())
+
+            if hedge is not None and hedge.done and hedge.error is None:
+                primary.cancel()
+                HEDGED_BATCHES.inc(data_source=data_source, outcome="hedge_won")
+                # The primary's time so far is a lower bound of its duration, keeps the tail in the history
+                observe(data_source, primary.running_for(), days)
+                return hedge.result
+
+            if primary.done:
+                if primary.error is None:
+                    if hedge is not None:
+                        hedge.cancel()
+                        HEDGED_BATCHES.inc(data_source=data_source, outcome="primary_won")
+                    # Results shared with another session or read from the cache didn't query
+                    if primary.started_at is not None:
+                        observe(data_source, primary.running_for(), days)
+                    return primary.result
+                if hedge is None or hedge.done:
+                    raise primary.error
+                continue
+
+            if hedge is not None and hedge.done and not hedge_failure_counted:
+                hedge_failure_counted = True
+                HEDGED_BATCHES.inc(data_source=data_source, outcome="hedge_failed")
+
+            if hedge is None and threshold is not None and primary.running_for() > threshold:
+                if EXPORT_HEDGE_MAX_INFLIGHT > 0 and _hedge_slots.acquire(blocking=False):
+                    hedge = Attempt(hedge=True, avoid_engine=primary.engine)
+                    _start(hedge, fn, None, finished)
+                else:
+                    HEDGED_BATCHES.inc(data_source=data_source, outcome="no_budget")
+                threshold = None
+    except BaseException:
+        # The caller gave up (e.g. a Streamlit rerun stopped the script): stop both queries
+        if not primary.done:
+            primary.cancel()
+        if hedge is not None and not hedge.done:
+            hedge.cancel()
+        raise
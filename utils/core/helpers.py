@@ -1,12 +1,20 @@
 import streamlit as st
-import functools
-from datetime import datetime
+import uuid
+from utils.core.tracing import traced, recent_traces
+from utils.core.metrics import start_metrics_server
 
 def initialize_session_state():
     """
     Initialize all necessary variables in st.session_state 
     if they don't already exist.
     """
+    # Local Prometheus endpoint (EXPORT_METRICS_PORT); binds once per process
+    start_metrics_server()
+
+    # Identifies this browser session for fair sharing in the export scheduler
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+
     # Existing state variables
     if 'stage' not in st.session_state:
         st.session_state.stage = 'initial'
@@ -18,6 +26,8 @@ def initialize_session_state():
         st.session_state.query_duration = 0
     if 'download_info' not in st.session_state:
         st.session_state.download_info = {}
+    if 'admission' not in st.session_state:
+        st.session_state.admission = {}
 
     # --- USER NOTIFICATIONS ---
     if 'user_message' not in st.session_state:
@@ -44,46 +54,21 @@ def display_user_message():
         st.session_state.user_message = None
 
 
-def trace_function_call(func):
-    """A decorator to trace function calls and log them to the session state."""
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        if 'call_trace' not in st.session_state:
-            st.session_state.call_trace = []
+def _session_attributes():
+    """Tag traces started from a page run with the browser session they belong to."""
+    return {"session": st.session_state.get('session_id')}
+
 
-        call_log = {
-            "function": func.__name__,
-            "module": func.__module__,
-            "timestamp": datetime.now().isoformat(),
-            "status": "start",
-            "args": str(args),
-            "kwargs": str(kwargs)
-        }
-        st.session_state.call_trace.append(call_log)
+# Kept for the existing decorators: calls are recorded as spans (see utils/core/tracing.py),
+# with size-capped argument summaries and a fixed-size buffer instead of session state.
+trace_function_call = traced(root_attributes=_session_attributes)
 
-        try:
-            result = func(*args, **kwargs)
-            st.session_state.call_trace.append({
-                "function": func.__name__,
-                "status": "finish",
-                "timestamp": datetime.now().isoformat(),
-                "return_value": str(result)[:200]  # Truncate long return values
-            })
-            return result
-        except Exception as e:
-            st.session_state.call_trace.append({
-                "function": func.__name__,
-                "status": "error",
-                "timestamp": datetime.now().isoformat(),
-                "error": str(e)
-            })
-            raise e
-    return wrapper
 
 def display_call_trace():
-    """Displays the call trace in a Streamlit expander."""
+    """Displays this session's most recent traces in a Streamlit expander."""
     with st.expander("Show Debug Trace"):
-        if st.session_state.get('call_trace'):
-            st.json(st.session_state.call_trace)
+        traces = recent_traces(limit=10, session=st.session_state.get('session_id'))
+        if traces:
+            st.json(traces)
         else:
-            st.write("No calls have been traced yet.")
\ No newline at end of file
+            st.write("No calls have been traced yet.")
@@ -1,14 +1,36 @@
 import streamlit as st
 import pandas as pd
 from io import StringIO
-from sqlalchemy import text
-from sqlalchemy.exc import OperationalError, ProgrammingError
-from utils.core.database import get_connection
+from utils.core.database import (
+    get_connection, get_arrow_engine, arrow_pool_name, is_stale_connection_error, is_connection_error, DatabaseConfigError
+)
 from utils.core.helpers import trace_function_call
+from utils.core.tracing import span, current_span
+from utils.core.slow_query_log import record_query as record_slow_query
+from utils.core.metrics import (
+    stage, frame_bytes, QUERY_DURATION, QUERY_ROWS, QUERY_BYTES, CACHE_REQUESTS, ERRORS
+)
+import contextvars
 import importlib
-from utils.ui.input_config import DATA_SOURCE_CONFIGS
-from utils.config import PROJECT_ROOT
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from utils.ui.input_config import DATA_SOURCE_CONFIGS, INPUT_FIELDS
+from utils.config import PROJECT_ROOT, EXPORT_CACHE_TTL_SECONDS, EXPORT_FETCH_ENGINE, EXPORT_HEDGING
+from utils.core.cache_backend import get_cache_backend, MISSING, MAX_ENTRY_BYTES as CACHE_MAX_ENTRY_BYTES
+from utils.core.cost_model import plan_admission
+from utils.core.scheduler import export_lane, db_slot, get_current_lane
+from utils.core.routing import get_router
+from utils.core.hedging import run_hedged, current_attempt, bound_connection, is_cancelled
+from utils.core.singleflight import query_flights, make_query_key
+from utils.core.sql_rewrite import (
+    project_columns, get_select_columns, add_having_conditions,
+    prepare_template, referenced_params, inline_id_list
+)
+from utils.core.batch_export import get_merge_config, DATE_GRAIN_CONFIGS
+from datetime import datetime, date, timedelta
 
 
 def get_query_by_source(data_source: str):
@@ -51,6 +73,7 @@ def create_convention_based_query_func(data_source: str):
     Convention:
     - data_logic/sql/{data_source}_data.sql -> get_query("data")
     - data_logic/sql/{data_source}_count.sql -> get_query("count")
+    - data_logic/sql/{data_source}_fact.sql -> get_query("fact") (optional, IDs + metrics only)
     
     Args:
         data_source: The data source key (e.g., "sales_analytics")
@@ -63,7 +86,7 @@ def create_convention_based_query_func(data_source: str):
         Get SQL query content based on naming convention.
         
         Args:
-            query_name: Either "data" or "count"
+            query_name: "data", "count" or "fact"
         
         Returns:
             SQL query string
@@ -71,12 +94,13 @@ def create_convention_based_query_func(data_source: str):
         # 📁 Map query names to SQL file names
         sql_file_map = {
             "data": f"{data_source}_data.sql",
-            "count": f"{data_source}_count.sql"
+            "count": f"{data_source}_count.sql",
+            "fact": f"{data_source}_fact.sql"
         }
         
         file_name = sql_file_map.get(query_name)
         if not file_name:
-            st.error(f"❌ Unknown query type: {query_name}. Expected 'data' or 'count'")
+            st.error(f"❌ Unknown query type: {query_name}. Expected 'data', 'count' or 'fact'")
             return ""
         
         # 📂 Construct file path
@@ -197,6 +221,8 @@ def list_available_data_sources():
 def enable_debug_mode():
     """Enable debug mode to see convention-based loading in action."""
     st.session_state.debug_mode = True
+    # Re-read SQL files so the loading logs show up (and edits are picked up)
+    clear_query_templates()
     st.success("🔧 Debug mode enabled! You'll see detailed logs for convention-based loading.")
 
 
@@ -209,58 +235,561 @@ def disable_debug_mode():
 
 # === REST OF THE FILE UNCHANGED ===
 
-@st.cache_data(show_spinner=False, ttl=3600, persist=True)
-def _execute_query(query: str, params_to_bind: dict) -> pd.DataFrame:
-    print("--- DEBUG: EXECUTING QUERY ---")
-    print(f"Query: {query}")
-    print(f"Params: {params_to_bind}")
-    print("-----------------------------")
-    with get_connection() as db:
-        return pd.read_sql(text(query), db.connection(), params=params_to_bind)
-
-
 @trace_function_call
-@st.cache_data(show_spinner=False, ttl=3600, persist=True)
 def get_data(query_type: str, data_source: str, limit: int = None, **kwargs):
     """
     Fetches data from the DB.
     
     Now supports both existing modules and convention-based SQL file reading.
+    Sources with a fact-only query variant fetch IDs + metrics and attach names and
+    attributes from the in-memory dimension cache.
     """
-    get_query_func = get_query_by_source(data_source)
-    base_query_str = get_query_func(query_type)
+    from utils.core.dimension_cache import uses_client_side_joins, load_with_client_side_joins
     
-    params_to_bind = kwargs.copy()
+    if query_type == 'data' and uses_client_side_joins(data_source, kwargs, limit):
+        columns = kwargs.get('columns')
+        df = load_with_client_side_joins(data_source, limit=limit, **kwargs)
+        # The fact query only fetched the selected metrics, dimension attributes are dropped here
+        if columns:
+            keep = set(columns) | set(_get_required_columns(data_source))
+            df = df[[c for c in df.columns if c in keep]]
+        return df
+    
+    final_query_str, params_to_bind = build_query(query_type, data_source, limit=limit, **kwargs)
+    return _execute_query(final_query_str, params_to_bind, data_source=data_source, query_type=query_type)
+
+
+def build_query(query_type: str, data_source: str, limit: int = None, **kwargs):
+    """
+    Build the final SQL text and bind parameters for a query.
+    
+    Args:
+        query_type: "data", "count" or "fact"
+        data_source: Data source key
+        limit: Optional row limit (data/fact queries only)
+        **kwargs: SQL parameters
+    
+    Returns:
+        Tuple of (sql string, params to bind)
+    """
+    # Keyword filters are optional predicates on the keyword dimension in the SQL files,
+    # specialized like the other optional filters (None removes them)
+    query_params = {**kwargs, **build_keyword_patterns(data_source, kwargs)}
+    null_params = tuple(sorted(k for k, v in query_params.items() if v is None))
+    base_query_str = get_query_template(data_source, query_type, null_params)
+    
+    params_to_bind = query_params.copy()
+    columns = params_to_bind.pop('columns', None)
+    filter_conditions, filter_params, filter_columns = build_filter_conditions(data_source, params_to_bind)
+    for field_name in _get_filter_fields(data_source):
+        if INPUT_FIELDS[field_name]['filter']['operator'] == '>=':
+            params_to_bind.pop(INPUT_FIELDS[field_name]['sql_param'], None)
+
+    if filter_conditions and query_type == 'count':
+        # The count has to match the filtered export: count the rows of the filtered data query
+        count_kwargs = {k: v for k, v in kwargs.items() if k != 'columns'}
+        data_query_str, data_params = build_query('data', data_source, columns=filter_columns, **count_kwargs)
+        return f"select count(1) from ({data_query_str}) filtered_rows", data_params
+
+    # Column selection: only compute the requested output columns. Fact queries also keep
+    # the IDs and keys the client-side joins need (dimension_cache.FACT_JOIN_KEYS)
+    if columns and query_type in ('data', 'fact'):
+        config = DATA_SOURCE_CONFIGS.get(data_source, {})
+        keep = _get_required_columns(data_source) + filter_columns
+        if query_type == 'fact':
+            from utils.core.dimension_cache import FACT_JOIN_KEYS
+            keep += FACT_JOIN_KEYS.get(data_source, [])
+        base_query_str = project_columns(
+            base_query_str,
+            columns,
+            keep=keep,
+            prunable_joins=config.get('prunable_joins', ())
+        )
+
+    # Output filters run in the database. Fact queries have one row per output row or get
+    # no filters (see dimension_cache.REAGGREGATED_SOURCES), so HAVING works the same there
+    if filter_conditions and query_type in ('data', 'fact'):
+        base_query_str = add_having_conditions(base_query_str, filter_conditions)
+        params_to_bind.update(filter_params)
 
     # SQLAlchemy's text() construct doesn't natively support expanding a list for an IN clause when used with pandas.read_sql.
     # To work around this, we safely format the list of integer IDs directly into the SQL string.
     # This is safe from SQL injection because we explicitly cast all IDs to integers first.
     if 'storefront_ids' in params_to_bind and isinstance(params_to_bind['storefront_ids'], (list, tuple)) and ':storefront_ids' in base_query_str:
-        storefront_ids = params_to_bind['storefront_ids']
-        
-        safe_ids = [int(sid) for sid in storefront_ids]
-        
-        if len(safe_ids) == 1:
-            ids_string = f"({safe_ids[0]})"
-        else:
-            ids_string = str(tuple(safe_ids))
-
-        base_query_str = base_query_str.replace(':storefront_ids', ids_string)
-        
-        del params_to_bind['storefront_ids']    
+        base_query_str = inline_id_list(base_query_str, 'storefront_ids', params_to_bind['storefront_ids'])
+        del params_to_bind['storefront_ids']
     elif 'storefront_ids' in params_to_bind:
         # Clean up storefront_ids if they are not needed in the query to avoid sending them to the DB driver
         del params_to_bind['storefront_ids']
 
-    if limit is not None and query_type == 'data':
+    # Exclusive upper bound of the rewritten date ranges, computed here instead of in SQL
+    if params_to_bind.get('end_date'):
+        params_to_bind['end_date_next'] = _next_day(params_to_bind['end_date'])
+
+    if limit is not None and query_type in ('data', 'fact'):
         final_query_str = f"{base_query_str} LIMIT {limit}"
     else:
         final_query_str = base_query_str
     
-    query = text(final_query_str)
+    # Only send parameters the (specialized) text still uses, e.g. not the None filters
+    used_params = referenced_params(final_query_str)
+    params_to_bind = {k: v for k, v in params_to_bind.items() if k in used_params}
+    
+    return final_query_str, params_to_bind
+
+
+def _next_day(value) -> str:
+    """The day after a date (date object or YYYY-MM-DD string) as YYYY-MM-DD."""
+    day = value if isinstance(value, date) else datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+    return (day + timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+# Specialized query templates keyed by (data_source, query_type, parameters that are None).
+# Every combination of present optional filters gets its own text, and so its own plan.
+_QUERY_TEMPLATE_CACHE_SIZE = 256
+_query_templates = OrderedDict()
+_query_templates_lock = threading.Lock()
+
+
+def get_query_template(data_source: str, query_type: str, null_params: tuple = ()) -> str:
+    """
+    Get the SQL template of a source, specialized for the optional filters that are set.
+    
+    `(:x is null or col = :x)` predicates become `col = :x` when x has a value (`like`
+    predicates likewise) and are removed when x is None (see sql_rewrite.specialize_optional_filters). Date filters
+    become `col >= :start_date and col < :end_date_next` (sql_rewrite.rewrite_date_ranges).
+    
+    Args:
+        data_source: Data source key
+        query_type: "data", "count" or "fact"
+        null_params: Names of the parameters whose value is None
+    
+    Returns:
+        SQL template string (empty if the query could not be loaded)
+    """
+    key = (data_source, query_type, tuple(sorted(null_params)))
+    with _query_templates_lock:
+        if key in _query_templates:
+            _query_templates.move_to_end(key)
+            return _query_templates[key]
+    
+    # Optional filters specialized, half-open date ranges (end_date_next is bound in build_query)
+    template = prepare_template(get_query_by_source(data_source)(query_type), null_params)
+    if template:
+        with _query_templates_lock:
+            _query_templates[key] = template
+            while len(_query_templates) > _QUERY_TEMPLATE_CACHE_SIZE:
+                _query_templates.popitem(last=False)
+    return template
+
+
+def clear_query_templates():
+    """Drop cached templates (e.g. after editing SQL files of a running server)."""
+    with _query_templates_lock:
+        _query_templates.clear()
+    _text_clause.cache_clear()
+
+
+@lru_cache(maxsize=512)
+def _text_clause(query: str):
+    """Compiled text() construct per final query text, shared by all batches and sessions."""
+    from sqlalchemy import text
+    return text(query)
+
+
+def _get_filter_fields(data_source: str) -> list:
+    """Input fields of a data source that filter on output columns (INPUT_FIELDS[...]['filter'])."""
+    config = DATA_SOURCE_CONFIGS.get(data_source, {})
+    return [f for f in config.get('inputs', []) if INPUT_FIELDS.get(f, {}).get('filter')]
+
+
+def _get_active_filters(data_source: str, params: dict) -> list:
+    """(sql_param, filter spec, value) of every filter field that has a value."""
+    active = []
+    for field_name in _get_filter_fields(data_source):
+        field_config = INPUT_FIELDS[field_name]
+        value = params.get(field_config['sql_param'])
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "":
+            continue
+        active.append((field_config['sql_param'], field_config['filter'], value))
+    return active
+
+
+def _escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def build_filter_conditions(data_source: str, params: dict):
+    """
+    Build HAVING conditions for the threshold filters of a data source.
+    
+    Thresholds apply to aggregated metrics, i.e. output columns of the data query, so they
+    are appended to its final statement (see sql_rewrite.add_having_conditions). Keyword
+    filters run before the GROUP BY instead (build_keyword_patterns).
+    
+    Returns:
+        Tuple of (conditions, params to bind, filtered columns)
+    """
+    conditions, bind_params, columns = [], {}, []
+    for param, spec, value in _get_active_filters(data_source, params):
+        column, operator = spec['column'], spec['operator']
+        if operator in _KEYWORD_PATTERNS:
+            continue
+        if operator != '>=':
+            raise ValueError(f"Unknown filter operator: {operator}")
+        conditions.append(f"{column} >= :{param}")
+        bind_params[param] = float(value)
+        if column not in columns:
+            columns.append(column)
+    return conditions, bind_params, columns
+
+
+# LIKE pattern of each keyword filter operator
+_KEYWORD_PATTERNS = {
+    'contains': lambda value: f"%{_escape_like(value)}%",
+    'prefix': lambda value: f"{_escape_like(value)}%",
+}
+
+
+def build_keyword_patterns(data_source: str, params: dict) -> dict:
+    """
+    LIKE patterns of the keyword filters of a data source.
+    
+    The SQL files filter the keyword dimension with `(:keyword_contains is null or
+    k.keyword like :keyword_contains)` in the WHERE clause, so the rows are dropped before
+    they are joined and grouped. Every keyword filter of the source is returned, None if it
+    has no value (the predicate is then removed, see get_query_template).
+    
+    Returns:
+        Dict of {sql_param: LIKE pattern or None}
+    """
+    patterns = {}
+    for field_name in _get_filter_fields(data_source):
+        field_config = INPUT_FIELDS[field_name]
+        operator = field_config['filter']['operator']
+        if operator in _KEYWORD_PATTERNS:
+            patterns[field_config['sql_param']] = None
+    for param, spec, value in _get_active_filters(data_source, params):
+        if spec['operator'] in _KEYWORD_PATTERNS:
+            patterns[param] = _KEYWORD_PATTERNS[spec['operator']](str(value))
+    return patterns
+
+
+def has_output_filters(data_source: str, params: dict) -> bool:
+    """Whether any threshold / keyword filter is active."""
+    return bool(_get_active_filters(data_source, params))
+
+
+def has_threshold_filters(data_source: str, params: dict) -> bool:
+    """Whether a numeric threshold filter is active (these depend on fully aggregated rows)."""
+    return any(spec['operator'] == '>=' for _, spec, _ in _get_active_filters(data_source, params))
+
+
+def _get_required_columns(data_source: str) -> list:
+    """Columns every export of a source keeps: the merge keys used to combine batches."""
+    try:
+        merge_keys, _ = get_merge_config(data_source)
+    except ValueError:
+        return []
+    return merge_keys
+
+
+def get_export_columns(data_source: str) -> dict:
+    """
+    Column metadata of a data source, derived from its data query.
+    
+    Returns:
+        Dict with 'columns' (all output columns, in query order) and 'required'
+        (columns that are always exported because batches are merged on them)
+    """
+    try:
+        columns = get_select_columns(get_query_by_source(data_source)("data"))
+    except Exception:
+        columns = []
+    return {"columns": columns, "required": _get_required_columns(data_source)}
+
+
+def _execute_query(query: str, params_to_bind: dict, data_source: str = 'unknown', query_type: str = 'data') -> pd.DataFrame:
+    """
+    Execute a query through the shared result cache.
+    
+    - Results are cached in the configured cache backend (shared between replicas and restarts).
+    - Identical concurrent requests (same normalized SQL and parameters) from any session
+      cost exactly one database execution.
+    - Duration, rows, bytes, cache result and errors are recorded in utils.core.metrics,
+      labelled with data_source and query_type; slow executions go to the slow-query log.
+    """
+    started = time.perf_counter()
+    cache = get_cache_backend()
+    cache_key = make_query_key(query, params_to_bind)
+    
+    with span("query", data_source=data_source, query_type=query_type) as query_span:
+        # A broken cache must never break an export, it only costs a database round trip
+        try:
+            cached_df = cache.get(cache_key)
+        except Exception as e:
+            print(f"--- WARNING: cache read failed ({type(e).__name__}: {e}) ---")
+            cached_df = MISSING
+        if cached_df is not MISSING:
+            query_span.set("cache", "hit")
+            query_span.set("rows", len(cached_df))
+            _record_query_metrics(data_source, query_type, "hit", started, cached_df)
+            return cached_df
+        
+        def execute():
+            # Wait for a slot in the current scheduler lane (interactive unless inside a bulk export)
+            with db_slot():
+                with span("fetch", engine="pandas" if _arrow_fetch_disabled else "arrow"):
+                    fetch_start = time.perf_counter()
+                    df, engine_name = _fetch_dataframe(query, params_to_bind)
+                    fetch_duration = time.perf_counter() - fetch_start
+            work = _database_work.get()
+            if work is not None:
+                work.add_fetch_time(fetch_duration)
+            record_slow_query(query, params_to_bind, fetch_duration, len(df), data_source, query_type, engine_name)
+            result_bytes = frame_bytes(df)
+            QUERY_BYTES.inc(result_bytes, data_source=data_source, query_type=query_type)
+            # Large export batches would only push everything else out of the cache; don't
+            # even serialize them (the backend checks the exact size of the rest)
+            if result_bytes <= CACHE_MAX_ENTRY_BYTES:
+                try:
+                    cache.set(cache_key, df, ttl=EXPORT_CACHE_TTL_SECONDS)
+                except Exception as e:
+                    print(f"--- WARNING: cache write failed ({type(e).__name__}: {e}) ---")
+            return df
+        
+        try:
+            # Attempts of a hedged batch may be cancelled, so other sessions must not wait on
+            # them, and a hedge duplicates its primary on purpose: no coalescing for either
+            if current_attempt() is not None:
+                df, shared = execute(), False
+            else:
+                df, shared = query_flights.do(cache_key, execute)
+        except Exception as e:
+            if not is_cancelled():
+                ERRORS.inc(data_source=data_source, stage='query', error_class=type(e).__name__)
+            raise
+        query_span.set("cache", "shared" if shared else "miss")
+        query_span.set("rows", len(df))
+        _record_query_metrics(data_source, query_type, "shared" if shared else "miss", started, df)
+        return df
+
+
+def _record_query_metrics(data_source: str, query_type: str, cache_result: str, started: float, df: pd.DataFrame):
+    work = _database_work.get()
+    if work is not None:
+        work.add(cache_result)
+    QUERY_DURATION.observe(time.perf_counter() - started, data_source=data_source, query_type=query_type, cache=cache_result)
+    QUERY_ROWS.observe(len(df), data_source=data_source, query_type=query_type)
+    CACHE_REQUESTS.inc(data_source=data_source, result=cache_result)
+
+
+class DatabaseWork:
+    """
+    Cache results ("hit", "shared", "miss") and database time of the queries run inside
+    track_database_work().
+    """
+
+    def __init__(self):
+        self.counts = {"hit": 0, "shared": 0, "miss": 0}
+        # Summed execution time of the queries this caller ran, without waiting for a
+        # scheduler slot or merging batches
+        self.fetch_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, cache_result: str) -> None:
+        # Hedged attempts run in worker threads that share this object
+        with self._lock:
+            self.counts[cache_result] = self.counts.get(cache_result, 0) + 1
+
+    def add_fetch_time(self, seconds: float) -> None:
+        with self._lock:
+            self.fetch_seconds += seconds
+
+    @property
+    def all_from_database(self) -> bool:
+        """True if at least one query ran and every one was executed by this caller (no cache, no coalescing)."""
+        return self.counts["miss"] > 0 and self.counts["hit"] == 0 and self.counts["shared"] == 0
+
+
+_database_work = contextvars.ContextVar('database_work', default=None)
+
+
+@contextmanager
+def track_database_work():
+    """
+    Count how the queries run inside the block were answered and how long they ran.
+
+    The export cost model (utils/core/cost_model.py) only learns from exports whose batches
+    actually ran on the database: a result read from the cache or shared with another
+    session takes next to no time and would make the source look cheap. It learns from
+    fetch_seconds, not the wall time: time spent queueing for a slot grows with the load
+    and would make every source look more expensive exactly when queues are long.
+
+    Yields:
+        DatabaseWork of the block
+    """
+    work = DatabaseWork()
+    token = _database_work.set(work)
+    try:
+        yield work
+    finally:
+        _database_work.reset(token)
+
+
+# Set once the Arrow path turned out to be unavailable (no pyarrow, driver without Arrow results)
+_arrow_fetch_disabled = EXPORT_FETCH_ENGINE != "arrow"
+
+
+def _fetch_dataframe(query: str, params_to_bind: dict):
+    """
+    Run a query on the database chosen by utils/core/routing.py (bulk lane: read replicas,
+    interactive: primary) with the configured fetch engine (EXPORT_FETCH_ENGINE).
+    
+    If the database is unavailable (database.is_connection_error) it is marked down and the
+    query runs once more on the next candidate.
     
-    with get_connection() as db:
-        return pd.read_sql(query, db.connection(), params=params_to_bind)
+    Returns:
+        Tuple of (DataFrame, name of the database the query ran on)
+    """
+    router = get_router()
+    lane = get_current_lane()
+    # A hedged batch's duplicate runs on another engine than the original when there is one
+    attempt = current_attempt()
+    avoid = [attempt.avoid_engine] if attempt is not None and attempt.avoid_engine else []
+    name = (router.route(lane, exclude=avoid) if avoid else None) or router.route(lane)
+    try:
+        df = _fetch_dataframe_on(name, query, params_to_bind)
+    except Exception as e:
+        # A cancelled hedge attempt fails on purpose, the engine is fine
+        if is_cancelled() or not (router.replicas and is_connection_error(e, name)):
+            raise
+        router.mark_failed(name, e)
+        fallback = router.route(lane, exclude=[name])
+        if fallback is None:
+            raise
+        name = fallback
+        df = _fetch_dataframe_on(name, query, params_to_bind)
+    router.mark_ok(name)
+    return df, name
+
+
+def _fetch_dataframe_on(name: str, query: str, params_to_bind: dict) -> pd.DataFrame:
+    fetch_span = current_span()
+    if fetch_span is not None:
+        fetch_span.set("database", name)
+    if not _arrow_fetch_disabled:
+        df = _retry_stale_connection(name, _fetch_arrow, query, params_to_bind)
+        if df is not None:
+            return df
+
+    return _retry_stale_connection(name, _read_sql, query, params_to_bind)
+
+
+def _read_sql(name: str, query: str, params_to_bind: dict) -> pd.DataFrame:
+    with get_connection(name) as db:
+        connection = db.connection()
+        with bound_connection(name, connection.connection.dbapi_connection):
+            return pd.read_sql(_text_clause(query), connection, params=params_to_bind)
+
+
+def _retry_stale_connection(name: str, fetch, query: str, params_to_bind: dict):
+    """
+    Run fetch(name, query, params_to_bind), once more if it failed on a dead pooled connection.
+    
+    Checkouts are not pinged (utils/core/pool_health.py validates idle connections in the
+    background), so a connection that died since the last health check surfaces here.
+    The failed connection and the ones opened before it are invalidated by then, the retry
+    gets a fresh one.
+    """
+    try:
+        return fetch(name, query, params_to_bind)
+    except Exception as e:
+        if is_cancelled() or not is_stale_connection_error(e, name):
+            raise
+        from utils.core.pool_telemetry import POOL_EVENTS
+        POOL_EVENTS.inc(engine=name if fetch is _read_sql else arrow_pool_name(name), event="stale_retry")
+        print(f"--- WARNING: stale database connection ({type(e).__name__}), retrying the query once ---")
+    return fetch(name, query, params_to_bind)
+
+
+def _fetch_arrow(name: str, query: str, params_to_bind: dict):
+    """
+    Fetch a result as an Arrow table and convert it to pandas.
+    
+    Skips the SQLAlchemy row / Python tuple stage of pd.read_sql: the driver builds columnar
+    buffers and numeric columns are handed to pandas without copying.
+    
+    Returns:
+        DataFrame, or None if the Arrow path is not available (caller falls back to pd.read_sql)
+    """
+    global _arrow_fetch_disabled
+    try:
+        import pyarrow as pa
+        from utils.core.pool_telemetry import timed_checkout
+        engine = get_arrow_engine(name)
+        with timed_checkout(arrow_pool_name(name)):
+            conn = engine.raw_connection()
+    except Exception as e:
+        if is_cancelled():
+            raise
+        from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+        # An unavailable database fails pd.read_sql too (and fails over from there) and a full
+        # pool frees up again; anything else means the Arrow path doesn't work here
+        if not (is_connection_error(e, name) or isinstance(e, PoolTimeoutError)):
+            _arrow_fetch_disabled = True
+        print(f"--- WARNING: Arrow fetch unavailable ({type(e).__name__}: {e}), using pd.read_sql ---")
+        return None
+
+    try:
+        # Render the text() query in the driver's paramstyle
+        compiled = _text_clause(query).compile(dialect=engine.dialect)
+        bound = compiled.construct_params(params_to_bind)
+        if compiled.positional:
+            bound = tuple(bound[name] for name in compiled.positiontup)
+
+        cursor = conn.cursor()
+        try:
+            with bound_connection(name, conn.dbapi_connection):
+                cursor.execute(compiled.string, bound)
+                result = cursor.fetchall()
+            columns = [col[0] for col in cursor.description or []]
+        finally:
+            cursor.close()
+    except Exception as e:
+        if is_stale_connection_error(e, name):
+            # Drop the dead connection instead of returning it to the pool; other dead idle
+            # ones are found by the health sweep or by their next query's retry
+            conn.invalidate(e)
+        raise
+    finally:
+        conn.close()
+
+    if result is None:
+        return pd.DataFrame(columns=columns)
+    if not isinstance(result, pa.Table):
+        # Driver ignored results_type: keep the rows we already have, use read_sql from now on
+        print("--- WARNING: driver did not return Arrow results, using pd.read_sql ---")
+        _arrow_fetch_disabled = True
+        return pd.DataFrame.from_records(list(result), columns=columns, coerce_float=True)
+
+    return _arrow_to_pandas(result)
+
+
+def _arrow_to_pandas(table) -> pd.DataFrame:
+    """Convert an Arrow result table to pandas with the dtypes pd.read_sql would produce."""
+    import pyarrow as pa
+
+    # pd.read_sql coerces DECIMAL to float, do the same on the Arrow side
+    for i, field in enumerate(table.schema):
+        if pa.types.is_decimal(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+
+    # split_blocks avoids consolidating columns into 2D blocks (no extra copy),
+    # self_destruct frees Arrow buffers as columns are converted (lower peak memory)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
 
 
 @trace_function_call
@@ -311,6 +840,8 @@ def get_row_count(data_source: str, **kwargs) -> int:
 @trace_function_call
 def handle_export_process(data_source: str):
     """Handle the entire process: row counting, and status updates."""
+    from sqlalchemy.exc import OperationalError, ProgrammingError
+
     # `st.session_state.params` is now set by the caller (`create_action_buttons`)
     params = st.session_state.get('params', {}).copy()
 
@@ -319,6 +850,7 @@ def handle_export_process(data_source: str):
     current_page = params.pop('current_page', None)
     params.pop('data_source', None)
     sql_params = params
+    st.session_state.admission = {}
 
     try:
         with st.spinner("Checking data size..."):
@@ -356,9 +888,39 @@ def handle_export_process(data_source: str):
         #     st.session_state.stage = 'blocked'  # Set to blocked state instead of initial
         #     return
         else:
-            # Data size is acceptable, proceed with loading preview
+            # Decide how the export is admitted based on its estimated cost
+            admission = plan_admission(
+                data_source,
+                int(num_row),
+                start_date=sql_params.get('start_date'),
+                end_date=sql_params.get('end_date')
+            )
+            st.session_state.admission = admission
+
+            if admission["action"] == "partition":
+                st.session_state.user_message = {
+                    "type": "info",
+                    "text": f"This export is estimated to cost ~{admission['estimated_cost']:,.0f}s of database time "
+                            f"(budget {admission['budget']:,.0f}s). It will be split into "
+                            f"{admission['batch_days']}-day batches."
+                }
+            elif admission["action"] == "queue":
+                st.session_state.user_message = {
+                    "type": "warning",
+                    "text": f"This export is estimated to cost ~{admission['estimated_cost']:,.0f}s of database time "
+                            f"(budget {admission['budget']:,.0f}s). It will be queued behind other large exports "
+                            f"and processed in 1-day batches."
+                }
+
+            # Proceed with loading preview
             st.session_state.stage = 'loading_preview'
 
+    except DatabaseConfigError as e:
+        st.session_state.user_message = {
+            "type": "error",
+            "text": f"❌ {str(e)}"
+        }
+        st.session_state.stage = 'initial'
     except OperationalError as e:
         st.session_state.user_message = {
             "type": "error",
@@ -379,38 +941,25 @@ def handle_export_process(data_source: str):
         st.session_state.stage = 'initial'
 
 
-def convert_df_to_csv(df: pd.DataFrame):
-    output = StringIO()
-    df.to_csv(output, index=False, encoding='utf-8-sig')
-    return output.getvalue()
+def convert_df_to_csv(df: pd.DataFrame, data_source: str = None):
+    with span("encode", rows=len(df)) as encode_span, stage("encode", data_source) as recorded:
+        output = StringIO()
+        df.to_csv(output, index=False, encoding='utf-8-sig')
+        csv_data = output.getvalue()
+        encode_span.set("chars", len(csv_data))
+        recorded.rows = len(df)
+        recorded.bytes = len(csv_data)
+    return csv_data
 
 
-@trace_function_call
-def load_data_with_batching(data_source: str, batch_days: int = 7, **sql_params):
+def plan_export_batches(data_source: str, start_date: str, end_date: str, batch_days: int = 7, **sql_params):
     """
-    Load data using batch processing for large date ranges.
-    
-    Args:
-        data_source: Data source key
-        batch_days: Number of days per batch
-        **sql_params: SQL parameters including start_date, end_date
+    Split an export's date range into batches.
     
     Returns:
-        Merged DataFrame
+        Tuple of (batch_days actually used, list of (start, end) date string tuples)
     """
-    import streamlit as st
-    from utils.core.batch_export import (
-        split_date_range_by_days, 
-        merge_batches,
-        get_recommended_batch_size
-    )
-    
-    start_date = sql_params.get('start_date')
-    end_date = sql_params.get('end_date')
-    
-    if not start_date or not end_date:
-        st.error("Start date and end date are required for batch export")
-        return None
+    from utils.core.batch_export import split_date_range_by_days, split_date_range_by_months, get_recommended_batch_size
     
     # Get recommended batch size
     storefront_ids = sql_params.get('storefront_ids', [])
@@ -418,48 +967,217 @@ def load_data_with_batching(data_source: str, batch_days: int = 7, **sql_params)
     date_range_days = (datetime.strptime(end_date, '%Y-%m-%d').date() - 
                        datetime.strptime(start_date, '%Y-%m-%d').date()).days + 1
     
+    # A threshold on an aggregated metric is only correct on complete rows, so batches
+    # must not split an output row: whole months for monthly rows, one batch for range totals
+    if has_threshold_filters(data_source, sql_params):
+        date_grain = DATE_GRAIN_CONFIGS.get(data_source, {}).get('date_grain', 'day')
+        if date_grain is None:
+            return date_range_days, [(start_date, end_date)]
+        if date_grain == 'month':
+            batches = split_date_range_by_months(start_date, end_date)
+            longest = max(
+                (datetime.strptime(e, '%Y-%m-%d') - datetime.strptime(s, '%Y-%m-%d')).days + 1
+                for s, e in batches
+            )
+            return longest, batches
+    
     recommended_batch_days = get_recommended_batch_size(num_storefronts, date_range_days)
     batch_days = min(batch_days, recommended_batch_days)
     
-    # Split date range into batches
-    batches = split_date_range_by_days(start_date, end_date, batch_days)
+    return batch_days, split_date_range_by_days(start_date, end_date, batch_days)
+
+
+def run_batched_export(
+    data_source: str,
+    batches: list,
+    user_id: str = 'anonymous',
+    on_batch_start=None,
+    on_wait=None,
+    on_batch_done=None,
+    **sql_params
+):
+    """
+    Fetch all batches of an export in the bulk scheduler lane and merge them.
     
-    st.info(f"📦 Processing {len(batches)} batch(es) with {batch_days} days per batch...")
+    This is the UI-free core of the batch pipeline, shared by the Streamlit exporter
+    and the scheduled export runner. With EXPORT_HEDGING, slow batches are hedged
+    (utils/core/hedging.py).
     
-    # Progress bar
-    progress_bar = st.progress(0)
-    status_text = st.empty()
+    Args:
+        data_source: Data source key
+        batches: List of (start_date, end_date) tuples from plan_export_batches
+        user_id: Identifier used for fair sharing in the scheduler
+        on_batch_start: Optional callback(index, batch_start, batch_end)
+        on_wait: Optional callback(index, queue_position) while a batch waits for a slot
+        on_batch_done: Optional callback(index, df_batch)
+        **sql_params: SQL parameters (start_date/end_date are replaced per batch)
+    
+    Returns:
+        Merged DataFrame, or None if no batch returned data
+    """
+    from utils.core.batch_export import merge_batches
     
     all_dfs = []
     
     for i, (batch_start, batch_end) in enumerate(batches):
-        status_text.text(f"Processing batch {i+1}/{len(batches)}: {batch_start} to {batch_end}")
+        if on_batch_start:
+            on_batch_start(i, batch_start, batch_end)
         
         # Update SQL params with batch dates
         batch_params = sql_params.copy()
         batch_params['start_date'] = batch_start
         batch_params['end_date'] = batch_end
         
-        # Load data for this batch
-        df_batch = get_data("data", data_source, limit=None, **batch_params)
+        wait_callback = (lambda position, i=i: on_wait(i, position)) if on_wait else None
+        
+        def fetch_batch(batch_wait_callback, batch_params=batch_params):
+            # Load data for this batch in the throttled bulk lane
+            with export_lane('bulk', user_id=user_id, on_wait=batch_wait_callback):
+                return get_data("data", data_source, limit=None, **batch_params)
+        
+        with span("batch", index=i, start_date=batch_start, end_date=batch_end) as batch_span, \
+                stage("batch", data_source) as recorded:
+            if EXPORT_HEDGING:
+                days = (datetime.strptime(batch_end, '%Y-%m-%d') - datetime.strptime(batch_start, '%Y-%m-%d')).days + 1
+                df_batch = run_hedged(fetch_batch, data_source, days, on_wait=wait_callback)
+            else:
+                df_batch = fetch_batch(wait_callback)
+            recorded.rows = len(df_batch) if df_batch is not None else 0
+            batch_span.set("rows", recorded.rows)
         
         if df_batch is not None and not df_batch.empty:
             all_dfs.append(df_batch)
         
-        # Update progress
+        if on_batch_done:
+            on_batch_done(i, df_batch)
+    
+    if not all_dfs:
+        return None
+    
+    with span("merge", batches=len(all_dfs)) as merge_span, stage("merge", data_source) as recorded:
+        merged_df = merge_batches(all_dfs, product=data_source)
+        recorded.rows = len(merged_df)
+        merge_span.set("rows", recorded.rows)
+    return merged_df
+
+
+@trace_function_call
+def load_data_with_batching(data_source: str, batch_days: int = 7, **sql_params):
+    """
+    Load data using batch processing for large date ranges.
+    
+    Args:
+        data_source: Data source key
+        batch_days: Number of days per batch
+        **sql_params: SQL parameters including start_date, end_date
+    
+    Returns:
+        Merged DataFrame
+    """
+    start_date = sql_params.get('start_date')
+    end_date = sql_params.get('end_date')
+    
+    if not start_date or not end_date:
+        st.error("Start date and end date are required for batch export")
+        return None
+    
+    # Split date range into batches
+    batch_days, batches = plan_export_batches(data_source, batch_days=batch_days, **sql_params)
+    
+    st.info(f"📦 Processing {len(batches)} batch(es) with {batch_days} days per batch...")
+    
+    # Progress bar
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    
+    def show_batch_start(i, batch_start, batch_end):
+        status_text.text(f"Processing batch {i+1}/{len(batches)}: {batch_start} to {batch_end}")
+    
+    def show_queue_position(i, position):
+        status_text.text(
+            f"⏳ Batch {i+1}/{len(batches)} is waiting for a database slot "
+            f"(position {position} in the export queue)..."
+        )
+    
+    def show_batch_done(i, df_batch):
         progress_bar.progress((i + 1) / len(batches))
     
+    merged_df = run_batched_export(
+        data_source,
+        batches,
+        user_id=st.session_state.get('session_id', 'anonymous'),
+        on_batch_start=show_batch_start,
+        on_wait=show_queue_position,
+        on_batch_done=show_batch_done,
+        **sql_params
+    )
+    
     progress_bar.empty()
     status_text.empty()
     
-    if not all_dfs:
+    if merged_df is None:
         st.warning("No data found in any batch")
         return None
     
-    # Merge all batches
-    st.info(f"🔄 Merging {len(all_dfs)} batch(es)...")
-    merged_df = merge_batches(all_dfs, product=data_source)
-    
     st.success(f"✅ Successfully merged {len(merged_df):,} rows from {len(batches)} batch(es)")
     
-    return merged_df
\ No newline at end of file
+    return merged_df
+
+
+@trace_function_call
+def load_data_incremental(data_source: str, batch_days: int = 7, **sql_params):
+    """
+    Load data by reusing the last export of the same parameter set and fetching only new days.
+    
+    Falls back to a full batched export when the previous export can't be reused
+    (none stored, gap in the dates, or the start date moved on a month-aggregated source).
+    
+    Args:
+        data_source: Data source key
+        batch_days: Number of days per batch for the days that have to be fetched
+        **sql_params: SQL parameters including start_date, end_date
+    
+    Returns:
+        DataFrame for the full requested range
+    """
+    from utils.core.artifact_store import get_last_export
+    from utils.core.batch_export import plan_incremental_export, merge_incremental
+    
+    start_date = sql_params.get('start_date')
+    end_date = sql_params.get('end_date')
+    
+    previous = get_last_export(data_source, sql_params)
+    if previous and has_threshold_filters(data_source, sql_params) \
+            and DATE_GRAIN_CONFIGS.get(data_source, {}).get('date_grain') != 'day':
+        # Filtered aggregated rows can't be re-aggregated with new days
+        previous = None
+    plan = plan_incremental_export(
+        data_source,
+        start_date,
+        end_date,
+        previous['start_date'] if previous else None,
+        previous['end_date'] if previous else None
+    )
+    
+    if plan['mode'] == 'full':
+        if previous:
+            st.info("♻️ The previous export can't be extended to this date range, running a full export.")
+        return load_data_with_batching(data_source, batch_days=batch_days, **sql_params)
+    
+    previous_df = previous['df']
+    if plan['mode'] == 'reuse':
+        st.info(f"♻️ Reusing the previous export ({previous['start_date']} to {previous['end_date']}).")
+        return previous_df
+    
+    delta_df = None
+    if plan.get('fetch_start'):
+        st.info(f"⏩ Incremental export: fetching only {plan['fetch_start']} to {plan['fetch_end']} "
+                f"(previous export covered {previous['start_date']} to {previous['end_date']}).")
+        delta_params = sql_params.copy()
+        delta_params['start_date'] = plan['fetch_start']
+        delta_params['end_date'] = plan['fetch_end']
+        delta_df = load_data_with_batching(data_source, batch_days=batch_days, **delta_params)
+    
+    merged_df = merge_incremental(previous_df, delta_df, data_source, start_date, plan['mode'])
+    st.success(f"✅ Incremental export ready: {len(merged_df):,} rows")
+    return merged_df
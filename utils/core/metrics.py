@@ -0,0 +1,353 @@
+"""
+Query and Stage Metrics
+
+In-process counters and histograms for every query and export stage, labelled by
+data source:
+
+- export_query_duration_seconds / export_query_rows: per executed query (cache hits included,
+  labelled cache="hit" / "miss" / "shared")
+- export_query_bytes_total: in-memory size of fetched results
+- export_stage_duration_seconds / export_stage_rows_total / export_stage_bytes_total:
+  count, preview, export, batch, merge and encode
+- export_errors_total: failures by stage and exception class
+
+Exposed in Prometheus text format by a small HTTP endpoint (EXPORT_METRICS_PORT, started
+once per process) and on the "Metrics" admin page. Values live in this process only:
+each replica exposes its own, aggregation is left to Prometheus.
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils.config import EXPORT_METRICS_PORT, EXPORT_METRICS_HOST
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+ROW_BUCKETS = (0, 10, 100, 500, 1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _samples(self) -> Iterator[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{labels} {_format_value(value)}" for name, labels, value in self._samples()]
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def _samples(self):
+        for key, value in sorted(self.values().items()):
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Gauge(_Metric):
+    """Current value per label set."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def _samples(self):
+        for key, value in sorted(self.values().items()):
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Histogram(_Metric):
+    """Bucketed distribution (count, sum and cumulative buckets) per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, the last slot is +Inf
+                state = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            state["counts"][index] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def values(self) -> Dict[Tuple[str, ...], Dict[str, Any]]:
+        with self._lock:
+            return {key: {"counts": list(s["counts"]), "sum": s["sum"], "count": s["count"]}
+                    for key, s in self._values.items()}
+
+    def quantile(self, q: float, state: Dict[str, Any]) -> Optional[float]:
+        """Estimate a quantile from bucket counts (linear within the bucket, like histogram_quantile)."""
+        if not state["count"]:
+            return None
+        rank = q * state["count"]
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(self.buckets + (math.inf,), state["counts"]):
+            if count and seen + count >= rank:
+                if upper == math.inf:
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper if upper != math.inf else lower
+        return lower
+
+    def _samples(self):
+        for key, state in sorted(self.values().items()):
+            cumulative = 0
+            for upper, count in zip(self.buckets + (math.inf,), state["counts"]):
+                cumulative += count
+                yield (f"{self.name}_bucket",
+                       _format_labels(self.labelnames, key, f'le="{_format_value(upper)}"'), cumulative)
+            yield f"{self.name}_sum", _format_labels(self.labelnames, key), state["sum"]
+            yield f"{self.name}_count", _format_labels(self.labelnames, key), state["count"]
+
+
+# --- Metrics of the export pipeline ---
+QUERY_DURATION = Histogram(
+    "export_query_duration_seconds", "Time to answer a query (cache lookups included).",
+    ("data_source", "query_type", "cache")
+)
+QUERY_ROWS = Histogram(
+    "export_query_rows", "Rows returned per query.", ("data_source", "query_type"), buckets=ROW_BUCKETS
+)
+QUERY_BYTES = Counter(
+    "export_query_bytes_total", "In-memory size of query results fetched from the database.",
+    ("data_source", "query_type")
+)
+CACHE_REQUESTS = Counter(
+    "export_cache_requests_total", "Query result cache lookups by result (hit, miss, shared).",
+    ("data_source", "result")
+)
+STAGE_DURATION = Histogram(
+    "export_stage_duration_seconds", "Duration of export pipeline stages.", ("data_source", "stage")
+)
+STAGE_ROWS = Counter("export_stage_rows_total", "Rows produced by export pipeline stages.", ("data_source", "stage"))
+STAGE_BYTES = Counter("export_stage_bytes_total", "Bytes produced by export pipeline stages.", ("data_source", "stage"))
+ERRORS = Counter("export_errors_total", "Failures by stage and exception class.", ("data_source", "stage", "error_class"))
+
+SCHEDULER_SLOTS = Gauge(
+    "export_scheduler_slots", "Database slots of the export scheduler by lane and state (active, waiting).",
+    ("lane", "state")
+)
+
+REGISTRY: List[_Metric] = [
+    QUERY_DURATION, QUERY_ROWS, QUERY_BYTES, CACHE_REQUESTS,
+    STAGE_DURATION, STAGE_ROWS, STAGE_BYTES, ERRORS, SCHEDULER_SLOTS,
+]
+
+# Callables run before every exposition to refresh gauges of current state
+_collectors: List[Callable[[], None]] = []
+
+
+def register(metric: _Metric) -> _Metric:
+    """Add a metric defined elsewhere to the exposition."""
+    REGISTRY.append(metric)
+    return metric
+
+
+def add_collector(collect: Callable[[], None]) -> None:
+    """Run `collect` before every exposition (to set gauges from current state)."""
+    _collectors.append(collect)
+
+
+def _collect_scheduler() -> None:
+    from utils.core.scheduler import get_scheduler
+    stats = get_scheduler().stats()
+    for lane in ("interactive", "bulk"):
+        for state in ("active", "waiting"):
+            SCHEDULER_SLOTS.set(stats[f"{lane}_{state}"], lane=lane, state=state)
+
+
+add_collector(_collect_scheduler)
+
+
+def frame_bytes(df) -> int:
+    """Shallow in-memory size of a DataFrame (object columns count their pointers only)."""
+    try:
+        return int(df.memory_usage(index=False, deep=False).sum())
+    except Exception:
+        return 0
+
+
+class _StageRecorder:
+    __slots__ = ("rows", "bytes")
+
+    def __init__(self):
+        self.rows = None
+        self.bytes = None
+
+
+@contextmanager
+def stage(name: str, data_source: Optional[str]):
+    """
+    Time an export stage and count its failures.
+
+        with stage("merge", data_source) as recorded:
+            df = merge_batches(...)
+            recorded.rows = len(df)
+
+    Exceptions are counted in export_errors_total and re-raised.
+    """
+    data_source = data_source or "unknown"
+    recorded = _StageRecorder()
+    started = time.perf_counter()
+    try:
+        yield recorded
+    except Exception as e:
+        ERRORS.inc(data_source=data_source, stage=name, error_class=type(e).__name__)
+        raise
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - started, data_source=data_source, stage=name)
+        if recorded.rows is not None:
+            STAGE_ROWS.inc(recorded.rows, data_source=data_source, stage=name)
+        if recorded.bytes is not None:
+            STAGE_BYTES.inc(recorded.bytes, data_source=data_source, stage=name)
+
+
+def render_prometheus() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    for collect in list(_collectors):
+        try:
+            collect()
+        except Exception as e:
+            print(f"--- WARNING: metrics collector failed ({type(e).__name__}: {e}) ---")
+    lines: List[str] = []
+    for metric in list(REGISTRY):
+        lines += metric.expose()
+    return "\n".join(lines) + "\n"
+
+
+def summary_rows() -> List[Dict[str, Any]]:
+    """
+    Per (data_source, stage/query type) summary for the admin page.
+
+    Returns:
+        Rows with count, average and estimated p50/p95 seconds, rows and errors
+    """
+    rows: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def row(data_source, kind):
+        return rows.setdefault((data_source, kind), {
+            "data_source": data_source, "operation": kind, "count": 0,
+            "avg_s": None, "p50_s": None, "p95_s": None, "rows": 0, "errors": 0,
+        })
+
+    for histogram, kind_of in ((QUERY_DURATION, lambda k: f"query:{k[1]}:{k[2]}"),
+                               (STAGE_DURATION, lambda k: k[1])):
+        for key, state in histogram.values().items():
+            r = row(key[0], kind_of(key))
+            r["count"] = state["count"]
+            r["avg_s"] = round(state["sum"] / state["count"], 4) if state["count"] else None
+            p50, p95 = histogram.quantile(0.5, state), histogram.quantile(0.95, state)
+            r["p50_s"] = round(p50, 4) if p50 is not None else None
+            r["p95_s"] = round(p95, 4) if p95 is not None else None
+    for (data_source, stage_name), value in STAGE_ROWS.values().items():
+        row(data_source, stage_name)["rows"] = int(value)
+    for (data_source, stage_name, _error_class), value in ERRORS.values().items():
+        row(data_source, stage_name)["errors"] += int(value)
+    return sorted(rows.values(), key=lambda r: (r["data_source"], r["operation"]))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_attempted = False
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = EXPORT_METRICS_PORT, host: str = EXPORT_METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve /metrics on a daemon thread (once per process; no-op when port is 0).
+
+    Returns:
+        The server, or None if disabled or the port couldn't be bound
+    """
+    global _server, _server_attempted
+    if not port:
+        return None
+    with _server_lock:
+        # Every page run calls this: bind once, and don't retry (or re-warn) after a failure
+        if _server_attempted:
+            return _server
+        _server_attempted = True
+        try:
+            server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            print(f"--- WARNING: metrics endpoint not started on {host}:{port} ({type(e).__name__}: {e}) ---")
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+        _server = server
+        return server
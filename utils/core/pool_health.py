@@ -0,0 +1,197 @@
+"""
+Connection Health Checker
+
+Replaces pool_pre_ping (one extra round trip on every checkout, i.e. on every count,
+preview and export batch) with a background task: every DB_POOL_HEALTH_CHECK_INTERVAL
+seconds it checks the idle connections out of each pool one at a time, pings the ones
+that haven't been used since the previous sweep and invalidates those that fail. An
+invalidated connection is reconnected by its next checkout, so checkouts on the hot path
+are a plain pool pop.
+
+A connection that dies between two sweeps (database restart, idle timeout of a proxy) is
+handled by the caller: utils.core.logic retries a query once on a stale-connection error
+(is_stale_connection_error).
+
+Events are counted in export_db_pool_events_total (utils/core/pool_telemetry.py):
+health_check_failure for evicted connections, stale_retry for retried queries.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+
+from utils.config import DB_POOL_HEALTH_CHECK_INTERVAL
+from utils.core.pool_telemetry import POOL_EVENTS
+
+
+def check_idle_connections(engine, name: str, idle_seconds: float = 0) -> Dict[str, Any]:
+    """
+    Ping the idle connections of an engine's QueuePool and invalidate dead ones.
+
+    Only public pool API is used: each idle connection is checked out with pool.connect()
+    (the QueuePool hands out the longest idle one first and puts it back last), so the
+    checkout/checkin events and the pool telemetry see the sweep like any other user.
+
+    Args:
+        engine: SQLAlchemy engine (QueuePool)
+        name: Engine label for the metrics
+        idle_seconds: Skip connections checked in less than this many seconds ago
+            (they were just used successfully)
+
+    Returns:
+        {"checked": int, "evicted": int, "at": timestamp}
+    """
+    pool = engine.pool
+    checked = evicted = 0
+    now = time.monotonic()
+
+    # Connections are taken out one at a time, so at most one is unavailable to checkouts.
+    # Stop once no connection is idle: a checkout would open a new one or wait for one.
+    for _ in range(pool.checkedin()):
+        if pool.checkedin() == 0:
+            break
+        conn = pool.connect()
+        try:
+            # Its checkin must not count as a use (see PoolHealthChecker.watch)
+            conn.info[_SWEEP_CHECKOUT] = True
+            if now - conn.info.get("health_last_used", 0) < idle_seconds:
+                continue
+            checked += 1
+            error = _ping(conn)
+            if error is None:
+                conn.info["health_last_used"] = now
+            else:
+                evicted += 1
+                POOL_EVENTS.inc(engine=name, event="health_check_failure")
+                # Closes the driver connection, the next checkout opens a new one
+                conn.invalidate(error)
+        finally:
+            conn.close()
+
+    return {"checked": checked, "evicted": evicted, "at": time.time()}
+
+
+# connection_record.info flag of connections checked out by the sweep
+_SWEEP_CHECKOUT = "health_sweep"
+
+
+def _ping(conn) -> Optional[BaseException]:
+    """Run SELECT 1 on a pooled connection; the error if it failed."""
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        finally:
+            cursor.close()
+    except Exception as e:
+        return e
+    return None
+
+
+def is_stale_connection_error(error: BaseException, engine) -> bool:
+    """
+    True if a query failed because its pooled connection was dead (safe to retry once).
+
+    Covers SQLAlchemy errors (connection_invalidated) and raw driver errors from
+    raw_connection() cursors, classified by the dialect.
+    """
+    from sqlalchemy.exc import DBAPIError
+
+    if isinstance(error, DBAPIError):
+        return bool(error.connection_invalidated)
+    dbapi = getattr(engine.dialect, "dbapi", None)
+    error_base = getattr(dbapi, "Error", None) if dbapi is not None else None
+    if error_base is not None and isinstance(error, error_base):
+        try:
+            return bool(engine.dialect.is_disconnect(error, None, None))
+        except Exception:
+            return False
+    return False
+
+
+def is_connection_error(error: BaseException, engine) -> bool:
+    """
+    True if a query failed because the database itself is unavailable: a stale connection,
+    no connection could be opened, or an OperationalError (too many connections, out of
+    memory, timeouts). utils/core/routing.py fails over to another engine on these; syntax
+    and data errors of a single query (ProgrammingError, ...) would fail anywhere.
+    """
+    from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+    if is_stale_connection_error(error, engine):
+        return True
+    if isinstance(error, (OperationalError, InterfaceError)):
+        return True
+    if isinstance(error, DBAPIError):
+        return False
+    dbapi = getattr(engine.dialect, "dbapi", None)
+    error_bases = tuple(
+        base for base in (getattr(dbapi, "OperationalError", None), getattr(dbapi, "InterfaceError", None))
+        if isinstance(base, type)
+    ) if dbapi is not None else ()
+    return bool(error_bases) and isinstance(error, error_bases)
+
+
+class PoolHealthChecker:
+    """Background sweep over the registered engines (see module docstring)."""
+
+    def __init__(self, interval: float = DB_POOL_HEALTH_CHECK_INTERVAL):
+        self.interval = interval
+        self.engines: Dict[str, Any] = {}
+        # Result of the latest sweep per engine (admin page)
+        self.last_results: Dict[str, Dict[str, Any]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, engine, name: str) -> None:
+        @event.listens_for(engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            if not connection_record.info.pop(_SWEEP_CHECKOUT, False):
+                connection_record.info["health_last_used"] = time.monotonic()
+
+        self.engines[name] = engine
+
+    def sweep(self) -> None:
+        for name, engine in list(self.engines.items()):
+            try:
+                result = check_idle_connections(engine, name, idle_seconds=self.interval)
+            except Exception as e:
+                print(f"--- WARNING: connection health check of '{name}' failed ({type(e).__name__}: {e}) ---")
+                continue
+            self.last_results[name] = result
+            if result["evicted"]:
+                print(f"--- WARNING: evicted {result['evicted']} dead connection(s) from the '{name}' pool ---")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sweep()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="pool-health", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+_checker: Optional[PoolHealthChecker] = None
+_checker_lock = threading.Lock()
+
+
+def watch_engine(engine, name: str) -> PoolHealthChecker:
+    """Add an engine to the process-wide health checker (started on the first call)."""
+    global _checker
+    with _checker_lock:
+        if _checker is None:
+            _checker = PoolHealthChecker()
+            _checker.start()
+        _checker.watch(engine, name)
+    return _checker
+
+
+def get_pool_health_checker() -> Optional[PoolHealthChecker]:
+    return _checker
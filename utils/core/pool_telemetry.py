@@ -0,0 +1,298 @@
+"""
+Connection Pool Telemetry and Adaptive Concurrency
+
+Instruments the SQLAlchemy pools of utils/core/database.py and exposes them through
+utils/core/metrics.py (label engine="main" / "arrow"). Only public SQLAlchemy API is used:
+pool events, and timed_checkout() around engine.connect() / raw_connection() for the wait.
+
+- export_db_pool_connections: checked out, checked in, overflow and size (gauges)
+- export_db_pool_wait_seconds: time to get a connection from the pool
+- export_db_pool_overflow_checkouts_total / export_db_pool_timeouts_total
+- export_db_pool_events_total: connect, close, invalidate, recycle, pre_ping_failure,
+  health_check_failure, stale_retry (see utils/core/pool_health.py)
+- export_db_errors_total: errors raised by the database driver, by class (not counting
+  queries that were cancelled on purpose, see utils/core/hedging.py)
+
+With DB_POOL_AUTOSIZE, a background controller adjusts the scheduler's slot limit (the
+number of queries this replica runs at once) with additive increase / multiplicative
+decrease: +1 per interval while queries queue for a slot and the database is healthy,
+x0.75 after overload errors (lost connections, OperationalError; not the cancelled loser of
+a hedged batch), pool timeouts or a p95 checkout wait over
+DB_POOL_AUTOSIZE_TARGET_WAIT. The limit stays within DB_POOL_AUTOSIZE_MIN..MAX.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from utils.config import (
+    INTERACTIVE_RESERVED_SLOTS, DB_POOL_AUTOSIZE_MIN, DB_POOL_AUTOSIZE_MAX,
+    DB_POOL_AUTOSIZE_INTERVAL, DB_POOL_AUTOSIZE_TARGET_WAIT
+)
+from utils.core.hedging import is_cancelled
+from utils.core.metrics import Counter, Gauge, Histogram, register, add_collector
+
+# MySQL / SingleStore error of a statement stopped by KILL QUERY
+ER_QUERY_INTERRUPTED = 1317
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+POOL_CONNECTIONS = register(Gauge(
+    "export_db_pool_connections", "Pool connections by state (checked_out, checked_in, overflow, size).",
+    ("engine", "state")
+))
+POOL_WAIT = register(Histogram(
+    "export_db_pool_wait_seconds", "Time to get a connection from the pool.", ("engine",), buckets=WAIT_BUCKETS
+))
+POOL_OVERFLOW_CHECKOUTS = register(Counter(
+    "export_db_pool_overflow_checkouts_total", "Checkouts served by an overflow connection.", ("engine",)
+))
+POOL_TIMEOUTS = register(Counter(
+    "export_db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT.", ("engine",)
+))
+POOL_EVENTS = register(Counter(
+    "export_db_pool_events_total", "Connection lifecycle events (connect, close, invalidate, recycle, pre_ping_failure, health_check_failure, stale_retry).",
+    ("engine", "event")
+))
+DB_ERRORS = register(Counter(
+    "export_db_errors_total", "Errors raised by the database driver.", ("engine", "error_class")
+))
+CONCURRENCY_LIMIT = register(Gauge(
+    "export_db_concurrency_limit", "Scheduler slot limit (adjusted when DB_POOL_AUTOSIZE is on).", ()
+))
+
+_engines: Dict[str, Any] = {}
+_window_lock = threading.Lock()
+# Checkout waits and overload errors since the autosizer's last tick
+_window_waits: List[float] = []
+_window_overload_errors = 0
+
+
+@contextmanager
+def timed_checkout(name: str):
+    """
+    Measure getting a connection from the pool of engine `name`: wrap engine.connect() or
+    engine.raw_connection() (wait time, including connecting a new one, and timeouts).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except PoolTimeoutError:
+        POOL_TIMEOUTS.inc(engine=name)
+        raise
+    finally:
+        waited = time.perf_counter() - started
+        POOL_WAIT.observe(waited, engine=name)
+        if _autosizer is not None:
+            with _window_lock:
+                _window_waits.append(waited)
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Attach pool and error listeners to an engine with a QueuePool (metrics label `name`)."""
+    pool = engine.pool
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        # checkedout() already includes this connection
+        if pool.checkedout() > pool.size():
+            POOL_OVERFLOW_CHECKOUTS.inc(engine=name)
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        previous = connection_record.info.get("telemetry_connected_at")
+        now = time.time()
+        connection_record.info["telemetry_connected_at"] = now
+        # A record that connects again was either invalidated or recycled (pool_recycle)
+        if previous is not None and not connection_record.info.pop("telemetry_invalidated", False):
+            POOL_EVENTS.inc(engine=name, event="recycle")
+        POOL_EVENTS.inc(engine=name, event="connect")
+
+    @event.listens_for(engine, "close")
+    def on_close(dbapi_connection, connection_record):
+        POOL_EVENTS.inc(engine=name, event="close")
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        connection_record.info["telemetry_invalidated"] = True
+        POOL_EVENTS.inc(engine=name, event="invalidate")
+
+    @event.listens_for(engine, "handle_error")
+    def on_error(context):
+        global _window_overload_errors
+        # The loser of a hedged batch was cancelled on purpose, that's no database error
+        if _is_cancelled_query(context.original_exception):
+            return
+        error_class = type(context.original_exception).__name__
+        DB_ERRORS.inc(engine=name, error_class=error_class)
+        # Lost connections and OperationalErrors (too many connections, memory, timeouts) signal
+        # an overloaded database; syntax or data errors of a single query don't
+        if context.is_disconnect or error_class == "OperationalError":
+            with _window_lock:
+                _window_overload_errors += 1
+
+    # pool_pre_ping goes through dialect.do_ping: count pings that find a dead connection
+    original_ping = engine.dialect.do_ping
+
+    def do_ping(dbapi_connection):
+        try:
+            alive = original_ping(dbapi_connection)
+        except Exception:
+            POOL_EVENTS.inc(engine=name, event="pre_ping_failure")
+            raise
+        if not alive:
+            POOL_EVENTS.inc(engine=name, event="pre_ping_failure")
+        return alive
+
+    engine.dialect.do_ping = do_ping
+    POOL_CONNECTIONS.set(pool.size(), engine=name, state="size")
+    _engines[name] = engine
+
+
+def _is_cancelled_query(error: BaseException) -> bool:
+    """The query was stopped by KILL QUERY / interrupt(), e.g. a hedged attempt that lost its race."""
+    if is_cancelled():
+        return True
+    args = getattr(error, "args", ())
+    return bool(args) and args[0] == ER_QUERY_INTERRUPTED
+
+
+def _collect_pools() -> None:
+    from utils.core.scheduler import get_scheduler
+    for name, engine in list(_engines.items()):
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            continue
+        POOL_CONNECTIONS.set(pool.checkedout(), engine=name, state="checked_out")
+        POOL_CONNECTIONS.set(pool.checkedin(), engine=name, state="checked_in")
+        POOL_CONNECTIONS.set(max(pool.overflow(), 0), engine=name, state="overflow")
+        POOL_CONNECTIONS.set(pool.size(), engine=name, state="size")
+    CONCURRENCY_LIMIT.set(get_scheduler().total_slots)
+
+
+add_collector(_collect_pools)
+
+
+def _counter_total(counter: Counter) -> float:
+    return sum(counter.values().values())
+
+
+class PoolAutosizer:
+    """AIMD controller for the scheduler's slot limit (see module docstring)."""
+
+    def __init__(
+        self,
+        min_slots: int = DB_POOL_AUTOSIZE_MIN,
+        max_slots: int = DB_POOL_AUTOSIZE_MAX,
+        interval: float = DB_POOL_AUTOSIZE_INTERVAL,
+        target_wait: float = DB_POOL_AUTOSIZE_TARGET_WAIT,
+        decrease_factor: float = 0.75,
+    ):
+        self.min_slots = max(1, min_slots)
+        self.max_slots = max(self.min_slots, max_slots)
+        self.interval = interval
+        self.target_wait = target_wait
+        self.decrease_factor = decrease_factor
+        # Recent decisions for the admin page: (timestamp, limit, reason)
+        self.history: deque = deque(maxlen=100)
+        self._last_timeouts = _counter_total(POOL_TIMEOUTS)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def tick(self) -> Optional[str]:
+        """
+        Take one decision from the measurements since the previous tick.
+
+        Returns:
+            Reason of the change, or None if the limit stayed the same
+        """
+        global _window_overload_errors
+        from utils.core.scheduler import get_scheduler
+
+        scheduler = get_scheduler()
+        with _window_lock:
+            waits = sorted(_window_waits)
+            _window_waits.clear()
+            new_errors, _window_overload_errors = _window_overload_errors, 0
+        timeouts = _counter_total(POOL_TIMEOUTS)
+        new_timeouts, self._last_timeouts = timeouts - self._last_timeouts, timeouts
+        p95_wait = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+
+        limit = scheduler.total_slots
+        stats = scheduler.stats()
+        queued = stats["interactive_waiting"] + stats["bulk_waiting"]
+
+        if new_errors or new_timeouts or p95_wait > self.target_wait:
+            new_limit = max(self.min_slots, int(limit * self.decrease_factor))
+            reason = (f"decrease: {new_errors} overload error(s), {int(new_timeouts)} pool timeout(s), "
+                      f"p95 checkout wait {p95_wait:.3f}s")
+        elif queued and limit < self.max_slots:
+            new_limit = limit + 1
+            reason = f"increase: {queued} queued"
+        else:
+            new_limit = limit
+            reason = None
+
+        if new_limit != limit:
+            scheduler.configure(new_limit, interactive_reserved=INTERACTIVE_RESERVED_SLOTS)
+            self.history.append((time.time(), new_limit, reason))
+            if new_limit < limit:
+                print(f"--- WARNING: database concurrency limit lowered {limit} -> {new_limit} ({reason}) ---")
+            return reason
+        return None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"--- WARNING: pool autosizer tick failed ({type(e).__name__}: {e}) ---")
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="pool-autosizer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+_autosizer: Optional[PoolAutosizer] = None
+
+
+def start_pool_autosizer() -> PoolAutosizer:
+    """Start the process-wide autosizer (once)."""
+    global _autosizer
+    if _autosizer is None:
+        _autosizer = PoolAutosizer()
+        _autosizer.start()
+    return _autosizer
+
+
+def get_pool_autosizer() -> Optional[PoolAutosizer]:
+    return _autosizer
+
+
+def pool_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Current pool state and event counts per instrumented engine (admin page)."""
+    _collect_pools()
+    gauges = POOL_CONNECTIONS.values()
+    events = POOL_EVENTS.values()
+    snapshot = {}
+    for name in _engines:
+        state = {s: int(v) for (engine, s), v in gauges.items() if engine == name}
+        state.update({f"{e}_events": int(v) for (engine, e), v in events.items() if engine == name})
+        state["overflow_checkouts"] = int(POOL_OVERFLOW_CHECKOUTS.values().get((name,), 0))
+        state["timeouts"] = int(POOL_TIMEOUTS.values().get((name,), 0))
+        waits = POOL_WAIT.values().get((name,))
+        if waits:
+            p95 = POOL_WAIT.quantile(0.95, waits)
+            state["p95_wait_s"] = round(p95, 4) if p95 is not None else None
+        snapshot[name] = state
+    return snapshot
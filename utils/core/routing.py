@@ -0,0 +1,123 @@
+"""
+Workload Routing
+
+Chooses the database engine (utils/core/database.py) a query runs on, by scheduler lane:
+
+- lanes in DB_REPLICA_LANES (default: "bulk", the export batches) run on the read replicas
+  of DB_REPLICA_URLS, spread round robin, with the primary as the last resort
+- all other lanes (count, preview, dimension loads) run on the primary, with the replicas
+  as fallback
+
+Health-based failover: an engine whose query failed with a connection error
+(database.is_connection_error) is marked down for DB_FAILOVER_COOLDOWN seconds and skipped.
+After the cooldown the next query tries it again; if that fails it stays down for another
+cooldown. When every candidate is down the preferred one is tried anyway.
+
+Without replicas every query runs on the primary, as before.
+"""
+
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from utils.config import DB_REPLICA_LANES, DB_FAILOVER_COOLDOWN
+from utils.core.database import PRIMARY, get_replica_urls
+from utils.core.metrics import Counter, register
+
+ROUTED_QUERIES = register(Counter(
+    "export_db_routed_queries_total", "Queries sent to each database engine, by scheduler lane.", ("engine", "lane")
+))
+FAILOVERS = register(Counter(
+    "export_db_failovers_total", "Engines marked down after a connection error.", ("engine",)
+))
+
+
+class EngineRouter:
+    """Lane -> engine policy with per-engine health state (see module docstring)."""
+
+    def __init__(self, replicas: List[str], replica_lanes: List[str] = None, cooldown: float = DB_FAILOVER_COOLDOWN):
+        self.replicas = list(replicas)
+        self.replica_lanes = set(DB_REPLICA_LANES if replica_lanes is None else replica_lanes)
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._round_robin = itertools.count()
+        # engine -> time until which it is skipped
+        self._down_until: Dict[str, float] = {}
+        self._last_error: Dict[str, str] = {}
+        self.routed: Dict[str, int] = {name: 0 for name in [PRIMARY, *self.replicas]}
+        self.failovers = 0
+
+    def candidates(self, lane: str) -> List[str]:
+        """Engines for a query of `lane`, in order of preference."""
+        if not self.replicas:
+            return [PRIMARY]
+        start = next(self._round_robin) % len(self.replicas)
+        replicas = self.replicas[start:] + self.replicas[:start]
+        return replicas + [PRIMARY] if lane in self.replica_lanes else [PRIMARY] + replicas
+
+    def route(self, lane: str, exclude: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Engine a query of `lane` should run on.
+
+        Args:
+            lane: Scheduler lane ("interactive" or "bulk")
+            exclude: Engines already tried for this query
+
+        Returns:
+            Engine name, or None if every candidate was excluded
+        """
+        candidates = [name for name in self.candidates(lane) if name not in (exclude or ())]
+        if not candidates:
+            return None
+        now = time.time()
+        with self._lock:
+            healthy = [name for name in candidates if self._down_until.get(name, 0) <= now]
+            # Everything down: try the preferred engine rather than failing without a query
+            name = healthy[0] if healthy else candidates[0]
+            self.routed[name] = self.routed.get(name, 0) + 1
+        ROUTED_QUERIES.inc(engine=name, lane=lane)
+        return name
+
+    def mark_failed(self, name: str, error: BaseException) -> None:
+        with self._lock:
+            self._down_until[name] = time.time() + self.cooldown
+            self._last_error[name] = f"{type(error).__name__}: {str(error).splitlines()[0] if str(error) else ''}"
+            self.failovers += 1
+        FAILOVERS.inc(engine=name)
+        print(f"--- WARNING: database engine '{name}' unavailable ({type(error).__name__}), "
+              f"failing over for {self.cooldown:g}s ---")
+
+    def mark_ok(self, name: str) -> None:
+        if name in self._down_until:
+            with self._lock:
+                self._down_until.pop(name, None)
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Per-engine role, health and routed query count (admin page, load test report)."""
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "engine": name,
+                    "role": "primary" if name == PRIMARY else "replica",
+                    "healthy": self._down_until.get(name, 0) <= now,
+                    "routed_queries": self.routed.get(name, 0),
+                    "last_error": self._last_error.get(name),
+                }
+                for name in [PRIMARY, *self.replicas]
+            ]
+
+
+_router: Optional[EngineRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> EngineRouter:
+    """Process-wide router over the configured replicas (created on first use)."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = EngineRouter(list(get_replica_urls()))
+    return _router
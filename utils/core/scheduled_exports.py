@@ -0,0 +1,274 @@
+"""
+Recurring Scheduled Exports
+
+Precomputes popular exports off-peak so the morning rush is served warm. Schedules are
+defined in a local JSON file (EXPORT_SCHEDULES_FILE), for example:
+
+    [
+        {
+            "name": "acme-keyword-lab-weekly",
+            "cron": "0 3 * * 1",
+            "data_source": "keyword_lab",
+            "workspace_id": 10,
+            "storefront_ids": [1234, 5678],
+            "date_preset": "Last 30 days",
+            "filters": {"display_type": "None"}
+        }
+    ]
+
+`cron` uses the standard 5 fields (minute hour day-of-month month day-of-week) with
+`*`, lists (`1,3`), ranges (`1-5`) and steps (`*/15`, `0-30/10`). Day-of-week 0 or 7
+is Sunday. `date_preset` is one of the presets of the date range field.
+
+Each run goes through the same path as the UI (count, preview, batched export), so the
+shared query cache is warm and the finished file lands in the artifact store, where
+identical interactive requests pick it up.
+
+Usage:
+    python -m utils.core.scheduled_exports --loop        # run due schedules every minute
+    python -m utils.core.scheduled_exports --once        # run schedules due right now
+    python -m utils.core.scheduled_exports --run NAME    # run one schedule immediately
+"""
+
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from utils.config import EXPORT_SCHEDULES_FILE, STATE_DIR
+
+SCHEDULE_STATE_FILE = STATE_DIR / "schedule_state.json"
+
+# (min, max) of each cron field
+_CRON_FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+_state_lock = threading.Lock()
+
+
+# --- Cron expressions ---
+def parse_cron_field(field: str, min_value: int, max_value: int) -> Set[int]:
+    """Expand one cron field into the set of values it matches."""
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_str = part.split('/', 1)
+            step = int(step_str)
+            if step <= 0:
+                raise ValueError(f"Invalid cron step: {step_str}")
+
+        if part == '*':
+            start, end = min_value, max_value
+        elif '-' in part:
+            start_str, end_str = part.split('-', 1)
+            start, end = int(start_str), int(end_str)
+        else:
+            start = int(part)
+            end = max_value if step > 1 else start
+
+        if start < min_value or end > max_value or start > end:
+            raise ValueError(f"Cron value out of range: {field} (allowed {min_value}-{max_value})")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def cron_matches(expression: str, when: datetime) -> bool:
+    """Check whether a 5-field cron expression matches a point in time (minute resolution)."""
+    fields = expression.split()
+    if len(fields) != 5:
+        raise ValueError(f"Cron expression must have 5 fields: {expression}")
+
+    minute, hour, day, month, weekday = (
+        parse_cron_field(field, low, high) for field, (low, high) in zip(fields, _CRON_FIELD_RANGES)
+    )
+    # Cron uses 0/7 = Sunday, Python uses 6 = Sunday
+    cron_weekday = (when.weekday() + 1) % 7
+    weekday_match = cron_weekday in weekday or (cron_weekday == 0 and 7 in weekday)
+
+    # Standard cron: if both day fields are restricted, either one may match
+    day_restricted, weekday_restricted = fields[2] != '*', fields[4] != '*'
+    if day_restricted and weekday_restricted:
+        day_match = when.day in day or weekday_match
+    else:
+        day_match = when.day in day and weekday_match
+
+    return when.minute in minute and when.hour in hour and when.month in month and day_match
+
+
+# --- Schedule definitions & state ---
+def load_schedules(path=None) -> List[Dict[str, Any]]:
+    """Load schedule definitions from the schedules file (empty list if it doesn't exist)."""
+    path = path or EXPORT_SCHEDULES_FILE
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            schedules = json.load(f)
+    except FileNotFoundError:
+        return []
+
+    for schedule in schedules:
+        for key in ('name', 'cron', 'data_source', 'workspace_id'):
+            if key not in schedule:
+                raise ValueError(f"Schedule {schedule.get('name', '?')} is missing '{key}'")
+        # Fail early on invalid expressions
+        cron_matches(schedule['cron'], datetime.now())
+    return schedules
+
+
+def _load_state() -> Dict[str, Any]:
+    try:
+        with open(SCHEDULE_STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_run_state(name: str, result: Dict[str, Any]) -> None:
+    with _state_lock:
+        state = _load_state()
+        state[name] = result
+        SCHEDULE_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(SCHEDULE_STATE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2, default=str)
+
+
+def build_schedule_inputs(schedule: Dict[str, Any], today=None) -> Dict[str, Any]:
+    """Turn a schedule definition into the same input values the UI form produces."""
+    from utils.ui.input_config import get_date_presets
+
+    storefront_ids = schedule.get('storefront_ids') or ""
+    if isinstance(storefront_ids, (list, tuple)):
+        storefront_ids = ",".join(str(sid) for sid in storefront_ids)
+
+    input_values = {
+        "workspace_id": str(schedule['workspace_id']),
+        "storefront_ids": str(storefront_ids),
+        **schedule.get('filters', {})
+    }
+
+    preset_name = schedule.get('date_preset', 'Last 30 days')
+    presets = get_date_presets(today)
+    if preset_name not in presets or presets[preset_name] is None:
+        raise ValueError(f"Unknown date preset '{preset_name}'. Available: {[k for k, v in presets.items() if v]}")
+    preset = presets[preset_name]
+    input_values["start_date"] = preset["start"]
+    input_values["end_date"] = preset["end"]
+    input_values["date_range"] = (preset["start"], preset["end"])
+    return input_values
+
+
+# --- Running ---
+def run_schedule(schedule: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one scheduled export through the batch pipeline and store the result.
+
+    Returns:
+        Run result with status ('success', 'skipped', 'empty' or 'error'), rows and duration
+    """
+    from utils.validation.input_validator import validate_data_source_inputs, build_sql_params
+    from utils.core.logic import (
+        get_data, plan_export_batches, run_batched_export, convert_df_to_csv, track_database_work
+    )
+    from utils.core.artifact_store import find_artifact, save_artifact
+    from utils.core.cost_model import plan_admission, record_export_run
+    from utils.core.metrics import stage
+
+    name = schedule['name']
+    data_source = schedule['data_source']
+    started = time.time()
+    result: Dict[str, Any] = {"started_at": datetime.now().isoformat(), "rows": None}
+
+    try:
+        input_values = build_schedule_inputs(schedule)
+        errors = validate_data_source_inputs(data_source, input_values)
+        if errors:
+            raise ValueError("; ".join(errors))
+        sql_params = build_sql_params(data_source, input_values)
+
+        if find_artifact(data_source, sql_params) is not None:
+            result["status"] = "skipped"
+        else:
+            # Warm the interactive path as well: row count and 500-row preview
+            count_df = get_data('count', data_source, **sql_params)
+            num_row = int(count_df.iloc[0, 0]) if not count_df.empty else 0
+            get_data('data', data_source, limit=500, **sql_params)
+
+            with stage('export', data_source) as recorded, track_database_work() as database_work:
+                if sql_params.get('start_date') and sql_params.get('end_date'):
+                    admission = plan_admission(data_source, num_row, sql_params['start_date'], sql_params['end_date'])
+                    _, batches = plan_export_batches(
+                        data_source, batch_days=admission.get('batch_days') or 7, **sql_params
+                    )
+                    df = run_batched_export(data_source, batches, user_id=f"scheduler:{name}", **sql_params)
+                else:
+                    df = get_data('data', data_source, **sql_params)
+                recorded.rows = len(df) if df is not None else 0
+
+            if df is None or df.empty:
+                result["status"] = "empty"
+            else:
+                # Batches answered from the cache or shared with a session cost the database nothing
+                if database_work.all_from_database:
+                    record_export_run(data_source, num_row, database_work.fetch_seconds)
+                file_name = f"{data_source}_data_{datetime.now().strftime('%Y%m%d')}.csv"
+                save_artifact(data_source, sql_params, convert_df_to_csv(df, data_source), file_name, row_count=len(df))
+                result["status"] = "success"
+                result["rows"] = int(len(df))
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    result["duration_seconds"] = round(time.time() - started, 3)
+    _save_run_state(name, result)
+    return result
+
+
+def run_due_schedules(now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Run every schedule whose cron expression matches `now` and hasn't run this minute."""
+    now = (now or datetime.now()).replace(second=0, microsecond=0)
+    state = _load_state()
+    results = []
+    for schedule in load_schedules():
+        if not cron_matches(schedule['cron'], now):
+            continue
+        last_started = state.get(schedule['name'], {}).get('started_at')
+        if last_started and datetime.fromisoformat(last_started) >= now:
+            continue
+        result = run_schedule(schedule)
+        print(f"[scheduled export] {schedule['name']}: {result['status']} "
+              f"({result.get('rows')} rows, {result['duration_seconds']}s) {result.get('error', '')}")
+        results.append({"name": schedule['name'], **result})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run recurring scheduled exports.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--loop", action="store_true", help="Keep running and execute schedules when due")
+    mode.add_argument("--once", action="store_true", help="Run the schedules due in the current minute")
+    mode.add_argument("--run", metavar="NAME", help="Run one schedule immediately")
+    args = parser.parse_args(argv)
+
+    if args.run:
+        schedules = {s['name']: s for s in load_schedules()}
+        if args.run not in schedules:
+            parser.error(f"Unknown schedule: {args.run}. Available: {list(schedules)}")
+        print(json.dumps(run_schedule(schedules[args.run]), indent=2, default=str))
+        return
+
+    if args.once:
+        run_due_schedules()
+        return
+
+    print(f"Scheduled exports running from {EXPORT_SCHEDULES_FILE} (Ctrl+C to stop)")
+    while True:
+        run_due_schedules()
+        # Sleep until the start of the next minute
+        now = datetime.now()
+        next_minute = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        time.sleep(max((next_minute - now).total_seconds(), 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Process-wide Export Scheduler
+
+All Streamlit sessions share one database connection pool. Without coordination a few
+bulk exports can take every connection and interactive count/preview queries time out
+behind them. This scheduler hands out database slots per lane:
+
+- interactive: count and preview queries. Always served first and have a reserved
+  share of the slots that bulk work can never take.
+- bulk: export batches. Limited to a configurable concurrency and shared fairly
+  between sessions (the session with the fewest running batches goes next).
+
+Usage:
+    with export_lane('bulk', user_id=session_id, on_wait=show_position):
+        ...
+        with db_slot():      # called around each query execution
+            run_query()
+"""
+
+import itertools
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+from utils.config import DB_POOL_SIZE, DB_MAX_OVERFLOW, INTERACTIVE_RESERVED_SLOTS, BULK_MAX_CONCURRENCY
+
+LANES = ('interactive', 'bulk')
+
+# How often waiting callers re-check their queue position (seconds)
+_WAIT_POLL_INTERVAL = 0.5
+
+_current_lane: ContextVar[str] = ContextVar('export_lane', default='interactive')
+_current_user: ContextVar[str] = ContextVar('export_user', default='anonymous')
+_current_on_wait: ContextVar[Optional[Callable[[int], None]]] = ContextVar('export_on_wait', default=None)
+
+
+class _Ticket:
+    __slots__ = ('lane', 'user_id', 'seq')
+
+    def __init__(self, lane: str, user_id: str, seq: int):
+        self.lane = lane
+        self.user_id = user_id
+        self.seq = seq
+
+
+class ExportScheduler:
+    """Hands out database slots to interactive and bulk work."""
+
+    def __init__(self, total_slots: int, interactive_reserved: int, bulk_limit: int):
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting = []
+        self._active = {lane: 0 for lane in LANES}
+        self._active_bulk_by_user: Dict[str, int] = defaultdict(int)
+        self.configure(total_slots, interactive_reserved, bulk_limit)
+
+    def configure(self, total_slots: int, interactive_reserved: int = None, bulk_limit: int = None):
+        """Change the slot limits. Waiting callers are re-evaluated immediately."""
+        with self._cond:
+            self.total_slots = max(1, int(total_slots))
+            if interactive_reserved is not None:
+                self.interactive_reserved = max(0, int(interactive_reserved))
+            if bulk_limit is not None:
+                self.bulk_limit = max(1, int(bulk_limit))
+            # Bulk work can never eat into the interactive reserve
+            self.interactive_reserved = min(self.interactive_reserved, self.total_slots - 1)
+            self._cond.notify_all()
+
+    # --- Queue ordering ---
+    def _bulk_order(self):
+        bulk = [t for t in self._waiting if t.lane == 'bulk']
+        return sorted(bulk, key=lambda t: (self._active_bulk_by_user[t.user_id], t.seq))
+
+    def _interactive_order(self):
+        return [t for t in self._waiting if t.lane == 'interactive']
+
+    def _position(self, ticket: _Ticket) -> int:
+        order = self._interactive_order() if ticket.lane == 'interactive' else self._bulk_order()
+        return order.index(ticket) + 1
+
+    def _can_run(self, ticket: _Ticket) -> bool:
+        total_active = sum(self._active.values())
+        if ticket.lane == 'interactive':
+            return total_active < self.total_slots and self._position(ticket) == 1
+        if self._interactive_order():
+            return False
+        return (
+            self._active['bulk'] < self.bulk_limit
+            and total_active < self.total_slots - self.interactive_reserved
+            and self._position(ticket) == 1
+        )
+
+    # --- Slot handling ---
+    def acquire(
+        self, lane: str, user_id: str, on_wait: Optional[Callable[[int], None]] = None, timeout: Optional[float] = None
+    ) -> _Ticket:
+        """
+        Wait for a slot in a lane.
+
+        Raises:
+            TimeoutError: If `timeout` seconds passed without a free slot (the caller left the queue)
+        """
+        if lane not in LANES:
+            raise ValueError(f"Unknown scheduler lane: {lane}. Available: {list(LANES)}")
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ticket = _Ticket(lane, user_id, next(self._seq))
+        last_position = None
+        self._cond.acquire()
+        try:
+            self._waiting.append(ticket)
+            while not self._can_run(ticket):
+                position = self._position(ticket)
+                if on_wait and position != last_position:
+                    last_position = position
+                    # The callback updates the UI (or another thread's queue): never run it while
+                    # holding the lock, every other acquire and release would wait on it
+                    self._cond.release()
+                    try:
+                        on_wait(position)
+                    finally:
+                        self._cond.acquire()
+                    continue
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"No free {lane} slot within {timeout:g}s (position {position})")
+                self._cond.wait(timeout=_WAIT_POLL_INTERVAL)
+
+            self._active[lane] += 1
+            if lane == 'bulk':
+                self._active_bulk_by_user[user_id] += 1
+            return ticket
+        finally:
+            # Also when on_wait raised (e.g. a Streamlit rerun): the ticket leaves the queue
+            self._waiting.remove(ticket)
+            self._cond.notify_all()
+            self._cond.release()
+
+    def release(self, ticket: _Ticket) -> None:
+        with self._cond:
+            self._active[ticket.lane] -= 1
+            if ticket.lane == 'bulk':
+                self._active_bulk_by_user[ticket.user_id] -= 1
+                if self._active_bulk_by_user[ticket.user_id] <= 0:
+                    del self._active_bulk_by_user[ticket.user_id]
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(
+        self, lane: str, user_id: str, on_wait: Optional[Callable[[int], None]] = None, timeout: Optional[float] = None
+    ):
+        ticket = self.acquire(lane, user_id, on_wait, timeout)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> Dict[str, int]:
+        """Current snapshot of running and waiting work per lane."""
+        with self._cond:
+            return {
+                "total_slots": self.total_slots,
+                "interactive_reserved": self.interactive_reserved,
+                "bulk_limit": self.bulk_limit,
+                "interactive_active": self._active['interactive'],
+                "bulk_active": self._active['bulk'],
+                "interactive_waiting": len(self._interactive_order()),
+                "bulk_waiting": len(self._waiting) - len(self._interactive_order()),
+            }
+
+
+_scheduler = ExportScheduler(
+    total_slots=DB_POOL_SIZE + DB_MAX_OVERFLOW,
+    interactive_reserved=INTERACTIVE_RESERVED_SLOTS,
+    bulk_limit=BULK_MAX_CONCURRENCY,
+)
+
+
+def get_scheduler() -> ExportScheduler:
+    """Get the process-wide scheduler shared by all sessions."""
+    return _scheduler
+
+
+@contextmanager
+def export_lane(lane: str, user_id: str = 'anonymous', on_wait: Optional[Callable[[int], None]] = None):
+    """
+    Run the enclosed code in a scheduler lane.
+
+    Args:
+        lane: 'interactive' or 'bulk'
+        user_id: Identifier used for fair sharing between sessions
+        on_wait: Called with the 1-based queue position while a query waits for a slot
+    """
+    tokens = (_current_lane.set(lane), _current_user.set(user_id), _current_on_wait.set(on_wait))
+    try:
+        yield
+    finally:
+        _current_on_wait.reset(tokens[2])
+        _current_user.reset(tokens[1])
+        _current_lane.reset(tokens[0])
+
+
+def get_current_lane() -> str:
+    """Lane of the code currently running ('interactive' unless inside a bulk export)."""
+    return _current_lane.get()
+
+
+@contextmanager
+def db_slot():
+    """Hold a database slot in the current lane while the enclosed query runs."""
+    with _scheduler.slot(_current_lane.get(), _current_user.get(), _current_on_wait.get()):
+        yield
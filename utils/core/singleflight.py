@@ -0,0 +1,109 @@
+"""
+Single-flight Request Coalescing
+
+`st.cache_data` only helps once a query has finished. When several sessions ask for the
+same data at the same moment, each of them would still hit the database. A SingleFlight
+group makes the first caller execute the work while identical concurrent callers wait
+for (and share) its result, so identical concurrent requests cost one execution.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+
+
+def normalize_sql(query: str) -> str:
+    """Collapse whitespace so formatting differences don't produce different keys."""
+    return re.sub(r'\s+', ' ', query).strip()
+
+
+def make_query_key(query: str, params: Dict[str, Any]) -> str:
+    """
+    Build a stable key for a query execution.
+
+    Args:
+        query: SQL text
+        params: Bound parameters (order does not matter)
+
+    Returns:
+        Hex digest identifying (normalized SQL, sorted params)
+    """
+    payload = json.dumps(
+        {"sql": normalize_sql(query), "params": params},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _LeaderAborted(Exception):
+    """The leader was stopped (e.g. a Streamlit rerun) before it had a result."""
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share the same key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run `fn` once per key among concurrent callers.
+
+        Errors of `fn` (Exception) are raised to every waiting caller. A leader stopped by
+        anything else (StopException/RerunException of Streamlit, KeyboardInterrupt) concerns
+        its own session only: the waiting callers retry and one of them becomes the leader.
+
+        Args:
+            key: Identity of the work
+            fn: Zero-argument callable doing the work
+
+        Returns:
+            Tuple of (result, shared) where shared is True if the result came
+            from another caller's execution
+        """
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                is_leader = future is None
+                if is_leader:
+                    future = Future()
+                    self._calls[key] = future
+
+            if not is_leader:
+                try:
+                    return future.result(), True
+                except _LeaderAborted:
+                    continue
+
+            try:
+                result = fn()
+            except Exception as e:
+                self._forget(key)
+                future.set_exception(e)
+                raise
+            except BaseException:
+                self._forget(key)
+                future.set_exception(_LeaderAborted())
+                raise
+            self._forget(key)
+            future.set_result(result)
+            return result, False
+
+    def _forget(self, key: str) -> None:
+        # Before the waiting callers are woken up, so a retrying one starts a new call
+        with self._lock:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        """Number of distinct keys currently executing."""
+        with self._lock:
+            return len(self._calls)
+
+
+# Shared by all sessions of this process
+query_flights = SingleFlight()
@@ -0,0 +1,194 @@
+"""
+Slow-Query Log
+
+Database executions slower than EXPORT_SLOW_QUERY_SECONDS are appended as JSON lines to
+EXPORT_SLOW_QUERY_LOG:
+
+    {"ts": ..., "fingerprint": "5b1f0c2e9a7d", "data_source": "keyword_lab", "query_type": "data",
+     "engine": "main", "duration": 42.1, "rows": 812334, "params": {...}, "sql": "...", "normalized": "select ...",
+     "plan_mode": "explain", "plan": ["..."]}
+
+The fingerprint groups executions of the same query shape (literals, inlined ID lists and
+whitespace normalized, see sql_rewrite.fingerprint_sql). The plan is captured in a
+background thread on the database the query ran on (primary or replica), holding a bulk
+lane scheduler slot like any other query, at most once per fingerprint per hour and one at
+a time, so a burst of slow batches doesn't add load on an already busy database:
+
+- "explain": EXPLAIN (EXPLAIN QUERY PLAN on a SQLite stand-in)
+- "profile": SingleStore PROFILE + SHOW PROFILE JSON (runs the query once more)
+
+The file is rotated at EXPORT_SLOW_QUERY_MAX_MB. Logging never breaks a query: failures
+are printed and ignored.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from utils.config import (
+    EXPORT_SLOW_QUERY_SECONDS, EXPORT_SLOW_QUERY_LOG, EXPORT_SLOW_QUERY_PLAN,
+    EXPORT_SLOW_QUERY_MAX_MB, EXPORT_SLOW_QUERY_BACKUPS
+)
+from utils.core.sql_rewrite import fingerprint_sql
+
+PLAN_MODES = ('explain', 'profile', 'off')
+PLAN_INTERVAL_SECONDS = 3600
+
+_write_lock = threading.Lock()
+_plan_lock = threading.Lock()
+_plan_slot = threading.Semaphore(1)
+# fingerprint -> time its plan was last captured
+_last_planned: Dict[str, float] = {}
+
+
+def is_slow(duration: float) -> bool:
+    return EXPORT_SLOW_QUERY_SECONDS > 0 and duration >= EXPORT_SLOW_QUERY_SECONDS
+
+
+def record_query(
+    query: str,
+    params: Dict[str, Any],
+    duration: float,
+    rows: Optional[int] = None,
+    data_source: str = 'unknown',
+    query_type: str = 'data',
+    engine: Optional[str] = None,
+) -> None:
+    """
+    Log a database execution if it was slow (no-op otherwise).
+
+    Args:
+        query: Final SQL text as executed
+        params: Bound parameters
+        duration: Seconds the execution took (queue wait excluded)
+        rows: Rows returned
+        data_source: Data source key
+        query_type: "data", "count", "fact" or a dimension name
+        engine: Database the query ran on (utils/core/database.py name, default the primary)
+    """
+    if not is_slow(duration):
+        return
+
+    normalized = fingerprint_sql(query)
+    entry = {
+        "ts": round(time.time(), 3),
+        "fingerprint": hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:12],
+        "data_source": data_source,
+        "query_type": query_type,
+        "engine": engine,
+        "duration": round(duration, 3),
+        "rows": rows,
+        "params": params,
+        "sql": query,
+        "normalized": normalized,
+    }
+
+    if EXPORT_SLOW_QUERY_PLAN in ('explain', 'profile') and _claim_plan(entry["fingerprint"]):
+        entry["plan_mode"] = EXPORT_SLOW_QUERY_PLAN
+        threading.Thread(
+            target=_capture_plan_and_write, args=(entry, query, params),
+            name="slow-query-plan", daemon=True
+        ).start()
+    else:
+        _write(entry)
+
+
+def _claim_plan(fingerprint: str) -> bool:
+    """Reserve the plan capture for a fingerprint (False if done recently or another runs)."""
+    now = time.time()
+    with _plan_lock:
+        if now - _last_planned.get(fingerprint, 0) < PLAN_INTERVAL_SECONDS:
+            return False
+        if not _plan_slot.acquire(blocking=False):
+            return False
+        _last_planned[fingerprint] = now
+        return True
+
+
+def _capture_plan_and_write(entry: Dict[str, Any], query: str, params: Dict[str, Any]) -> None:
+    try:
+        entry["plan"] = capture_plan(query, params, entry["plan_mode"], entry["engine"])
+    except Exception as e:
+        entry["plan_error"] = f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+    finally:
+        _plan_slot.release()
+    _write(entry)
+
+
+def capture_plan(query: str, params: Dict[str, Any], mode: str = 'explain', engine: Optional[str] = None) -> List[str]:
+    """
+    Plan of a query, from a pooled connection of the database it ran on.
+
+    Waits for a bulk lane slot of the export scheduler first: a PROFILE runs the query
+    again, and even an EXPLAIN must not get ahead of interactive queries.
+
+    Args:
+        query: Final SQL text
+        params: Bound parameters
+        mode: "explain" or "profile" (SingleStore only, executes the query)
+        engine: Database name (default the primary)
+
+    Returns:
+        Plan rows as text lines
+    """
+    from sqlalchemy import text
+    from utils.core.database import PRIMARY, get_connection
+    from utils.core.scheduler import db_slot, export_lane
+
+    with export_lane('bulk', user_id='slow-query-log'), db_slot():
+        with get_connection(engine or PRIMARY) as db:
+            conn = db.connection()
+            dialect = conn.dialect.name
+            if mode == 'profile' and dialect != 'sqlite':
+                conn.execute(text(f"PROFILE {query}"), params).fetchall()
+                rows = conn.execute(text("SHOW PROFILE JSON")).fetchall()
+            else:
+                prefix = "EXPLAIN QUERY PLAN" if dialect == 'sqlite' else "EXPLAIN"
+                rows = conn.execute(text(f"{prefix} {query}"), params).fetchall()
+    return [" | ".join("" if v is None else str(v) for v in row) for row in rows]
+
+
+def _rotate() -> None:
+    """Shift slow_queries.jsonl -> .1 -> .2 ... when the file reached the size limit."""
+    path = EXPORT_SLOW_QUERY_LOG
+    try:
+        if path.stat().st_size < EXPORT_SLOW_QUERY_MAX_MB * 1024 * 1024:
+            return
+    except FileNotFoundError:
+        return
+    for i in range(EXPORT_SLOW_QUERY_BACKUPS, 0, -1):
+        older = path.with_name(f"{path.name}.{i}")
+        newer = path.with_name(f"{path.name}.{i - 1}") if i > 1 else path
+        if newer.exists():
+            os.replace(newer, older)
+    if path.exists():
+        path.unlink()
+
+
+def _write(entry: Dict[str, Any]) -> None:
+    line = json.dumps(entry, default=str, separators=(',', ':'))
+    try:
+        with _write_lock:
+            EXPORT_SLOW_QUERY_LOG.parent.mkdir(parents=True, exist_ok=True)
+            _rotate()
+            with open(EXPORT_SLOW_QUERY_LOG, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+    except OSError as e:
+        print(f"--- WARNING: slow-query log write failed ({type(e).__name__}: {e}) ---")
+
+
+def read_slow_queries(limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Entries of the current log file, newest first."""
+    try:
+        with open(EXPORT_SLOW_QUERY_LOG, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return
+    for line in reversed(lines[-limit:] if limit else lines):
+        try:
+            yield json.loads(line)
+        except ValueError:
+            continue
@@ -0,0 +1,523 @@
+"""
+SQL Rewriting Helpers
+
+Small, dependency-free helpers that understand just enough of the SELECT statements in
+data_logic/sql to rewrite them safely: parentheses, string literals and comments are
+respected, and anything the helpers are not sure about (UNION, SELECT DISTINCT, `*`
+projections) is left untouched.
+
+Column projection: `project_columns` removes select items the user did not ask for from
+the final statement, then walks the CTEs backwards and removes items no later statement
+references, and finally drops declared LEFT JOINs whose alias is no longer used.
+
+Output filters: `add_having_conditions` appends conditions on output columns to the final
+statement, so threshold filters on aggregated metrics run in the database.
+
+Optional filters: `specialize_optional_filters` turns the generic
+`(:x is null or col = :x)` / `(:x is null or col like :x)` form into a plain predicate
+or removes it, so each combination of present filters gets its own query text and plan.
+
+Date ranges: `rewrite_date_ranges` turns `date(col) between :start_date and :end_date` and
+`col between :start_date and :end_date` into the half-open range
+`col >= :start_date and col < :end_date_next`, which can use the sort key of the column
+and includes the whole end day for datetime columns.
+"""
+
+import re
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+_IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+_CLAUSE_KEYWORDS = re.compile(r'\b(where|group\s+by|having|order\s+by|limit)\b', re.IGNORECASE)
+_JOIN_KEYWORD = re.compile(
+    r'\b(?:(?:left|right|full)(?:\s+outer)?\s+|inner\s+|cross\s+|straight_)?join\b', re.IGNORECASE
+)
+_LEFT_JOIN = re.compile(
+    r'^\s*left\s+(?:outer\s+)?join\s+([\w.`]+)(?:\s+(?:as\s+)?(?!on\b)(\w+))?\s+on\b',
+    re.IGNORECASE
+)
+_OPTIONAL_FILTER = re.compile(
+    r'(?P<and>\band\s+)?\(\s*:(?P<param>\w+)\s+is\s+null\s+or\s+(?P<column>[\w.`]+)'
+    r'\s*(?P<operator>=|\blike\b)\s*:(?P=param)\s*\)',
+    re.IGNORECASE
+)
+_DATE_RANGE = re.compile(
+    r'(?:\bdate\s*\(\s*(?P<wrapped>[\w.`]+)\s*\)|(?P<column>(?<![\w.`])[\w.`]+))'
+    r'\s+between\s+:start_date\s+and\s+:end_date\b',
+    re.IGNORECASE
+)
+_STAR_PROJECTION = re.compile(r'(?:\bselect\s+(?:distinct\s+)?|,\s*)(?:\w+\.)?\*', re.IGNORECASE)
+
+
+# --- Scanning ---
+def _scan_depths(sql: str) -> List[int]:
+    """
+    Parenthesis depth of every character; -1 inside string literals, -2 inside comments.
+
+    An opening parenthesis has the depth outside of it, its content depth + 1.
+    """
+    depths = [0] * len(sql)
+    depth = 0
+    i, n = 0, len(sql)
+    while i < n:
+        ch = sql[i]
+        if ch in ("'", '"', '`'):
+            end = i + 1
+            while end < n:
+                if sql[end] == '\\' and ch != '`':
+                    end += 2
+                    continue
+                if sql[end] == ch:
+                    break
+                end += 1
+            for j in range(i, min(end + 1, n)):
+                depths[j] = -1
+            i = end + 1
+            continue
+        if sql.startswith('--', i) or ch == '#':
+            end = sql.find('\n', i)
+            end = n if end == -1 else end
+            for j in range(i, end):
+                depths[j] = -2
+            i = end
+            continue
+        if sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            for j in range(i, end):
+                depths[j] = -2
+            i = end
+            continue
+
+        if ch == '(':
+            depths[i] = depth
+            depth += 1
+        elif ch == ')':
+            depth = max(depth - 1, 0)
+            depths[i] = depth
+        else:
+            depths[i] = depth
+        i += 1
+    return depths
+
+
+def _find_top_level(pattern: re.Pattern, sql: str, depths: List[int], start: int = 0, end: Optional[int] = None):
+    """Matches of `pattern` in sql[start:end] that start at parenthesis depth 0."""
+    end = len(sql) if end is None else end
+    return [m for m in pattern.finditer(sql, start, end) if depths[m.start()] == 0]
+
+
+def _code_only(sql: str, depths: List[int]) -> str:
+    """The SQL with string literals and comments blanked out (same length)."""
+    return ''.join(' ' if depths[i] < 0 else ch for i, ch in enumerate(sql))
+
+
+def mask_sql(sql: str, keep_literals: bool = False) -> str:
+    """The SQL with comments (and string literals unless keep_literals) blanked out, same length."""
+    depths = _scan_depths(sql)
+    if not keep_literals:
+        return _code_only(sql, depths)
+    return ''.join(' ' if depths[i] == -2 else ch for i, ch in enumerate(sql))
+
+
+_NUMBER = re.compile(r'(?<![\w.:])\d+(?:\.\d+)?\b')
+_VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+
+def fingerprint_sql(sql: str) -> str:
+    """
+    Normalized shape of a query for grouping executions: comments dropped, string and
+    number literals replaced by ?, value lists (inlined IDs) collapsed to (?+), whitespace
+    collapsed and lower-cased. Bind parameter names are kept.
+    """
+    depths = _scan_depths(sql)
+    out = []
+    i, n = 0, len(sql)
+    while i < n:
+        if depths[i] == -2:
+            out.append(' ')
+            i += 1
+        elif depths[i] == -1 and sql[i] in ("'", '"'):
+            # Same literal boundaries as _scan_depths (backslash escapes)
+            end = i + 1
+            while end < n and sql[end] != sql[i]:
+                end += 2 if sql[end] == '\\' else 1
+            out.append('?')
+            i = end + 1
+        else:
+            out.append(sql[i])
+            i += 1
+    text = _NUMBER.sub('?', ''.join(out))
+    text = _VALUE_LIST.sub('(?+)', text)
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+def _identifiers(sql: str) -> set:
+    """Lower-cased identifiers used outside of string literals and comments."""
+    return {word.lower() for word in _IDENTIFIER.findall(_code_only(sql, _scan_depths(sql)))}
+
+
+# --- Statement structure ---
+def _split_with(sql: str) -> Tuple[List[Tuple[str, int, int]], int]:
+    """
+    Locate the CTEs of a WITH statement.
+
+    Returns:
+        Tuple of ([(cte_name, body_start, body_end), ...], start of the final statement)
+    """
+    depths = _scan_depths(sql)
+    first = re.match(r'\s*with\b', _code_only(sql, depths), re.IGNORECASE)
+    if not first:
+        return [], 0
+
+    ctes = []
+    pos = first.end()
+    cte_start = re.compile(r'\s*,?\s*(\w+)\s+as\s*\(', re.IGNORECASE)
+    while True:
+        m = cte_start.match(sql, pos)
+        if not m:
+            break
+        body_start = m.end()
+        body_end = body_start
+        while body_end < len(sql) and not (sql[body_end] == ')' and depths[body_end] == 0):
+            body_end += 1
+        ctes.append((m.group(1), body_start, body_end))
+        pos = body_end + 1
+    return ctes, pos
+
+
+def _parse_select(stmt: str) -> Optional[dict]:
+    """
+    Parse a single SELECT statement (no WITH) into the spans we need.
+
+    Returns:
+        None if the statement is not a plain SELECT (e.g. contains a top-level UNION)
+    """
+    depths = _scan_depths(stmt)
+    if _find_top_level(re.compile(r'\bunion\b', re.IGNORECASE), stmt, depths):
+        return None
+    selects = _find_top_level(re.compile(r'\bselect\b', re.IGNORECASE), stmt, depths)
+    if not selects:
+        return None
+    list_start = selects[0].end()
+    distinct = re.match(r'\s*distinct\b', stmt[list_start:], re.IGNORECASE)
+    if distinct:
+        list_start += distinct.end()
+
+    froms = _find_top_level(re.compile(r'\bfrom\b', re.IGNORECASE), stmt, depths, list_start)
+    if not froms:
+        return None
+    from_start = froms[0].start()
+
+    clauses = _find_top_level(_CLAUSE_KEYWORDS, stmt, depths, froms[0].end())
+    from_end = clauses[0].start() if clauses else len(stmt)
+    group_start = next(
+        (m.start() for m in clauses if m.group(1).lower().split()[0] in ('group', 'having', 'order')),
+        len(stmt)
+    )
+
+    items = []
+    item_start = list_start
+    for i in range(list_start, from_start):
+        if stmt[i] == ',' and depths[i] == 0:
+            items.append((item_start, i))
+            item_start = i + 1
+    items.append((item_start, from_start))
+
+    return {
+        "depths": depths,
+        "distinct": bool(distinct),
+        "list_start": list_start,
+        "from_start": from_start,
+        "from_end": from_end,
+        "group_start": group_start,
+        "items": [(s, e) for s, e in items if stmt[s:e].strip()],
+    }
+
+
+def select_item_alias(item: str) -> Optional[str]:
+    """
+    Output column name of a select item.
+
+    Examples: `sum(cost) as cost` -> cost, `sf.storefront_name` -> storefront_name,
+    `AVG(x)AS y` -> y. Returns None for `*` and unnamed expressions.
+    """
+    item = item.strip()
+    m = re.search(r'\bas\s+[`"]?(\w+)[`"]?\s*$', item, re.IGNORECASE)
+    if m:
+        return m.group(1)
+    m = re.fullmatch(r'(?:[\w`]+\.)*[`"]?(\w+)[`"]?', item)
+    if m:
+        return m.group(1)
+    # Implicit alias: `expression alias`
+    m = re.search(r'[\w)`]\s+(\w+)\s*$', item)
+    if m and m.group(1).lower() not in ('end', 'desc', 'asc'):
+        return m.group(1)
+    return None
+
+
+def get_select_columns(sql: str) -> List[str]:
+    """Output column names of the final statement of a query, in order."""
+    _, final_start = _split_with(sql)
+    final = sql[final_start:]
+    parsed = _parse_select(final)
+    if parsed is None:
+        return []
+    aliases = (select_item_alias(final[s:e]) for s, e in parsed["items"])
+    return [alias for alias in aliases if alias]
+
+
+def split_statements(sql: str) -> List[Tuple[Optional[str], int, str]]:
+    """CTE bodies and the final statement of a query as (cte name or None, offset, text)."""
+    ctes, final_start = _split_with(sql)
+    statements = [(name, start, sql[start:end]) for name, start, end in ctes]
+    statements.append((None, final_start, sql[final_start:]))
+    return statements
+
+
+def describe_select(stmt: str) -> Optional[dict]:
+    """
+    Structure of a single SELECT statement, for analysis tools.
+
+    Returns:
+        Dict with 'distinct', 'items' [(offset, text)], 'group_by' [(offset, text)] and
+        'order_by' (offset of a top-level ORDER BY or None); None if not a plain SELECT
+    """
+    parsed = _parse_select(stmt)
+    if parsed is None:
+        return None
+    depths = parsed["depths"]
+    clauses = _find_top_level(_CLAUSE_KEYWORDS, stmt, depths, parsed["from_start"])
+
+    group_by = []
+    for i, m in enumerate(clauses):
+        if m.group(1).lower().startswith('group'):
+            end = clauses[i + 1].start() if i + 1 < len(clauses) else len(stmt)
+            item_start = m.end()
+            for j in range(m.end(), end + 1):
+                if j == end or (stmt[j] == ',' and depths[j] == 0):
+                    if stmt[item_start:j].strip():
+                        group_by.append((item_start, stmt[item_start:j]))
+                    item_start = j + 1
+    order_by = next((m.start() for m in clauses if m.group(1).lower().startswith('order')), None)
+
+    return {
+        "distinct": parsed["distinct"],
+        "items": [(s, stmt[s:e]) for s, e in parsed["items"]],
+        "group_by": group_by,
+        "order_by": order_by,
+    }
+
+
+def line_of(sql: str, offset: int) -> int:
+    """1-based line number of a character offset."""
+    return sql.count('\n', 0, offset) + 1
+
+
+# --- Pruning ---
+def _prune_left_joins(stmt: str, prunable_joins: Iterable[str]) -> str:
+    """Remove declared LEFT JOINs whose alias is not referenced anywhere else in the statement."""
+    prunable = {alias.lower() for alias in prunable_joins}
+    parsed = _parse_select(stmt) if prunable else None
+    if parsed is None:
+        return stmt
+
+    depths = parsed["depths"]
+    joins = _find_top_level(_JOIN_KEYWORD, stmt, depths, parsed["from_start"], parsed["from_end"])
+    segments = [
+        (m.start(), joins[i + 1].start() if i + 1 < len(joins) else parsed["from_end"])
+        for i, m in enumerate(joins)
+    ]
+    for start, end in reversed(segments):
+        m = _LEFT_JOIN.match(stmt[start:end])
+        if not m:
+            continue
+        alias = (m.group(2) or m.group(1).split('.')[-1]).strip('`')
+        if alias.lower() not in prunable:
+            continue
+        rest = stmt[:start] + stmt[end:]
+        if re.search(rf'\b{re.escape(alias)}\s*\.', _code_only(rest, _scan_depths(rest)), re.IGNORECASE):
+            continue
+        stmt = rest
+    return stmt
+
+
+def _prune_statement(stmt: str, keep: Callable[[str], bool], prunable_joins: Iterable[str]) -> str:
+    """Remove select items whose alias is not kept, then unused declared LEFT JOINs."""
+    parsed = _parse_select(stmt)
+    # DISTINCT depends on every selected column, removing one changes the rows
+    if parsed is None or parsed["distinct"]:
+        return stmt
+
+    # Items used by GROUP BY / HAVING / ORDER BY must stay (they may refer to select aliases)
+    clause_refs = _identifiers(stmt[parsed["group_start"]:])
+    kept, removed = [], False
+    for start, end in parsed["items"]:
+        item = stmt[start:end]
+        alias = select_item_alias(item)
+        if alias is None or keep(alias.lower()) or alias.lower() in clause_refs:
+            kept.append(item.strip())
+        else:
+            removed = True
+    if not kept:
+        return stmt
+    if removed:
+        # Keep the layout of the original select list
+        original = stmt[parsed["list_start"]:parsed["from_start"]]
+        leading = original[:len(original) - len(original.lstrip())]
+        trailing = original[len(original.rstrip()):]
+        indent = leading.rsplit("\n", 1)[-1] if "\n" in leading else "    "
+        select_list = leading + (",\n" + indent).join(kept) + trailing
+        stmt = stmt[:parsed["list_start"]] + select_list + stmt[parsed["from_start"]:]
+    return _prune_left_joins(stmt, prunable_joins)
+
+
+def project_columns(
+    sql: str,
+    columns: Sequence[str],
+    keep: Sequence[str] = (),
+    prunable_joins: Iterable[str] = (),
+) -> str:
+    """
+    Rewrite a query so it only computes the requested output columns.
+
+    Args:
+        sql: Data query
+        columns: Output columns requested by the user
+        keep: Columns that must stay regardless (e.g. merge keys of batched exports)
+        prunable_joins: Aliases of LEFT JOINs that may be removed once nothing uses them
+            (only declare joins that cannot change the row count, i.e. to a unique key)
+
+    Returns:
+        The rewritten SQL (unchanged if nothing could be pruned safely)
+    """
+    wanted = {c.lower() for c in columns} | {c.lower() for c in keep}
+    prunable_joins = list(prunable_joins)
+
+    ctes, final_start = _split_with(sql)
+    final = _prune_statement(sql[final_start:], lambda alias: alias in wanted, prunable_joins)
+
+    # Walk the CTEs backwards: a CTE item is needed if a later statement mentions its name
+    downstream = [final]
+    new_bodies = {}
+    for name, body_start, body_end in reversed(ctes):
+        body = sql[body_start:body_end]
+        referencing = [t for t in downstream if re.search(rf'\b{re.escape(name)}\b', t, re.IGNORECASE)]
+        if referencing and not any(_STAR_PROJECTION.search(t) for t in referencing):
+            refs = set().union(*(_identifiers(t) for t in referencing))
+            body = _prune_statement(body, lambda alias: alias in refs, prunable_joins)
+        new_bodies[name] = body
+        downstream.append(body)
+
+    result, pos = [], 0
+    for name, body_start, body_end in ctes:
+        result.append(sql[pos:body_start])
+        result.append(new_bodies[name])
+        pos = body_end
+    result.append(sql[pos:final_start])
+    result.append(final)
+    return ''.join(result)
+
+
+# --- Output filters ---
+def add_having_conditions(sql: str, conditions: Sequence[str]) -> str:
+    """
+    Add conditions on output columns to the HAVING clause of the final statement.
+
+    An existing HAVING clause is kept and AND-ed with the new conditions. The clause is
+    placed before ORDER BY / LIMIT.
+
+    Args:
+        sql: Query
+        conditions: SQL conditions referring to output column aliases
+
+    Returns:
+        The rewritten SQL
+    """
+    if not conditions:
+        return sql
+    _, final_start = _split_with(sql)
+    final = sql[final_start:]
+    parsed = _parse_select(final)
+    if parsed is None:
+        raise ValueError("Filters can only be added to a plain SELECT statement")
+
+    new_conditions = " AND ".join(f"({c})" for c in conditions)
+    depths = parsed["depths"]
+    clauses = _find_top_level(_CLAUSE_KEYWORDS, final, depths, parsed["from_start"])
+    having = next((m for m in clauses if m.group(1).lower() == 'having'), None)
+    tail = next((m for m in clauses if m.group(1).lower().split()[0] in ('order', 'limit')), None)
+    tail_start = tail.start() if tail else len(final.rstrip().rstrip(';').rstrip())
+
+    if having:
+        existing = final[having.end():tail_start].strip()
+        clause = f"HAVING ({existing}) AND {new_conditions}"
+        final = final[:having.start()] + clause + "\n" + final[tail_start:]
+    else:
+        final = final[:tail_start].rstrip() + f"\nHAVING {new_conditions}\n" + final[tail_start:]
+    return sql[:final_start] + final
+
+
+# --- Optional filters ---
+def specialize_optional_filters(sql: str, null_params: Iterable[str]) -> str:
+    """
+    Specialize `(:x is null or col = :x)` and `(:x is null or col like :x)` predicates
+    for the parameters that are set.
+
+    Args:
+        sql: Query template
+        null_params: Names of parameters whose value is None
+
+    Returns:
+        SQL where the predicate is removed for None parameters (`AND ...` is dropped,
+        a leading predicate becomes TRUE) and is `col = :x` / `col like :x` otherwise
+    """
+    null_params = set(null_params)
+
+    def replace(m: re.Match) -> str:
+        if m.group('param') in null_params:
+            return '' if m.group('and') else 'TRUE'
+        return f"{m.group('and') or ''}{m.group('column')} {m.group('operator')} :{m.group('param')}"
+
+    return _OPTIONAL_FILTER.sub(replace, sql)
+
+
+def referenced_params(sql: str) -> set:
+    """Names of the `:param` placeholders used in a query (outside literals and comments)."""
+    code = _code_only(sql, _scan_depths(sql))
+    return set(re.findall(r'(?<![:\w]):(\w+)', code))
+
+
+# --- Date ranges ---
+def rewrite_date_ranges(sql: str) -> str:
+    """
+    Rewrite `[date(]col[)] between :start_date and :end_date` to a half-open range.
+
+    The caller binds `end_date_next` (end_date + 1 day).
+    """
+    code = _code_only(sql, _scan_depths(sql))
+    parts, pos = [], 0
+    for m in _DATE_RANGE.finditer(code):
+        column = sql[m.start(m.lastgroup):m.end(m.lastgroup)]
+        parts.append(sql[pos:m.start()])
+        parts.append(f"({column} >= :start_date and {column} < :end_date_next)")
+        pos = m.end()
+    parts.append(sql[pos:])
+    return ''.join(parts)
+
+
+# --- Loader preprocessing ---
+def prepare_template(sql: str, null_params: Iterable[str] = ()) -> str:
+    """Rewrites the SQL template loader applies to every query file (filters, then dates)."""
+    return rewrite_date_ranges(specialize_optional_filters(sql, null_params))
+
+
+def inline_id_list(sql: str, param: str, ids: Iterable[Any]) -> str:
+    """
+    Format a list of IDs into the SQL for an `IN :param` clause.
+
+    text() can't expand lists with pandas.read_sql; this is safe from SQL injection
+    because every ID is cast to int first.
+    """
+    safe_ids = [int(i) for i in ids]
+    ids_string = f"({safe_ids[0]})" if len(safe_ids) == 1 else str(tuple(safe_ids))
+    return sql.replace(f':{param}', ids_string)
@@ -0,0 +1,270 @@
+"""
+Structured Tracing
+
+Span-based tracing of the export pipeline (export -> batch -> query -> merge -> encode):
+
+    with span("batch", index=i) as batch_span:
+        df = get_data(...)
+        batch_span.set("rows", len(df))
+
+- Timings use the monotonic clock; parent/child links follow the call stack through a
+  context variable, so concurrent sessions (threads) never mix their spans.
+- Arguments and results are captured as short summaries (type and shape for frames, capped
+  text for everything else), never by formatting a whole object.
+- Sampling is decided once per trace (EXPORT_TRACE_SAMPLE_RATE); spans of an unsampled
+  trace are shared no-op objects.
+- Finished spans go to a fixed-size ring buffer (EXPORT_TRACE_BUFFER_SIZE), shown per
+  session in the debug expander.
+"""
+
+import contextvars
+import functools
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.config import EXPORT_TRACE_SAMPLE_RATE, EXPORT_TRACE_BUFFER_SIZE, EXPORT_TRACE_MAX_ARG_CHARS
+
+_MAX_ITEMS = 5
+
+_current: contextvars.ContextVar = contextvars.ContextVar("export_trace_span", default=None)
+_ids = itertools.count(1)
+_buffer: deque = deque(maxlen=EXPORT_TRACE_BUFFER_SIZE)
+_buffer_lock = threading.Lock()
+
+
+def _truncate(text: str, max_chars: int = EXPORT_TRACE_MAX_ARG_CHARS) -> str:
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}... ({len(text)} chars)"
+
+
+def summarize(value: Any, max_chars: int = EXPORT_TRACE_MAX_ARG_CHARS) -> Any:
+    """
+    Short, bounded description of a value for span attributes.
+
+    DataFrames, Series and arrays are described by type and shape; containers by their
+    first few items; strings are capped. The cost doesn't depend on the size of the value.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (str, bytes)):
+        return _truncate(value if isinstance(value, str) else repr(value), max_chars)
+    shape = getattr(value, "shape", None)
+    if shape is not None:
+        return f"<{type(value).__name__} shape={tuple(shape)}>"
+    if isinstance(value, dict):
+        items = [f"{k!s}: {summarize(v, max_chars)}" for k, v in itertools.islice(value.items(), _MAX_ITEMS)]
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = [str(summarize(v, max_chars)) for v in itertools.islice(value, _MAX_ITEMS)]
+    else:
+        return f"<{type(value).__name__}>"
+    more = f", ... ({len(value)} items)" if len(value) > _MAX_ITEMS else ""
+    return _truncate(f"{type(value).__name__}[{', '.join(items)}{more}]", max_chars)
+
+
+class Span:
+    """A timed operation; use as a context manager (see span())."""
+
+    __slots__ = ("name", "span_id", "parent_id", "trace_id", "attributes",
+                 "status", "error", "started_at", "duration_ms", "_start", "_token")
+    recording = True
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.attributes = attributes
+        self.status = "ok"
+        self.error = None
+        self.started_at = None
+        self.duration_ms = None
+
+    def set(self, key: str, value: Any) -> None:
+        """Attach an attribute (pass cheap values; use summarize() for arbitrary objects)."""
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        self.started_at = time.time()
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.duration_ms = (time.perf_counter_ns() - self._start) / 1e6
+        # Control-flow exceptions that aren't errors (st.rerun, KeyboardInterrupt) derive from BaseException
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.status = "error"
+            self.error = _truncate(f"{exc_type.__name__}: {exc}")
+        _current.reset(self._token)
+        with _buffer_lock:
+            _buffer.append(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stand-in for spans that aren't recorded (tracing off or trace not sampled)."""
+
+    __slots__ = ("_token",)
+    recording = False
+    parent_id = None
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+class _UnsampledRoot(_NoopSpan):
+    """Root of an unsampled trace: marks the context so nested spans are no-ops too."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_UnsampledRoot":
+        self._token = _current.set(_UNSAMPLED)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _current.reset(self._token)
+        return False
+
+
+_NOOP = _NoopSpan()
+_UNSAMPLED = _NoopSpan()
+
+
+def span(name: str, **attributes: Any):
+    """
+    Create a span for use in a `with` block.
+
+    A span started without an active span begins a new trace; the sampling decision of
+    that root applies to everything nested in it.
+
+    Args:
+        name: Operation name, e.g. "export", "batch", "query"
+        **attributes: Initial attributes (cheap values only)
+
+    Returns:
+        Span, or a no-op span if the trace is not recorded
+    """
+    parent = _current.get()
+    if parent is _UNSAMPLED:
+        return _NOOP
+    if parent is None:
+        if EXPORT_TRACE_SAMPLE_RATE <= 0:
+            return _NOOP
+        if EXPORT_TRACE_SAMPLE_RATE < 1 and random.random() >= EXPORT_TRACE_SAMPLE_RATE:
+            return _UnsampledRoot()
+    return Span(name, parent, attributes)
+
+
+def current_span():
+    """The innermost active span (None outside of a trace)."""
+    current = _current.get()
+    return current if isinstance(current, Span) else None
+
+
+def traced(
+    name: Optional[str] = None,
+    capture_args: bool = True,
+    root_attributes: Optional[Callable[[], Dict[str, Any]]] = None,
+):
+    """
+    Decorator running a function inside a span.
+
+    Args:
+        name: Span name (default: the function name)
+        capture_args: Record summaries of the arguments and the return value
+        root_attributes: Optional callable adding attributes when the call starts a trace
+                         (e.g. the session it belongs to)
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            current = span(span_name)
+            if not current.recording:
+                with current:
+                    return func(*args, **kwargs)
+
+            current.attributes["module"] = func.__module__
+            if capture_args:
+                if args:
+                    current.attributes["args"] = [summarize(a) for a in args]
+                if kwargs:
+                    current.attributes["kwargs"] = {k: summarize(v) for k, v in kwargs.items()}
+            if root_attributes is not None and current.parent_id is None:
+                try:
+                    current.attributes.update(root_attributes())
+                except Exception:
+                    pass
+            with current:
+                result = func(*args, **kwargs)
+                if capture_args:
+                    current.attributes["result"] = summarize(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def recent_traces(limit: int = 20, session: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Finished traces from the ring buffer, newest first, as nested span dicts.
+
+    Args:
+        limit: Maximum number of traces
+        session: Only traces whose root span has this "session" attribute
+    """
+    with _buffer_lock:
+        spans = list(_buffer)
+
+    by_trace: Dict[int, List[Span]] = {}
+    for s in spans:
+        by_trace.setdefault(s.trace_id, []).append(s)
+
+    roots = []
+    for trace_id, members in by_trace.items():
+        root = next((s for s in members if s.span_id == trace_id), None)
+        # Root evicted from the buffer, or trace still running
+        if root is None:
+            continue
+        if session is not None and root.attributes.get("session") != session:
+            continue
+        roots.append((root, members))
+    roots.sort(key=lambda item: item[0].started_at, reverse=True)
+
+    traces = []
+    for root, members in roots[:limit]:
+        nodes = {s.span_id: dict(s.to_dict(), children=[]) for s in members}
+        for s in sorted(members, key=lambda s: s.started_at):
+            parent = nodes.get(s.parent_id)
+            if parent is not None:
+                parent["children"].append(nodes[s.span_id])
+        traces.append(nodes[root.span_id])
+    return traces
+
+
+def clear_traces() -> None:
+    with _buffer_lock:
+        _buffer.clear()
@@ -0,0 +1,103 @@
+"""
+Workload Recording
+
+When EXPORT_WORKLOAD_LOG is set, every count, preview and export request appends one
+compact JSON line to that file:
+
+    {"ts": 1760000000.0, "session": "3f2a9c1b", "event": "export", "data_source": "keyword_lab",
+     "params": {...}, "duration": 12.4, "rows": 48210, "status": "ok", "batch_days": 7}
+
+Params are normalized like artifact keys (UI-only keys dropped, lists sorted), sessions
+are shortened hashes. tools/replay_workload.py re-issues a recorded log against any
+configured database, so caching, batching and scheduling changes can be judged on real
+traffic shapes (month-end peaks, many storefronts, long ranges).
+
+Recording never breaks a request: write errors are printed and ignored.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from utils.config import EXPORT_WORKLOAD_LOG
+from utils.core.artifact_store import normalize_export_params
+
+EVENTS = ('count', 'preview', 'export')
+
+_lock = threading.Lock()
+
+
+def is_recording() -> bool:
+    return EXPORT_WORKLOAD_LOG is not None
+
+
+def _session_tag(session_id: Optional[str]) -> Optional[str]:
+    if not session_id:
+        return None
+    return hashlib.sha256(str(session_id).encode('utf-8')).hexdigest()[:8]
+
+
+def record_request(
+    event: str,
+    data_source: str,
+    params: Dict[str, Any],
+    duration: Optional[float] = None,
+    rows: Optional[int] = None,
+    status: str = 'ok',
+    session_id: Optional[str] = None,
+    **extra: Any,
+) -> None:
+    """
+    Append one request to the workload log (no-op when recording is off).
+
+    Args:
+        event: 'count', 'preview' or 'export'
+        data_source: Data source key
+        params: SQL parameters of the request (UI-only keys are dropped)
+        duration: Seconds the request took
+        rows: Rows counted / returned
+        status: 'ok', 'empty', 'error' or 'artifact' (served from the artifact store)
+        session_id: Browser session, stored as a short hash to group requests per user
+        **extra: Additional fields, e.g. batch_days of an export
+    """
+    if EXPORT_WORKLOAD_LOG is None:
+        return
+
+    record = {
+        "ts": round(time.time(), 3),
+        "session": _session_tag(session_id),
+        "event": event,
+        "data_source": data_source,
+        "params": normalize_export_params(params),
+        "duration": round(duration, 3) if duration is not None else None,
+        "rows": int(rows) if rows is not None else None,
+        "status": status,
+        **extra,
+    }
+    line = json.dumps(record, default=str, separators=(',', ':'))
+    try:
+        with _lock:
+            EXPORT_WORKLOAD_LOG.parent.mkdir(parents=True, exist_ok=True)
+            with open(EXPORT_WORKLOAD_LOG, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+    except OSError as e:
+        print(f"--- WARNING: workload log write failed ({type(e).__name__}: {e}) ---")
+
+
+def read_workload(path: Optional[Path] = None) -> Iterator[Dict[str, Any]]:
+    """Records of a workload log in file order (malformed lines are skipped)."""
+    path = Path(path or EXPORT_WORKLOAD_LOG)
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("event") in EVENTS:
+                yield record
@@ -11,10 +11,17 @@ from datetime import date
 import time
 from datetime import datetime, timedelta
 from utils.core.helpers import trace_function_call
+from utils.core.tracing import span
+from utils.core.metrics import stage
 from typing import Dict, Any, Tuple, Optional, List
-from utils.ui.input_config import get_input_config, get_data_source_config, INPUT_FIELDS
+from utils.ui.input_config import get_input_config, get_data_source_config, get_date_presets, INPUT_FIELDS
 from utils.validation.input_validator import validate_data_source_inputs, build_sql_params
-from utils.core.logic import load_data, convert_df_to_csv
+from utils.core.logic import load_data, convert_df_to_csv, get_export_columns
+from utils.core.cost_model import over_budget_slot, record_export_run, estimate_export_cost
+from utils.core.artifact_store import find_artifact, save_artifact, read_artifact, list_artifacts, remember_export
+from utils.core.batch_export import DATE_GRAIN_CONFIGS
+from utils.core.workload_log import record_request
+from contextlib import ExitStack
 
 def create_dynamic_input_form(data_source: str) -> Tuple[Dict[str, Any], List[str]]:
     """
@@ -147,6 +154,32 @@ def _render_single_field(field_name: str, data_source: str) -> Any:
             help=help_text
         )
     
+    elif field_type == "number":
+        return st.number_input(
+            label,
+            min_value=0.0,
+            value=None,
+            key=key,
+            help=help_text,
+            placeholder="No minimum"
+        )
+    
+    elif field_type == "multiselect":
+        if field_config.get("options_from") == "export_columns":
+            options = get_export_columns(data_source)["columns"]
+        else:
+            options = field_config.get("options", [])
+        if not options:
+            return []
+        
+        return st.multiselect(
+            label,
+            options=options,
+            default=[v for v in field_config.get("default", []) if v in options],
+            key=key,
+            help=help_text
+        )
+    
     return None
 
 def _render_date_range_field(field_name: str, data_source: str) -> Tuple[Optional[Any], Optional[Any]]:
@@ -157,7 +190,8 @@ def _render_date_range_field(field_name: str, data_source: str) -> Tuple[Optiona
     
     label = field_config["label"]
     required = field_config.get("required", False)
-    presets = field_config.get("presets", {})
+    # Recompute presets on every render so they don't go stale in a long-running server
+    presets = get_date_presets()
     
     if required:
         label += " *"
@@ -222,10 +256,6 @@ def create_action_buttons(data_source: str, input_values: Dict[str, Any], valida
         use_container_width=True,
         help="Click to start data export process" if not button_disabled else "Please fix validation errors first"
     ):
-        # Reset the trace for the new action
-        if 'call_trace' in st.session_state:
-            st.session_state.call_trace = []
-
         if not validation_errors:
             # Build SQL parameters
             sql_params = build_sql_params(data_source, input_values)
@@ -243,7 +273,17 @@ def create_action_buttons(data_source: str, input_values: Dict[str, Any], valida
             # Import and call the refactored logic
             from utils.core.logic import handle_export_process
             
-            handle_export_process(data_source=data_source)
+            request_start = time.time()
+            with stage('count', data_source):
+                handle_export_process(data_source=data_source)
+            num_row = st.session_state.params.get('num_row')
+            record_request(
+                'count', data_source, sql_params,
+                duration=time.time() - request_start,
+                rows=num_row,
+                status='ok' if st.session_state.stage == 'loading_preview' else ('empty' if num_row == 0 else 'error'),
+                session_id=st.session_state.get('session_id')
+            )
             st.rerun()
 
 
@@ -251,8 +291,10 @@ def create_action_buttons(data_source: str, input_values: Dict[str, Any], valida
 def _handle_loading_preview():
     """Stage 1: Load a preview of the data (first 500 rows)."""
     start_time = time.time()
-    with st.spinner("Loading preview (500 rows)..."):
+    with st.spinner("Loading preview (500 rows)..."), \
+            stage('preview', st.session_state.params.get('data_source')) as recorded:
         df_preview = load_data(st.session_state.params.get('data_source'), limit=500)
+        recorded.rows = len(df_preview) if df_preview is not None else 0
         if df_preview is not None and not df_preview.empty:
             st.session_state.df_preview = df_preview
             st.session_state.stage = 'loaded'
@@ -260,6 +302,13 @@ def _handle_loading_preview():
             st.warning("No data found for the selected criteria.")
             st.session_state.stage = 'initial'
     st.session_state.query_duration = time.time() - start_time
+    record_request(
+        'preview', st.session_state.params.get('data_source'), st.session_state.params,
+        duration=st.session_state.query_duration,
+        rows=len(df_preview) if df_preview is not None else None,
+        status='error' if df_preview is None else ('ok' if not df_preview.empty else 'empty'),
+        session_id=st.session_state.get('session_id')
+    )
     st.rerun()
 
 def _display_results():
@@ -295,8 +344,21 @@ def _display_results():
         cols[2].metric("Date Range", date_range_display)
         cols[3].metric("Storefronts", num_storefronts)
         cols[4].metric("Preview Query Time", f"{query_duration:.2f} s")
+        estimated_cost = st.session_state.get('admission', {}).get(
+            'estimated_cost',
+            estimate_export_cost(params.get('data_source'), total_rows_estimated)
+        )
+        cols[5].metric("Estimated DB Cost", f"{estimated_cost:,.1f} s")
         
     st.markdown("---")
+    params = st.session_state.get('params', {})
+    if params.get('start_date') and params.get('data_source') in DATE_GRAIN_CONFIGS:
+        st.checkbox(
+            "⏩ Incremental export (only fetch days since my last export of these parameters)",
+            key='incremental_export',
+            help="Reuses your last successful export with the same workspace, storefronts and filters "
+                 "and only queries the new days. Falls back to a full export when that isn't possible."
+        )
     cols_action = st.columns(2)
     with cols_action[0]:
         # Check if export is allowed (under 50k rows)
@@ -310,8 +372,6 @@ def _display_results():
             disabled=export_disabled,
             help="Export the full dataset (will be split into batches automatically for large date ranges)"
         ):
-            if 'call_trace' in st.session_state:
-                st.session_state.call_trace = []
             st.session_state.stage = 'exporting_full'
             st.rerun()
             
@@ -328,9 +388,11 @@ def _display_results():
 def _handle_exporting_full():
     """Stage 3: Load the full dataset using batching and prepare it for download."""
     
-    with st.spinner("Exporting full data using batch processing (this may take a while)..."):
+    with st.spinner("Exporting full data using batch processing (this may take a while)..."), \
+            span("export", session=st.session_state.get('session_id'),
+                 data_source=st.session_state.params.get('data_source')) as export_span:
         # Use batch export for data with date ranges
-        from utils.core.logic import load_data_with_batching
+        from utils.core.logic import load_data_with_batching, load_data_incremental, track_database_work
         
         params = st.session_state.params.copy()
         data_source = params.pop('data_source', None)
@@ -339,21 +401,107 @@ def _handle_exporting_full():
         
         sql_params = params
         
-        # Check if we have date range
-        if sql_params.get('start_date') and sql_params.get('end_date'):
-            full_df = load_data_with_batching(data_source, batch_days=7, **sql_params)
-        else:
-            # No date range, use regular export
-            full_df = load_data(data_source)
+        # An identical export from today is answered straight from the artifact store
+        artifact = find_artifact(data_source, sql_params)
+        if artifact is not None:
+            export_span.set("artifact", True)
+            record_request(
+                'export', data_source, sql_params, duration=0.0, rows=artifact.get('row_count'),
+                status='artifact', session_id=st.session_state.get('session_id')
+            )
+            st.session_state.final_row_count = artifact.get('row_count')
+            st.session_state.download_info = {
+                "data": read_artifact(artifact),
+                "file_name": artifact['file_name'],
+                "from_history": True
+            }
+            st.session_state.stage = 'download_ready'
+            st.rerun()
+        
+        # Batch size and queueing come from the cost-based admission plan
+        admission = st.session_state.get('admission') or {}
+        batch_days = admission.get('batch_days') or 7
+        incremental = st.session_state.get('incremental_export', False)
+        
+        slot = ExitStack()
+        if admission.get('action') == 'queue':
+            queue_status = st.empty()
+            
+            def show_queue_position(position):
+                queue_status.info(
+                    f"⏳ This export exceeds the database cost budget and waits for a heavy-export slot "
+                    f"(position {position} in the queue)..."
+                )
+            
+            try:
+                slot.enter_context(over_budget_slot(
+                    st.session_state.get('session_id', 'anonymous'), on_wait=show_queue_position
+                ))
+            except TimeoutError:
+                queue_status.warning(
+                    "⏳ Heavy exports are busy right now and this one didn't get a slot in time. "
+                    "Please retry in a few minutes or choose a shorter date range."
+                )
+                st.session_state.stage = 'loaded'
+                st.button("⬅️ Back to preview")
+                return
+        
+        with slot, stage('export', data_source) as recorded, track_database_work() as database_work:
+            if admission.get('action') == 'queue':
+                queue_status.empty()
+            export_start = time.time()
+            # Check if we have date range
+            if sql_params.get('start_date') and sql_params.get('end_date') and incremental:
+                full_df = load_data_incremental(data_source, batch_days=batch_days, **sql_params)
+            elif sql_params.get('start_date') and sql_params.get('end_date'):
+                full_df = load_data_with_batching(data_source, batch_days=batch_days, **sql_params)
+            else:
+                # No date range, use regular export
+                full_df = load_data(data_source)
+            export_duration = time.time() - export_start
+            recorded.rows = len(full_df) if full_df is not None else 0
+        export_span.set("rows", len(full_df) if full_df is not None else 0)
+        export_span.set("batch_days", batch_days)
+        
+        record_request(
+            'export', data_source, sql_params,
+            duration=export_duration,
+            rows=len(full_df) if full_df is not None else None,
+            status='ok' if full_df is not None and not full_df.empty else 'empty',
+            session_id=st.session_state.get('session_id'),
+            batch_days=batch_days,
+            admission=admission.get('action'),
+            incremental=bool(incremental)
+        )
         
         if full_df is not None and not full_df.empty:
-            csv_data = convert_df_to_csv(full_df)
+            # Learn the per-row cost of this source for future admission decisions, from full
+            # exports that ran on the database only: an incremental export fetches just the new
+            # days of the num_row rows, cache hits and shared results take next to no time
+            if not incremental and database_work.all_from_database:
+                record_export_run(data_source, int(num_row or 0), database_work.fetch_seconds)
+
+            csv_data = convert_df_to_csv(full_df, data_source)
             file_name = f"{data_source}_data_{datetime.now().strftime('%Y%m%d')}.csv"
             # Save final row count for summary display
             try:
                 st.session_state.final_row_count = int(len(full_df))
             except Exception:
                 st.session_state.final_row_count = None
+            # Keep the file for re-download and for identical requests from other sessions
+            artifact = None
+            try:
+                artifact = save_artifact(
+                    data_source, sql_params, csv_data, file_name, row_count=st.session_state.final_row_count
+                )
+            except OSError as e:
+                st.warning(f"Export could not be saved to the export history: {str(e)}")
+            # Keep the result as the base for the next incremental export of these parameters
+            if incremental and artifact is not None:
+                try:
+                    remember_export(data_source, sql_params, full_df, artifact)
+                except OSError as e:
+                    st.warning(f"Export could not be remembered for incremental mode: {str(e)}")
             st.session_state.download_info = {"data": csv_data, "file_name": file_name}
             st.session_state.stage = 'download_ready'
             st.rerun()
@@ -364,8 +512,11 @@ def _handle_exporting_full():
 
 def _display_download_ready():
     """Stage 4: Display the download button for the exported CSV."""
-    st.success("✅ Your full data export is ready to download!")
     info = st.session_state.download_info
+    if info.get('from_history'):
+        st.success("⚡ An identical export from today was found in the export history - no need to wait!")
+    else:
+        st.success("✅ Your full data export is ready to download!")
     st.download_button(
        label="📥 Download CSV Now",
        data=info['data'],
@@ -380,6 +531,40 @@ def _display_download_ready():
 
 
 
+def display_export_history(data_source: str):
+    """Let users re-download previous exports of a data source from the artifact store."""
+    artifacts = list_artifacts(data_source)
+    with st.expander(f"📂 Export history ({len(artifacts)})"):
+        if not artifacts:
+            st.write("No stored exports for this report yet.")
+            return
+        
+        labels = []
+        for artifact in artifacts:
+            params = artifact['params']
+            period = f"{params.get('start_date')} → {params.get('end_date')}" if params.get('start_date') else "all time"
+            created = datetime.fromtimestamp(artifact['created_at']).strftime('%Y-%m-%d %H:%M')
+            rows = f"{artifact['row_count']:,} rows" if artifact.get('row_count') is not None else "? rows"
+            labels.append(f"{created} | workspace {params.get('workspace_id')} | {period} | {rows}")
+        
+        selected = st.selectbox(
+            "Previous exports",
+            options=range(len(artifacts)),
+            format_func=lambda i: labels[i],
+            key=f"export_history_{data_source}"
+        )
+        artifact = artifacts[selected]
+        st.json(artifact['params'], expanded=False)
+        if st.button("📥 Prepare download", key=f"export_history_load_{data_source}"):
+            st.download_button(
+                label=f"Download {artifact['file_name']}",
+                data=read_artifact(artifact),
+                file_name=artifact['file_name'],
+                mime='text/csv',
+                key=f"export_history_download_{data_source}"
+            )
+
+
 # --- Main Display Function --- 
 def display_data_exporter():
     """Display the entire data processing flow from preview to download."""    
@@ -418,6 +603,8 @@ def get_form_summary(data_source: str, input_values: Dict[str, Any]) -> str:
             elif field_name == "storefront_ids":
                 count = len(str(value).split(",")) if value else 0
                 summary_parts.append(f"• Storefronts: {count} selected")
+            elif isinstance(value, list):
+                summary_parts.append(f"• {field_config['label']}: {len(value)} selected")
             else:
                 summary_parts.append(f"• {field_config['label']}: {value}")
     
@@ -5,13 +5,34 @@ This module defines all possible input fields and their properties,
 enabling dynamic form generation and validation based on configuration.
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 from typing import Dict, List, Any, Optional
 
 # --- Constants ---
 TODAY = datetime.now().date()
 YESTERDAY = TODAY - timedelta(days=1)
 
+
+def get_date_presets(today: Optional[date] = None) -> Dict[str, Optional[Dict[str, date]]]:
+    """
+    Get the date range presets relative to `today` (default: the current date).
+    
+    Long-running processes (the Streamlit server, the export scheduler) should call this
+    instead of relying on the presets computed at import time.
+    """
+    today = today or datetime.now().date()
+    yesterday = today - timedelta(days=1)
+    return {
+        "Last 30 days": {"start": today - timedelta(days=30), "end": yesterday},
+        "This month": {"start": today.replace(day=1), "end": yesterday},
+        "Last month": {
+            "start": (today.replace(day=1) - timedelta(days=1)).replace(day=1),
+            "end": today.replace(day=1) - timedelta(days=1)
+        },
+        "Custom time range": None
+    }
+
+
 # --- Input Field Definitions ---
 INPUT_FIELDS = {
     "workspace_id": {
@@ -38,7 +59,7 @@ INPUT_FIELDS = {
             "separator": ","
         },
         "help_text": "Enter one or more storefront EIDs separated by commas. Leave empty for all storefronts.",
-        "performance_tip": "For faster performance with multiple storefronts, select a smaller date range."
+        "performance_tip": "Large exports (many storefronts or long date ranges) are automatically split into smaller batches or queued to protect the database."
     },
     
     "date_range": {
@@ -50,20 +71,7 @@ INPUT_FIELDS = {
             "start_before_end": True,
             "max_date": "yesterday"
         },
-        "presets": {
-            "Last 30 days": {"start": TODAY - timedelta(days=30), "end": YESTERDAY},
-            "This month": {"start": TODAY.replace(day=1), "end": YESTERDAY},
-            "Last month": {
-                "start": (TODAY.replace(day=1) - timedelta(days=1)).replace(day=1),
-                "end": TODAY.replace(day=1) - timedelta(days=1)
-            },
-            "Custom time range": None
-        },
-        "date_range_limits": {
-            "single_storefront": 60,
-            "multiple_storefronts_2": 60,
-            "multiple_storefronts_3plus": 30
-        }
+        "presets": get_date_presets(TODAY)
     },
     
     "device_type": {
@@ -94,6 +102,66 @@ INPUT_FIELDS = {
         "options": ["-1", "4", "10", "None"],
         "default": "None",
         "help_text": "Filter by product position or select 'None' for all positions"
+    },
+
+    # --- Output filters (applied in the database: thresholds on the exported metrics, see
+    # logic.build_filter_conditions; keyword filters on the keyword dimension, see logic.build_keyword_patterns) ---
+    "min_search_volume": {
+        "type": "number",
+        "label": "Min Search Volume",
+        "required": False,
+        "sql_param": "min_search_volume",
+        "filter": {"column": "search_volume", "operator": ">="},
+        "help_text": "Only export rows with at least this search volume (leave empty for no minimum)"
+    },
+
+    "min_cost": {
+        "type": "number",
+        "label": "Min Cost",
+        "required": False,
+        "sql_param": "min_cost",
+        "filter": {"column": "cost", "operator": ">="},
+        "help_text": "Only export rows with at least this cost (leave empty for no minimum)"
+    },
+
+    "min_click": {
+        "type": "number",
+        "label": "Min Clicks",
+        "required": False,
+        "sql_param": "min_click",
+        "filter": {"column": "click", "operator": ">="},
+        "help_text": "Only export rows with at least this many clicks (leave empty for no minimum)"
+    },
+
+    "keyword_contains": {
+        "type": "text",
+        "label": "Keyword contains",
+        "required": False,
+        "sql_param": "keyword_contains",
+        "filter": {"column": "keyword", "operator": "contains"},
+        "validation": {"max_length": 200},
+        "help_text": "Only export keywords containing this text"
+    },
+
+    "keyword_prefix": {
+        "type": "text",
+        "label": "Keyword starts with",
+        "required": False,
+        "sql_param": "keyword_prefix",
+        "filter": {"column": "keyword", "operator": "prefix"},
+        "validation": {"max_length": 200},
+        "help_text": "Only export keywords starting with this text"
+    },
+
+    "columns": {
+        "type": "multiselect",
+        "label": "Columns",
+        "required": False,
+        "sql_param": "columns",
+        # Options come from the data source's query (see logic.get_export_columns)
+        "options_from": "export_columns",
+        "default": [],
+        "help_text": "Export only these columns (leave empty for all). Key columns used to combine batches are always included."
     }
 }
 
@@ -109,49 +177,52 @@ DATA_SOURCE_CONFIGS = {
     "keyword_lab": {
         "name": "Keyword Lab",
         "data_logic_module": "keyword_lab_data",
-        "inputs": ["workspace_id", "storefront_ids", "date_range"],
+        "inputs": ["workspace_id", "storefront_ids", "date_range", "min_search_volume", "min_cost", "min_click", "keyword_contains", "keyword_prefix", "columns"],
         "description": "Export keyword lab data with date filtering"
     },
     
     "keyword_performance": {
         "name": "Keyword Performance",
         "data_logic_module": "keyword_performance_data",
-        "inputs": ["workspace_id", "storefront_ids", "date_range", "display_type", "product_position"],
+        "inputs": ["workspace_id", "storefront_ids", "date_range", "display_type", "product_position", "min_search_volume", "min_cost", "min_click", "keyword_contains", "keyword_prefix", "columns"],
         "description": "Export keyword performance data with advanced filtering options"
     },
     
     "product_tracking": {
         "name": "Product Tracking",
         "data_logic_module": "product_tracking_data",
-        "inputs": ["workspace_id", "storefront_ids", "date_range", "display_type"],
+        "inputs": ["workspace_id", "storefront_ids", "date_range", "display_type", "keyword_contains", "keyword_prefix", "columns"],
+        # LEFT JOINs that may be dropped when none of their columns are exported
+        "prunable_joins": ["gc"],
         "description": "Export product tracking data with advanced filtering options"
     },
     
     "competition_landscape": {
         "name": "Competition Landscape",
         "data_logic_module": "competition_landscape_data",
-        "inputs": ["workspace_id", "date_range", "display_type", "product_position"],
+        "inputs": ["workspace_id", "date_range", "display_type", "product_position", "min_search_volume", "keyword_contains", "keyword_prefix", "columns"],
+        "prunable_joins": ["gc"],
         "description": "Export competition landscape data with advanced filtering options"
     },
     
     "storefront_optimization": {
         "name": "Storefront Optimization",
         "data_logic_module": "storefront_optimization_data",
-        "inputs": ["workspace_id", "storefront_ids", "date_range"],
+        "inputs": ["workspace_id", "storefront_ids", "date_range", "min_cost", "min_click", "columns"],
         "description": "Export storefront optimization data"
     },
 
     "campaign_optimization": {
         "name": "Campaign Optimization",
         "data_logic_module": "campaign_optimization_data",
-        "inputs": ["workspace_id", "storefront_ids", "date_range"],
+        "inputs": ["workspace_id", "storefront_ids", "date_range", "columns"],
         "description": "Export campaign optimization data"
     },
 
     "ads_object_optimization": {
         "name": "Ads Object Optimization",
         "data_logic_module": "ads_object_optimization_data",
-        "inputs": ["workspace_id", "storefront_ids", "date_range"],
+        "inputs": ["workspace_id", "storefront_ids", "date_range", "columns"],
         "description": "Export ads object optimization data"
     },
 
@@ -5,9 +5,11 @@ from utils.ui.dynamic_ui import (
     create_dynamic_input_form, 
     display_validation_errors, 
     create_action_buttons, 
-    display_data_exporter
+    display_data_exporter,
+    display_export_history
 )
 from utils.core.helpers import display_call_trace
+from utils.core.database import check_database_config, DatabaseConfigError
 
 @dataclass
 class TabPage:
@@ -106,6 +108,13 @@ def render_page(page: Page):
     st.set_page_config(page_title=page.title, layout="wide")
     st.title(page.title)
 
+    # Only the settings are checked here; the engine is created by the first query
+    try:
+        check_database_config()
+    except DatabaseConfigError as e:
+        st.error(str(e))
+        st.stop()
+
     if len(page.tabs) > 1:
         tab_titles = [tab.title for tab in page.tabs]
         
@@ -173,4 +182,7 @@ def render_tab_content(tab_content: TabPage):
     
     # Display data exporter if we have data for this source
     if st.session_state.get('params', {}).get('data_source') == tab_content.data_source_key and st.session_state.get('stage', 'initial') != 'initial':
-        display_data_exporter()
\ No newline at end of file
+        display_data_exporter()
+    
+    # Previous exports of this report, kept in the artifact store
+    display_export_history(tab_content.data_source_key)
\ No newline at end of file
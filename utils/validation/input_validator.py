@@ -47,6 +47,8 @@ def validate_field_value(field_name: str, value: Any, context: Dict[str, Any] =
         errors.extend(_validate_date_range_field(field_name, value, validation_rules, context))
     elif field_type == "select":
         errors.extend(_validate_select_field(field_name, value, field_config))
+    elif field_type == "number":
+        errors.extend(_validate_number_field(field_name, value, field_config))
     
     return errors
 
@@ -81,6 +83,9 @@ def _validate_text_field(field_name: str, value: str, rules: Dict[str, Any]) ->
     if rules.get("min_length") and len(str(value)) < rules["min_length"]:
         errors.append(f"{field_name.replace('_', ' ').title()} is too short")
     
+    if rules.get("max_length") and len(str(value)) > rules["max_length"]:
+        errors.append(f"{field_name.replace('_', ' ').title()} is too long")
+    
     return errors
 
 def _validate_date_range_field(field_name: str, value: Tuple[date, date], rules: Dict[str, Any], context: Dict[str, Any]) -> List[str]:
@@ -101,29 +106,21 @@ def _validate_date_range_field(field_name: str, value: Tuple[date, date], rules:
     if rules.get("start_before_end", False) and start_date > end_date:
         errors.append("Start date cannot be after end date")
     
-    # Validate date range limits based on storefront count
-    if context and "storefront_ids" in context:
-        storefront_input = context["storefront_ids"]
-        if storefront_input:
-            storefront_list = [s.strip() for s in str(storefront_input).split(",") if s.strip()]
-            num_storefronts = len(storefront_list)
-            date_range_days = (end_date - start_date).days
-            
-            field_config = get_input_config(field_name)
-            limits = field_config.get("validation", {}).get("date_range_limits", {})
-            
-            max_days_allowed = limits.get("single_storefront", 60)
-            
-            if num_storefronts > 1 and num_storefronts <= 2:
-                max_days_allowed = limits.get("multiple_storefronts_2", 60)
-            elif num_storefronts > 2:
-                max_days_allowed = limits.get("multiple_storefronts_3plus", 30)
-            
-            if date_range_days > max_days_allowed:
-                errors.append(
-                    f"With {num_storefronts} storefront(s), the maximum allowed period is {max_days_allowed} days. "
-                    f"Please select a shorter date range."
-                )
+    # NOTE: There is no fixed day limit here anymore. Large requests are handled by
+    # cost-based admission (utils.core.cost_model) once the row count is known.
+    
+    return errors
+
+def _validate_number_field(field_name: str, value: Any, field_config: Dict[str, Any]) -> List[str]:
+    """Validate number field value (thresholds must be non-negative numbers)."""
+    errors = []
+    
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return [f"{field_config['label']} must be a number"]
+    if number < 0:
+        errors.append(f"{field_config['label']} cannot be negative")
     
     return errors
 